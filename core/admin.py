@@ -1,3 +1,87 @@
+import io
+import marshal
+import pstats
+
 from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import IngestToken, RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'user', 'status', 'duration_ms', 'query_count',
+                    'downloads')
+    list_filter = ('view_name', 'status')
+    search_fields = ('path', 'view_name', 'user__username')
+    date_hierarchy = 'created_at'
+    fields = ('created_at', 'method', 'path', 'view_name', 'user', 'status', 'duration_ms', 'query_count', 'samples',
+              'downloads', 'top_functions')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/<str:kind>/', self.admin_site.admin_view(self.download),
+                 name='core_requestprofile_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='Files')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">pstats</a> · <a href="{}">flamegraph</a>',
+            reverse('admin:core_requestprofile_download', args=[obj.pk, 'pstats']),
+            reverse('admin:core_requestprofile_download', args=[obj.pk, 'folded']),
+        )
+
+    @admin.display(description='Top functions (cumulative)')
+    def top_functions(self, obj):
+        out = io.StringIO()
+        stats = pstats.Stats(_StatsSource(obj.pstats_bytes()), stream=out)
+        stats.sort_stats('cumulative').print_stats(30)
+        return format_html('<pre style="font-size: 11px">{}</pre>', out.getvalue())
+
+    def download(self, request, pk, kind):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if kind == 'pstats':
+            response = HttpResponse(profile.pstats_bytes(), content_type='application/octet-stream')
+            filename = f'profile-{profile.pk}.pstats'
+        elif kind == 'folded':
+            response = HttpResponse(profile.folded_stacks(), content_type='text/plain; charset=utf-8')
+            filename = f'profile-{profile.pk}.folded'
+        else:
+            return HttpResponse(status=404)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class _StatsSource:
+    """Lets pstats.Stats load a marshalled dump held in memory."""
+
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+class IngestTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'is_active', 'created_at', 'last_used_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'user__username')
+    fields = ('name', 'user', 'is_active', 'created_at', 'last_used_at')
+    readonly_fields = ('user', 'created_at', 'last_used_at')
+
+    def has_add_permission(self, request):
+        return False  # keys are shown once: `manage.py create_ingest_token`
+
 
-# Register your models here.
+admin.site.register(RequestProfile, RequestProfileAdmin)
+admin.site.register(IngestToken, IngestTokenAdmin)
@@ -0,0 +1,268 @@
+# core/archive.py
+#
+# Cold storage for old DailyLog rows.
+#
+# Almost every read touches the last week or month of logs, but the table
+# keeps one row per patient per day forever. ``archive_logs`` moves whole
+# months older than LOG_ARCHIVE_AFTER_DAYS into DailyLogArchive: one row per
+# user per month holding the logs column by column (a list per field, days
+# of the month instead of dates), compressed. Columns of similar numbers
+# compress far better than rows, and the hot table and its indexes stay
+# sized to the recent window.
+#
+# Code that reads history beyond the recent window (goal recomputation,
+# streaks, exports) uses ``iter_logs``, which merges both tiers and yields
+# the same dicts ``DailyLog.objects.values()`` would. Moving rows between
+# tiers is not a change to the logs, so the DailyLog signal handlers skip
+# rows while ``moving()`` is set.
+#
+# A day can end up in both tiers: the wearable rollup (core.vitals) and the
+# ingestion API create hot rows for any date. Moving in either direction
+# then merges the two rows field by field (``merge_rows``) instead of
+# dropping one, and a hot row that gains values is saved normally, so goal
+# progress, caches and sync see the change. ``iter_logs`` merges such a day
+# the same way when it reads it.
+
+import contextlib
+import contextvars
+import datetime
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .fields import keep_timestamps
+from .models import DailyLog, DailyLogArchive
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'LOG_ARCHIVE_AFTER_DAYS', 180)
+FORMAT_VERSION = 1
+
+# Every stored column; id is kept so restored rows get their old primary keys back
+COLUMNS = [field.attname for field in DailyLog._meta.concrete_fields if field.attname not in ("user_id",)]
+DATETIME_COLUMNS = {"created_at", "updated_at"}
+# Columns merged between tiers, with the value that means "not filled in"
+MERGED_COLUMNS = {field.attname: field.get_default() for field in DailyLog._meta.concrete_fields
+                  if field.attname in COLUMNS and field.attname not in ("id", "log_date", *DATETIME_COLUMNS)}
+
+_moving = contextvars.ContextVar("archive_moving", default=False)
+
+
+def moving():
+    """True while rows are being moved between the hot table and the archive."""
+    return _moving.get()
+
+
+@contextlib.contextmanager
+def _move():
+    token = _moving.set(True)
+    try:
+        yield
+    finally:
+        _moving.reset(token)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def archive_cutoff(today=None, older_than=ARCHIVE_AFTER_DAYS):
+    """First day of the oldest month that stays hot; earlier months are archived whole."""
+    today = today or timezone.localdate()
+    return month_start(today - datetime.timedelta(days=older_than))
+
+
+# --------------------------
+# Packing
+# --------------------------
+
+def pack(rows):
+    """Columnar form of one month's rows (dicts of COLUMNS, any order)."""
+    rows = sorted(rows, key=lambda row: row["log_date"])
+    columns = {}
+    for name in COLUMNS:
+        if name == "log_date":
+            columns[name] = [row[name].day for row in rows]
+        elif name in DATETIME_COLUMNS:
+            columns[name] = [row[name].isoformat() if row[name] else None for row in rows]
+        else:
+            columns[name] = [row[name] for row in rows]
+    return {"version": FORMAT_VERSION, "columns": columns}
+
+
+def unpack(archive, fields=None):
+    """The archive's rows as dicts, oldest first, limited to ``fields`` if given."""
+    columns = archive.data["columns"]
+    wanted = [name for name in (fields or COLUMNS) if name in columns or name == "user_id"]
+    days = columns["log_date"]
+    rows = []
+    for i, day in enumerate(days):
+        row = {}
+        for name in wanted:
+            if name == "user_id":
+                row[name] = archive.user_id
+            elif name == "log_date":
+                row[name] = archive.month.replace(day=day)
+            elif name in DATETIME_COLUMNS:
+                row[name] = parse_datetime(columns[name][i]) if columns[name][i] else None
+            else:
+                row[name] = columns[name][i]
+        rows.append(row)
+    return rows
+
+
+def merge_rows(hot, archived):
+    """One day's hot and archived rows combined: hot values win, archived ones fill what the hot row left empty."""
+    merged = dict(hot)
+    for name, empty in MERGED_COLUMNS.items():
+        if merged.get(name) in (empty, None, "") and archived.get(name) not in (None, ""):
+            merged[name] = archived[name]
+    return merged
+
+
+# --------------------------
+# Reading both tiers
+# --------------------------
+
+def iter_logs(user_id, start=None, end=None, fields=None):
+    """Yield the user's logs between ``start`` and ``end`` (inclusive), oldest first, from both tiers.
+
+    Rows are dicts of ``fields`` (default: every column) like ``.values()``
+    gives. A day that exists in both tiers is yielded once, combined with
+    ``merge_rows``: the hot row's values, with the archived row filling the
+    fields the hot row left empty.
+    """
+    fields = list(fields or COLUMNS)
+    if "log_date" not in fields:
+        fields.append("log_date")
+
+    hot = DailyLog.objects.filter(user_id=user_id)
+    archives = DailyLogArchive.objects.filter(user_id=user_id)
+    if start:
+        hot = hot.filter(log_date__gte=start)
+        archives = archives.filter(month__gte=month_start(start))
+    if end:
+        hot = hot.filter(log_date__lte=end)
+        archives = archives.filter(month__lte=end)
+
+    def archived_rows():
+        for archive in archives.order_by("month").iterator(chunk_size=12):
+            for row in unpack(archive, fields):
+                if (start is None or row["log_date"] >= start) and (end is None or row["log_date"] <= end):
+                    yield row
+
+    hot_rows = hot.order_by("log_date").values(*fields).iterator(chunk_size=1000)
+    # (date, tier) keys: on the same day the hot row (tier 0) comes first
+    merged = heapq.merge(((row["log_date"], 1, row) for row in archived_rows()),
+                         ((row["log_date"], 0, row) for row in hot_rows),
+                         key=lambda item: item[:2])
+    pending = None
+    for day, _, row in merged:
+        if pending is not None and pending["log_date"] == day:
+            pending = merge_rows(pending, row)  # the archived copy of the hot row's day
+            continue
+        if pending is not None:
+            yield pending
+        pending = row
+    if pending is not None:
+        yield pending
+
+
+# --------------------------
+# Moving between tiers
+# --------------------------
+
+def archive_logs(cutoff, user_ids=None, dry_run=False):
+    """Move logs dated before ``cutoff`` (a month start) into monthly archives.
+
+    Returns ``(months, rows)`` moved. Months that already have an archive
+    (restored and re-archived, or topped up) are merged into it.
+    """
+    candidates = DailyLog.objects.filter(log_date__lt=cutoff)
+    if user_ids:
+        candidates = candidates.filter(user_id__in=user_ids)
+    user_ids = list(candidates.order_by().values_list("user_id", flat=True).distinct())
+
+    moved_months = moved_rows = 0
+    for user_id in user_ids:
+        rows_by_month = {}
+        for row in (DailyLog.objects.filter(user_id=user_id, log_date__lt=cutoff)
+                    .values(*COLUMNS).iterator(chunk_size=1000)):
+            rows_by_month.setdefault(month_start(row["log_date"]), []).append(row)
+        for month, rows in sorted(rows_by_month.items()):
+            moved_months += 1
+            moved_rows += len(rows)
+            if not dry_run:
+                _archive_month(user_id, month, rows)
+    return moved_months, moved_rows
+
+
+def _archive_month(user_id, month, rows):
+    from . import goals
+
+    hot_ids = [row["id"] for row in rows]
+    changed = []
+    with transaction.atomic():
+        with _move():
+            archive = DailyLogArchive.objects.select_for_update().filter(user_id=user_id, month=month).first()
+            if archive is not None:
+                archived = {row["log_date"]: row for row in unpack(archive)}
+                merged_rows = []
+                for row in rows:
+                    old = archived.pop(row["log_date"], None)
+                    merged = merge_rows(row, old) if old is not None else row
+                    if merged != row:
+                        changed.append(merged)
+                    merged_rows.append(merged)
+                rows = merged_rows + list(archived.values())
+                archive.data = pack(rows)
+                archive.entry_count = len(rows)
+                archive.save(update_fields=["data", "entry_count"])
+            else:
+                DailyLogArchive.objects.create(user_id=user_id, month=month, data=pack(rows), entry_count=len(rows))
+            DailyLog.objects.filter(pk__in=hot_ids).delete()
+        # Goal progress was last evaluated on the hot row alone
+        for row in changed:
+            goals.evaluate_log(DailyLog(user_id=user_id, **row))
+
+
+def restore_logs(since=None, user_ids=None, dry_run=False):
+    """Move archived months starting on or after ``since`` (all if None) back into DailyLog.
+
+    Returns ``(months, rows)`` moved. A day that meanwhile has a hot row is
+    merged into it (``merge_rows``), so no archived value is lost.
+    """
+    archives = DailyLogArchive.objects.order_by("user_id", "month")
+    if since:
+        archives = archives.filter(month__gte=month_start(since))
+    if user_ids:
+        archives = archives.filter(user_id__in=user_ids)
+
+    moved_months = moved_rows = 0
+    for archive in archives.iterator(chunk_size=100):
+        moved_months += 1
+        moved_rows += archive.entry_count
+        if dry_run:
+            continue
+        with transaction.atomic():
+            rows = unpack(archive)
+            hot = {log.log_date: log for log in
+                   DailyLog.objects.filter(user_id=archive.user_id, log_date__in=[r["log_date"] for r in rows])}
+            with _move():
+                logs = [DailyLog(user_id=archive.user_id, **row) for row in rows if row["log_date"] not in hot]
+                with keep_timestamps(DailyLog):
+                    DailyLog.objects.bulk_create(logs, batch_size=500)
+                archive.delete()
+            for row in rows:
+                log = hot.get(row["log_date"])
+                if log is None:
+                    continue
+                current = {name: getattr(log, name) for name in MERGED_COLUMNS}
+                merged = merge_rows(current, row)
+                fields = [name for name in MERGED_COLUMNS if merged[name] != current[name]]
+                if fields:
+                    for name in fields:
+                        setattr(log, name, merged[name])
+                    log.save(update_fields=[*fields, "updated_at"])  # a real change: signals run
+    return moved_months, moved_rows
@@ -0,0 +1,124 @@
+# core/assets.py
+#
+# Third-party front-end assets (Bootstrap, Remix Icon, Chart.js, Inter).
+#
+# ``manage.py vendor_assets`` downloads the pinned files below into
+# vitalcircle/static/vendor/, including the fonts their CSS points at, so
+# collectstatic fingerprints and precompresses them with our own files
+# (see core.staticfiles). It runs as a deploy step, before collectstatic, and
+# refuses a download whose digest differs from the pinned Subresource
+# Integrity hash; fonts are fetched from the versioned URLs in the pinned CSS.
+# Templates reference the assets with ``{% vendor_asset 'name' %}``, which
+# uses the local copy when it has been vendored and the CDN URL otherwise.
+
+import base64
+import functools
+import hashlib
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+VENDOR_DIR = Path(settings.BASE_DIR) / "vitalcircle" / "static"
+
+# name -> (pinned CDN URL, path under the static root, SRI hash of the download).
+# A None hash is not pinned yet: vendor_assets prints the digest it got so it
+# can be reviewed and filled in. Google Fonts builds its CSS per request, so
+# inter.css can't be pinned.
+VENDOR_ASSETS = {
+    "bootstrap.css": ("https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+                      "vendor/bootstrap/bootstrap.min.css",
+                      "sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN"),
+    "bootstrap.js": ("https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+                     "vendor/bootstrap/bootstrap.bundle.min.js",
+                     "sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL"),
+    "remixicon.css": ("https://cdn.jsdelivr.net/npm/remixicon@4.2.0/fonts/remixicon.css",
+                      "vendor/remixicon/remixicon.css",
+                      None),
+    "chart.js": ("https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+                 "vendor/chartjs/chart.umd.min.js",
+                 None),
+    "inter.css": ("https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap",
+                  "vendor/inter/inter.css",
+                  None),
+}
+
+# Google Fonts serves woff2 only to browsers it recognises
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# Source maps aren't vendored, and ManifestStaticFilesStorage refuses dangling references
+_SOURCE_MAP = re.compile(r"^\s*(/\*#|//#)\s*sourceMappingURL=.*$", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=None)
+def vendor_url(name):
+    """URL for a vendored asset: the local static file if present, else the CDN."""
+    cdn_url, path, _ = VENDOR_ASSETS[name]
+    if settings.DEBUG:
+        present = finders.find(path) is not None
+    else:
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        present = staticfiles_storage.exists(path)
+    return static(path) if present else cdn_url
+
+
+class IntegrityError(Exception):
+    pass
+
+
+def integrity(content):
+    """Subresource Integrity hash (sha384) of ``content``."""
+    return "sha384-" + base64.b64encode(hashlib.sha384(content).digest()).decode()
+
+
+def _fetch(url):
+    response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def _vendor_css(css, css_url, target_dir):
+    """Download the files ``css`` refers to next to it and point its url()s at them."""
+    fetched = []
+
+    def localise(match):
+        quote, ref = match.groups()
+        if ref.startswith("data:"):
+            return match.group(0)
+        parts = urlsplit(urljoin(css_url, ref))
+        filename = posixpath.basename(parts.path)
+        target = target_dir / filename
+        if not target.exists():
+            target.write_bytes(_fetch(parts._replace(query="", fragment="").geturl()))
+            fetched.append(target)
+        fragment = f"#{parts.fragment}" if parts.fragment else ""
+        return f"url({quote}{filename}{fragment}{quote})"
+
+    return _CSS_URL.sub(localise, css), fetched
+
+
+def vendor_asset(name, dest=VENDOR_DIR):
+    """Download one asset (and any fonts it references).
+
+    Returns ``(files written, SRI hash of the download)``; raises
+    IntegrityError, writing nothing, if the download doesn't match its pin.
+    """
+    url, path, pinned = VENDOR_ASSETS[name]
+    raw = _fetch(url)
+    digest = integrity(raw)
+    if pinned and digest != pinned:
+        raise IntegrityError(f"{url} has hash {digest}, expected {pinned}")
+    target = dest / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    content = _SOURCE_MAP.sub("", raw.decode("utf-8"))
+    written = []
+    if path.endswith(".css"):
+        content, written = _vendor_css(content, url, target.parent)
+    target.write_text(content, encoding="utf-8")
+    return [target] + written, digest
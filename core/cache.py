@@ -0,0 +1,205 @@
+# core/cache.py
+#
+# Two-tier cache shared by the LLM, dashboard and forum code.
+#
+# L1 is a small LRU inside each process (no network hop, lost on restart);
+# L2 is the Django cache named by CACHE_L2_ALIAS: file-based by default, the
+# database cache table or Redis when configured (see CACHES in settings).
+# Reads go L1 -> L2 -> compute, and writes fill both tiers.
+#
+# Keys live in a Namespace. A namespace, and every group inside it (say,
+# one user's entries), has a version number stored in L2 that is part of
+# each key; bumping it invalidates the whole group without knowing its keys.
+# Processes re-read versions at most every CACHE_VERSION_TTL seconds, so
+# other workers see an invalidation within that window.
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+L1_MAX_ENTRIES = getattr(settings, 'CACHE_L1_MAX_ENTRIES', 1000)
+L1_TIMEOUT = getattr(settings, 'CACHE_L1_TIMEOUT', 60)  # seconds; L1 never holds an entry longer
+VERSION_TTL = getattr(settings, 'CACHE_VERSION_TTL', 5)
+L2_ALIAS = getattr(settings, 'CACHE_L2_ALIAS', 'default')
+
+_MISSING = object()
+_SAFE_KEY = re.compile(r'^[\w.:@/-]{1,200}$')
+
+_namespaces = {}
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry expiry."""
+
+    def __init__(self, max_entries=L1_MAX_ENTRIES, timeout=L1_TIMEOUT):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+l1 = LRUCache()
+
+
+class CacheStats:
+    def __init__(self):
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+
+    @property
+    def hit_ratio(self):
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return (self.l1_hits + self.l2_hits) / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+class Namespace:
+    """A versioned key space on top of L1 and L2, with its own hit-ratio counters."""
+
+    def __init__(self, name, timeout=300, l1_timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.l1_timeout = min(timeout, L1_TIMEOUT) if l1_timeout is None else l1_timeout
+        self.stats = CacheStats()
+        _namespaces[name] = self
+
+    @property
+    def l2(self):
+        return caches[L2_ALIAS]
+
+    # Versions
+
+    def _version_key(self, group=None):
+        return f"{self.name}:{group}:version" if group is not None else f"{self.name}:version"
+
+    def _version(self, group=None):
+        version_key = self._version_key(group)
+        version = l1.get(version_key)
+        if version is not _MISSING:
+            return version
+        version = self.l2.get(version_key)
+        if version is None:
+            # Seed from the clock so a lost version key can never bring back old entries
+            self.l2.add(version_key, time.time_ns(), timeout=None)
+            version = self.l2.get(version_key, 0)
+        l1.set(version_key, version, VERSION_TTL)
+        return version
+
+    def invalidate(self, group=None):
+        """Make every key of ``group`` (or the whole namespace) unreachable."""
+        version_key = self._version_key(group)
+        try:
+            version = self.l2.incr(version_key)
+        except ValueError:
+            version = time.time_ns()
+            self.l2.set(version_key, version, timeout=None)
+        l1.set(version_key, version, VERSION_TTL)
+        self.stats.invalidations += 1
+
+    def make_key(self, key, group=None):
+        key = str(key)
+        if not _SAFE_KEY.match(key):
+            key = hashlib.sha256(key.encode()).hexdigest()
+        prefix = f"{self.name}:{self._version()}"
+        if group is not None:
+            prefix += f":{group}:{self._version(group)}"
+        return f"{prefix}:{key}"
+
+    # Values
+
+    def _lookup(self, full_key):
+        value = l1.get(full_key)
+        if value is not _MISSING:
+            self.stats.l1_hits += 1
+            return value
+        value = self.l2.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self.stats.l2_hits += 1
+            l1.set(full_key, value, self.l1_timeout)
+            return value
+        self.stats.misses += 1
+        return _MISSING
+
+    def _store(self, full_key, value, timeout):
+        self.l2.set(full_key, value, self.timeout if timeout is None else timeout)
+        l1.set(full_key, value, self.l1_timeout)
+        self.stats.sets += 1
+
+    def get(self, key, default=None, group=None):
+        value = self._lookup(self.make_key(key, group))
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=None, group=None):
+        self._store(self.make_key(key, group), value, timeout)
+
+    def get_or_set(self, key, compute, timeout=None, group=None):
+        """Return the cached value for ``key`` or store and return ``compute()``."""
+        full_key = self.make_key(key, group)
+        value = self._lookup(full_key)
+        if value is _MISSING:
+            value = compute()
+            self._store(full_key, value, timeout)
+        return value
+
+    def delete(self, key, group=None):
+        full_key = self.make_key(key, group)
+        l1.delete(full_key)
+        self.l2.delete(full_key)
+
+
+def stats():
+    """Hit/miss counters of every namespace in this process."""
+    return {name: namespace.stats.as_dict() for name, namespace in _namespaces.items()}
+
+
+llm_cache = Namespace("llm", timeout=3600)
+dashboard_cache = Namespace("dashboard", timeout=600)
+forum_cache = Namespace("forums", timeout=300)
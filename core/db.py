@@ -0,0 +1,29 @@
+# core/db.py
+#
+# Per-connection database tuning.
+#
+# SQLite connections get the PRAGMAs listed under ``PRAGMAS`` in their
+# DATABASES entry (see settings) as soon as Django opens them: WAL lets
+# readers run alongside the single writer, synchronous=NORMAL is durable
+# enough in WAL mode at a fraction of the fsyncs, busy_timeout makes a
+# blocked writer wait instead of failing, and mmap_size serves reads from
+# the page cache. Other backends are left alone.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(connection):
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if 'journal_mode' in pragmas:
+            cursor.execute("PRAGMA journal_mode")
+            mode = cursor.fetchone()[0]
+            if mode.lower() != str(pragmas['journal_mode']).lower():
+                # e.g. in-memory test databases, which can't use WAL
+                logger.debug("SQLite journal_mode is %s (wanted %s)", mode, pragmas['journal_mode'])
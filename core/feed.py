@@ -0,0 +1,99 @@
+# core/feed.py
+#
+# Community feed for support group members.
+#
+# Posts in normal-sized groups are pushed into a per-member FeedEntry table
+# when they are created (fan-out-on-write), so reading a feed is a single
+# indexed range scan on (user, -created_at). Groups with more members than
+# FEED_FANOUT_MAX_MEMBERS are flagged ``fanout_on_read``; their posts are not
+# pushed and are merged in at read time instead.
+
+from django.conf import settings
+
+from .models import FeedEntry, ForumPost, GroupMembership
+
+FEED_FANOUT_MAX_MEMBERS = getattr(settings, 'FEED_FANOUT_MAX_MEMBERS', 1000)
+FEED_BATCH_SIZE = getattr(settings, 'FEED_BATCH_SIZE', 500)
+FEED_BACKFILL_POSTS = getattr(settings, 'FEED_BACKFILL_POSTS', 20)
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Push a newly created post into the feed of every member of its group."""
+    if post.group.fanout_on_read:
+        return
+    member_ids = (GroupMembership.objects
+                  .filter(group_id=post.group_id)
+                  .values_list('user_id', flat=True)
+                  .distinct())
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=post.pk, created_at=post.created_at)
+        for user_id in member_ids.iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+
+
+def backfill_member(user_id, group_id):
+    """Give a new member of a push group the group's most recent posts."""
+    posts = (ForumPost.objects
+             .filter(group_id=group_id)
+             .order_by('-created_at')
+             .values_list('pk', 'created_at')[:FEED_BACKFILL_POSTS])
+    _bulk_insert(FeedEntry(user_id=user_id, post_id=pk, created_at=created_at)
+                 for pk, created_at in posts)
+
+
+def remove_member(user_id, group_id):
+    """Drop a departing member's feed entries for the group."""
+    if not GroupMembership.objects.filter(user_id=user_id, group_id=group_id).exists():
+        FeedEntry.objects.filter(user_id=user_id, post__group_id=group_id).delete()
+
+
+def refresh_group_mode(group):
+    """Switch a group between fan-out-on-write and fan-out-on-read by member count.
+
+    Uses hysteresis (flip back below half the limit) so a group hovering
+    around the threshold doesn't flip on every join/leave. When a group goes
+    back to push mode its members are backfilled with recent posts.
+    """
+    members = GroupMembership.objects.filter(group=group).count()
+    if not group.fanout_on_read and members > FEED_FANOUT_MAX_MEMBERS:
+        group.fanout_on_read = True
+        group.save(update_fields=['fanout_on_read'])
+    elif group.fanout_on_read and members <= FEED_FANOUT_MAX_MEMBERS // 2:
+        group.fanout_on_read = False
+        group.save(update_fields=['fanout_on_read'])
+        member_ids = GroupMembership.objects.filter(group=group).values_list('user_id', flat=True).distinct()
+        for user_id in member_ids:
+            backfill_member(user_id, group.pk)
+
+
+def community_feed(user, limit=5):
+    """Return the ``limit`` most recent posts across the user's support groups."""
+    posts = [entry.post for entry in (FeedEntry.objects
+                                      .filter(user=user)
+                                      .select_related('post__user', 'post__group')
+                                      .order_by('-created_at')[:limit])]
+
+    pull_groups = list(GroupMembership.objects
+                       .filter(user=user, group__fanout_on_read=True)
+                       .values_list('group_id', flat=True))
+    if pull_groups:
+        seen = {post.pk for post in posts}
+        pulled = (ForumPost.objects
+                  .filter(group_id__in=pull_groups)
+                  .select_related('user', 'group')
+                  .order_by('-created_at')[:limit])
+        posts.extend(post for post in pulled if post.pk not in seen)
+        posts.sort(key=lambda post: post.created_at, reverse=True)
+        posts = posts[:limit]
+    return posts
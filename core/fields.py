@@ -0,0 +1,189 @@
+# core/fields.py
+#
+# CompressedJSONField: a JSONField-like model field stored as a compressed
+# blob.
+#
+# LLM responses and log payloads are verbose, repetitive JSON; compressed
+# they take a fraction of the space, so tables (and the page cache) stay
+# small. The stored value is
+#
+#     1 byte codec ('j' plain JSON, 'z' zlib, 's' zstd) + 1 byte dictionary id + data
+#
+# zlib is used unless COMPRESSED_JSON_CODEC = 'zstd' opts in to zstd (the
+# optional ``zstandard`` package); rows written with zstd can only be read
+# where that package is installed, so every host sharing the database needs
+# it before the setting is turned on. Values under MIN_COMPRESS_SIZE are
+# stored as plain JSON. A field
+# may name a shared dictionary (DICTIONARIES): the common keys and phrases
+# are then not repeated in every row, which is where most of the saving on
+# small payloads comes from. The dictionary id is stored with each value, so
+# rows written with an older dictionary keep decoding after a new one is added
+# (dictionaries are never changed in place).
+#
+# Values are decoded lazily: loading rows only keeps the blob, and it is
+# decompressed the first time the attribute is read. A row saved without
+# touching the field writes the same blob back without re-compressing. The
+# column can still be left out of a query entirely with ``defer()``.
+#
+# There are no JSON key lookups on these fields; query on real columns.
+# ``values()`` and ``values_list()`` return the raw stored bytes (codec
+# header included), not the decoded value; decode them with
+# ``decompress_json`` or load model instances instead.
+
+import contextlib
+import json
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+MIN_COMPRESS_SIZE = 64  # bytes of JSON below which compression isn't worth it
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# id -> (name, dictionary content). Append only: stored rows refer to the id.
+DICTIONARIES = {
+    1: ("llm-v1", (
+        b'{"summary": "", "recommendations": [{"action": "", "reason": ""}], '
+        b'{"stability_score": , "risk_prediction": {"english": "", "hinglish": ""}}, '
+        b'{"snapshot": "", "entries": }, "praise": [], "warnings": [], "suggestions": [], '
+        b'blood pressure, systolic, diastolic, heart rate, blood glucose, sleep hours, exercise, '
+        b'medication adherence, stress level, weight, water intake, readings, stable, consider, monitor, '
+        b'Continue current medication, Review, follow-up, lifestyle, diet, patient, trends, risk of '
+    )),
+}
+_DICTIONARY_IDS = {name: dict_id for dict_id, (name, _) in DICTIONARIES.items()}
+
+
+def _codec():
+    codec = getattr(settings, 'COMPRESSED_JSON_CODEC', None) or 'zlib'
+    if codec == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured("COMPRESSED_JSON_CODEC is 'zstd' but the zstandard package is not installed")
+    return codec
+
+
+def compress_json(value, dictionary=None):
+    data = json.dumps(value, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return b"j\x00" + data
+    dict_id = _DICTIONARY_IDS[dictionary] if dictionary else 0
+    zdict = DICTIONARIES[dict_id][1] if dict_id else None
+    if _codec() == 'zstd':
+        kwargs = {"dict_data": zstandard.ZstdCompressionDict(zdict, dict_type=zstandard.DICT_TYPE_RAWCONTENT)} if zdict else {}
+        return b"s" + bytes([dict_id]) + zstandard.ZstdCompressor(level=ZSTD_LEVEL, **kwargs).compress(data)
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=zdict) if zdict else zlib.compressobj(ZLIB_LEVEL)
+    return b"z" + bytes([dict_id]) + compressor.compress(data) + compressor.flush()
+
+
+def decompress_json(blob):
+    blob = bytes(blob)
+    codec, dict_id, data = blob[:1], blob[1], blob[2:]
+    zdict = DICTIONARIES[dict_id][1] if dict_id else None
+    if codec == b"j":
+        raw = data
+    elif codec == b"z":
+        decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        raw = decompressor.decompress(data) + decompressor.flush()
+    elif codec == b"s":
+        if zstandard is None:
+            raise ImproperlyConfigured("A value is zstd-compressed but the zstandard package is not installed")
+        kwargs = {"dict_data": zstandard.ZstdCompressionDict(zdict, dict_type=zstandard.DICT_TYPE_RAWCONTENT)} if zdict else {}
+        raw = zstandard.ZstdDecompressor(**kwargs).decompress(data)
+    else:
+        raise ValueError(f"Unknown compressed JSON codec {codec!r}")
+    return json.loads(raw)
+
+
+class Packed(bytes):
+    """A value as loaded from the database, not decoded yet."""
+
+
+class LazyJSONAttribute(DeferredAttribute):
+    # A data descriptor (it defines __set__), so reads go through __get__
+    # even though the value lives in the instance __dict__
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Packed):
+            value = instance.__dict__[self.field.attname] = decompress_json(value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedJSONField(models.BinaryField):
+    descriptor_class = LazyJSONAttribute
+    description = "JSON stored compressed"
+    empty_strings_allowed = False
+
+    def __init__(self, *args, dictionary=None, **kwargs):
+        if dictionary is not None and dictionary not in _DICTIONARY_IDS:
+            raise ValueError(f"Unknown compression dictionary {dictionary!r}")
+        self.dictionary = dictionary
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dictionary is not None:
+            kwargs["dictionary"] = self.dictionary
+        return name, path, args, kwargs
+
+    def get_default(self):
+        return models.Field.get_default(self)  # BinaryField's would default to b''
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Packed(value)
+
+    def to_python(self, value):
+        if isinstance(value, Packed):
+            return decompress_json(value)
+        if isinstance(value, str):  # from value_to_string (fixtures)
+            return json.loads(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, Packed):
+            return bytes(value)  # untouched since it was loaded
+        return compress_json(value, self.dictionary)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        return connection.Database.Binary(value) if value is not None else None
+
+    def value_from_object(self, obj):
+        return getattr(obj, self.attname)
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj), cls=DjangoJSONEncoder)
+
+
+@contextlib.contextmanager
+def keep_timestamps(*models):
+    """Let explicit values for auto_now / auto_now_add fields through (bulk loads and restores).
+
+    Flips the flags on the model class, so only use it in commands, not while serving requests.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -144,6 +144,20 @@ class UserProfileForm(forms.ModelForm):
         return hba1c
 
 
+# DailyLogForm's clean_<field> range checks: (low, high, message). The
+# ingestion API (core.ingest) validates batches against the same table.
+DAILY_LOG_RANGES = {
+    'systolic_bp': (50, 250, 'Systolic blood pressure must be between 50 and 250.'),
+    'diastolic_bp': (30, 150, 'Diastolic blood pressure must be between 30 and 150.'),
+    'heart_rate': (30, 200, 'Heart rate must be between 30 and 200 BPM.'),
+    'blood_glucose': (50, 500, 'Blood glucose must be between 50 and 500 mg/dL.'),
+    'temperature': (95, 110, 'Temperature must be between 95 and 110°F.'),
+    'sleep_hours': (0, 24, 'Sleep hours must be between 0 and 24.'),
+    'exercise_minutes': (0, 480, 'Exercise minutes must be between 0 and 480.'),
+    'water_intake_liters': (0, 10, 'Water intake must be between 0 and 10 liters.'),
+}
+
+
 class DailyLogForm(forms.ModelForm):
     """Form for creating and editing daily health logs"""
     
@@ -293,50 +307,33 @@ class DailyLogForm(forms.ModelForm):
         self.fields['stress_level'].choices = [('', 'Select stress level')] + [(i, i) for i in range(1, 6)]
         self.fields['mood_rating'].choices = [('', 'Select mood rating')] + [(i, i) for i in range(1, 11)]
 
+    def _clean_range(self, field):
+        value = self.cleaned_data.get(field)
+        low, high, message = DAILY_LOG_RANGES[field]
+        if value is not None and (value < low or value > high):
+            raise forms.ValidationError(message)
+        return value
+
     def clean_systolic_bp(self):
-        systolic = self.cleaned_data.get('systolic_bp')
-        if systolic is not None and (systolic < 50 or systolic > 250):
-            raise forms.ValidationError('Systolic blood pressure must be between 50 and 250.')
-        return systolic
+        return self._clean_range('systolic_bp')
 
     def clean_diastolic_bp(self):
-        diastolic = self.cleaned_data.get('diastolic_bp')
-        if diastolic is not None and (diastolic < 30 or diastolic > 150):
-            raise forms.ValidationError('Diastolic blood pressure must be between 30 and 150.')
-        return diastolic
+        return self._clean_range('diastolic_bp')
 
     def clean_heart_rate(self):
-        heart_rate = self.cleaned_data.get('heart_rate')
-        if heart_rate is not None and (heart_rate < 30 or heart_rate > 200):
-            raise forms.ValidationError('Heart rate must be between 30 and 200 BPM.')
-        return heart_rate
+        return self._clean_range('heart_rate')
 
     def clean_blood_glucose(self):
-        glucose = self.cleaned_data.get('blood_glucose')
-        if glucose is not None and (glucose < 50 or glucose > 500):
-            raise forms.ValidationError('Blood glucose must be between 50 and 500 mg/dL.')
-        return glucose
+        return self._clean_range('blood_glucose')
 
     def clean_temperature(self):
-        temp = self.cleaned_data.get('temperature')
-        if temp is not None and (temp < 95 or temp > 110):
-            raise forms.ValidationError('Temperature must be between 95 and 110°F.')
-        return temp
+        return self._clean_range('temperature')
 
     def clean_sleep_hours(self):
-        sleep = self.cleaned_data.get('sleep_hours')
-        if sleep is not None and (sleep < 0 or sleep > 24):
-            raise forms.ValidationError('Sleep hours must be between 0 and 24.')
-        return sleep
+        return self._clean_range('sleep_hours')
 
     def clean_exercise_minutes(self):
-        exercise = self.cleaned_data.get('exercise_minutes')
-        if exercise is not None and (exercise < 0 or exercise > 480):
-            raise forms.ValidationError('Exercise minutes must be between 0 and 480.')
-        return exercise
+        return self._clean_range('exercise_minutes')
 
     def clean_water_intake_liters(self):
-        water = self.cleaned_data.get('water_intake_liters')
-        if water is not None and (water < 0 or water > 10):
-            raise forms.ValidationError('Water intake must be between 0 and 10 liters.')
-        return water
+        return self._clean_range('water_intake_liters')
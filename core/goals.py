@@ -0,0 +1,248 @@
+# core/goals.py
+#
+# Incremental goal evaluation.
+#
+# Each UserGoal keeps a GoalProgress row of running counters (days on
+# target, current/best streak, latest value) and one GoalDay row per
+# evaluated day. Saving or editing a DailyLog (or a StabilityScore, for
+# stability goals) only touches that day: the counters move by the change
+# in that day's outcome instead of re-aggregating the history. Only a new
+# latest day extends the streaks incrementally; a change that can join or
+# split runs (an older day, a met day turning unmet, a deletion) recounts
+# them from the goal's GoalDay rows, one indexed query. Achievements
+# are awarded by a stable ``key`` per (user, milestone), so crossing the
+# same threshold twice never creates a second row.
+
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import archive
+from .models import Achievement, GoalDay, GoalProgress, StabilityScore, UserGoal
+
+DAYS_MET_MILESTONES = [7, 30, 100]
+STREAK_MILESTONES = [3, 7, 30]
+
+
+# --------------------------
+# Daily outcomes
+# --------------------------
+
+def _at_least(field):
+    def evaluate(values, goal):
+        value = values.get(field)
+        return value, value is not None and value >= goal.target_value
+    return evaluate
+
+
+def _medication(values, goal):
+    taken = bool(values.get("medication_taken"))
+    return (1.0 if taken else 0.0), taken
+
+
+def _diet(values, goal):
+    logged = bool((values.get("diet_notes") or "").strip())
+    return (1.0 if logged else 0.0), logged
+
+
+# goal_type -> callable(log values, goal) -> (value, met)
+LOG_EVALUATORS = {
+    "medication": _medication,
+    "exercise": _at_least("exercise_minutes"),
+    "sleep": _at_least("sleep_hours"),
+    "diet": _diet,
+}
+SCORE_EVALUATORS = {
+    "stability": _at_least("score_value"),
+}
+LOG_FIELDS = ["log_date", "medication_taken", "exercise_minutes", "sleep_hours", "diet_notes"]
+
+
+def _log_values(log):
+    return {field: getattr(log, field) for field in LOG_FIELDS}
+
+
+# --------------------------
+# Incremental updates
+# --------------------------
+
+def _count_streaks(days):
+    """``(current, best)`` streaks over ``(day, met)`` pairs, oldest first.
+
+    The current streak is the run ending at the last day.
+    """
+    current = best = 0
+    previous = None
+    for day, met in days:
+        if not met:
+            current = 0
+        elif previous is not None and day == previous + datetime.timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        best = max(best, current)
+        previous = day
+    return current, best
+
+
+def _recount_streaks(goal, progress):
+    days = GoalDay.objects.filter(goal=goal).order_by("day").values_list("day", "met")
+    progress.current_streak, progress.best_streak = _count_streaks(days.iterator(chunk_size=1000))
+
+
+def record_day(goal, day, value, met):
+    """Store ``goal``'s outcome for ``day`` and move its counters by the difference."""
+    with transaction.atomic():
+        progress, _ = GoalProgress.objects.select_for_update().get_or_create(goal=goal)
+        before = (progress.days_met, progress.best_streak)
+        existing = GoalDay.objects.filter(goal=goal, day=day).first()
+        if existing is not None and existing.value == value and existing.met == met:
+            return progress
+
+        was_met = existing.met if existing is not None else None
+        if existing is None:
+            GoalDay.objects.create(goal=goal, day=day, value=value, met=met)
+            progress.days_met += int(met)
+        else:
+            progress.days_met += int(met) - int(existing.met)
+            existing.value, existing.met = value, met
+            existing.save(update_fields=["value", "met"])
+
+        previous_last = progress.last_date
+        if previous_last is None or day >= previous_last:
+            progress.last_date = day
+            progress.last_value = value
+        if was_met == met:
+            pass  # only the value changed; the streaks stand
+        elif was_met is None and (previous_last is None or day > previous_last):
+            # A new latest day extends or restarts the current run
+            if met and previous_last is not None and day == previous_last + datetime.timedelta(days=1):
+                progress.current_streak += 1
+            else:
+                progress.current_streak = int(met)
+            progress.best_streak = max(progress.best_streak, progress.current_streak)
+        else:
+            _recount_streaks(goal, progress)
+        progress.save()
+
+        award_achievements(goal, progress, before)
+    return progress
+
+
+def remove_day(goal, day):
+    """Forget ``goal``'s outcome for ``day`` (its log was deleted)."""
+    with transaction.atomic():
+        progress = GoalProgress.objects.select_for_update().filter(goal=goal).first()
+        existing = GoalDay.objects.filter(goal=goal, day=day).first()
+        if progress is None or existing is None:
+            return
+        existing.delete()
+        progress.days_met -= int(existing.met)
+        if day == progress.last_date:
+            latest = GoalDay.objects.filter(goal=goal).order_by("-day").first()
+            progress.last_date = latest.day if latest else None
+            progress.last_value = latest.value if latest else None
+        _recount_streaks(goal, progress)
+        progress.save()
+
+
+def evaluate_log(log):
+    """Update every log-based goal of the log's owner for ``log.log_date``."""
+    values = _log_values(log)
+    for goal in UserGoal.objects.filter(user_id=log.user_id, goal_type__in=LOG_EVALUATORS):
+        value, met = LOG_EVALUATORS[goal.goal_type](values, goal)
+        record_day(goal, log.log_date, value, met)
+
+
+def forget_log(log):
+    for goal in UserGoal.objects.filter(user_id=log.user_id, goal_type__in=LOG_EVALUATORS):
+        remove_day(goal, log.log_date)
+
+
+def evaluate_score(score):
+    """Stability goals are judged on the latest StabilityScore of each day."""
+    values = {"score_value": score.score_value}
+    day = timezone.localdate(score.score_date)
+    for goal in UserGoal.objects.filter(user_id=score.user_id, goal_type__in=SCORE_EVALUATORS):
+        value, met = SCORE_EVALUATORS[goal.goal_type](values, goal)
+        record_day(goal, day, value, met)
+
+
+# --------------------------
+# Achievements
+# --------------------------
+
+def _milestones(goal, progress):
+    """``(key, title, description, reached)`` for every milestone of ``goal``."""
+    label = goal.get_goal_type_display()
+    for n in DAYS_MET_MILESTONES:
+        yield (f"goal:{goal.pk}:days:{n}", f"{label}: {n} days on target",
+               f"You met your {label.lower()} goal on {n} days.", progress.days_met >= n)
+    for n in STREAK_MILESTONES:
+        yield (f"goal:{goal.pk}:streak:{n}", f"{label}: {n}-day streak",
+               f"You met your {label.lower()} goal {n} days in a row.", progress.best_streak >= n)
+    if goal.unit == "days" and goal.target_value:
+        yield (f"goal:{goal.pk}:complete", f"{label} goal reached",
+               f"You reached your target of {goal.target_value:g} days.", progress.days_met >= goal.target_value)
+
+
+def award_achievements(goal, progress, before=None):
+    """Create the Achievements ``progress`` has earned; returns how many are new.
+
+    With ``before`` (the previous ``(days_met, best_streak)``) nothing is
+    queried unless a counter actually went up.
+    """
+    if before is not None and progress.days_met <= before[0] and progress.best_streak <= before[1]:
+        return 0
+    earned = [(key, title, description) for key, title, description, reached in _milestones(goal, progress) if reached]
+    if not earned:
+        return 0
+    have = set(Achievement.objects
+               .filter(user_id=goal.user_id, key__in=[key for key, _, _ in earned])
+               .values_list("key", flat=True))
+    new = [Achievement(user_id=goal.user_id, key=key, title=title, description=description)
+           for key, title, description in earned if key not in have]
+    # ignore_conflicts: a concurrent evaluation may have just awarded the same key
+    Achievement.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+# --------------------------
+# Full recomputation
+# --------------------------
+
+def _history(goal):
+    """Yield ``(day, value, met)`` for the goal's whole history, oldest first."""
+    if goal.goal_type in LOG_EVALUATORS:
+        evaluate = LOG_EVALUATORS[goal.goal_type]
+        for row in archive.iter_logs(goal.user_id, fields=LOG_FIELDS):
+            yield (row["log_date"], *evaluate(row, goal))
+    elif goal.goal_type in SCORE_EVALUATORS:
+        evaluate = SCORE_EVALUATORS[goal.goal_type]
+        latest_per_day = {}
+        rows = StabilityScore.objects.filter(user_id=goal.user_id).order_by("score_date").values("score_date", "score_value")
+        for row in rows.iterator(chunk_size=1000):
+            latest_per_day[timezone.localdate(row["score_date"])] = row
+        for day, row in latest_per_day.items():
+            yield (day, *evaluate(row, goal))
+
+
+def recompute_goal(goal):
+    """Rebuild a goal's days and counters from scratch (new goal, changed target, backfill)."""
+    days = [GoalDay(goal=goal, day=day, value=value, met=met) for day, value, met in _history(goal)]
+    days_met = sum(int(entry.met) for entry in days)
+    current, best = _count_streaks((entry.day, entry.met) for entry in days)
+
+    with transaction.atomic():
+        GoalDay.objects.filter(goal=goal).delete()
+        GoalDay.objects.bulk_create(days, batch_size=1000)
+        progress, _ = GoalProgress.objects.select_for_update().get_or_create(goal=goal)
+        progress.days_met = days_met
+        progress.current_streak = current
+        progress.best_streak = best
+        progress.last_date = days[-1].day if days else None
+        progress.last_value = days[-1].value if days else None
+        progress.save()
+        award_achievements(goal, progress)
+    return progress
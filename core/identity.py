@@ -0,0 +1,99 @@
+# core/identity.py
+#
+# Request-scoped identity: the signed-in user together with their
+# UserProfile and Clinician rows.
+#
+# IdentityBackend loads the session's user with both related rows in one
+# LEFT JOINed query, so ``request.identity`` (set lazily by
+# IdentityMiddleware) costs nothing extra and views no longer look up the
+# profile or clinician themselves. The loaded user is also kept in the
+# ``identity`` cache namespace for IDENTITY_CACHE_TIMEOUT seconds (0 turns
+# it off); saving or deleting the user, profile or clinician drops it.
+
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import SimpleLazyObject
+
+from .cache import Namespace
+
+User = get_user_model()
+
+RELATIONS = ('userprofile', 'clinician')
+
+identity_cache = Namespace("identity", timeout=30)
+
+
+def _cache_timeout():
+    return getattr(settings, 'IDENTITY_CACHE_TIMEOUT', 30)
+
+
+def _query_user(user_id):
+    return User._default_manager.select_related(*RELATIONS).filter(pk=user_id).first()
+
+
+def load_user(user_id):
+    """The user with their profile and clinician rows attached, or None."""
+    timeout = _cache_timeout()
+    if not timeout:
+        return _query_user(user_id)
+    user = identity_cache.get_or_set("user", lambda: _query_user(user_id), timeout=timeout, group=f"user:{user_id}")
+    return copy.deepcopy(user)  # L1 hands out shared objects; each request gets its own
+
+
+def invalidate_user(user_id):
+    # Not gated on the timeout, so a cache switched back on never serves a stale user
+    identity_cache.invalidate(group=f"user:{user_id}")
+
+
+def _related(user, name):
+    try:
+        return getattr(user, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+class Identity:
+    def __init__(self, user):
+        self.user = user
+        if not user.is_authenticated:
+            self.profile = self.clinician = None
+            return
+        if not all(name in user._state.fields_cache for name in RELATIONS):
+            # Signed in through another backend: fetch the relations once
+            loaded = load_user(user.pk)
+            for name in RELATIONS:
+                user._state.fields_cache[name] = loaded._state.fields_cache.get(name) if loaded else None
+        self.profile = _related(user, 'userprofile')
+        self.clinician = _related(user, 'clinician')
+
+    def set_profile(self, profile):
+        self.profile = profile
+        self.user._state.fields_cache['userprofile'] = profile
+
+
+def get_identity(request):
+    """The request's Identity, built once per request."""
+    if not hasattr(request, '_identity'):
+        request._identity = Identity(request.user)
+    return request._identity
+
+
+class IdentityBackend(ModelBackend):
+    """ModelBackend whose session user comes with profile and clinician attached."""
+
+    def get_user(self, user_id):
+        user = load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class IdentityMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity = SimpleLazyObject(lambda: get_identity(request))
+        return self.get_response(request)
@@ -0,0 +1,330 @@
+# core/ingest.py
+#
+# Batch ingestion for machines: phone apps and device sync services post
+# many days' (and many patients') data in one request instead of one
+# DailyLogForm per day.
+#
+# POST /api/ingest/ with ``Authorization: Bearer <IngestToken key>`` and
+# either JSON (a list of records, or {"records": [...]}) or NDJSON
+# (Content-Type application/x-ndjson, one record per line). Two kinds of
+# record:
+#
+#   {"user": 12, "log_date": "2026-10-18", "heart_rate": 72, "sleep_hours": 7.5}
+#       upserts that day's DailyLog; fields left out are not touched
+#   {"user": 12, "metric": "heart_rate", "readings": [["2026-10-18T08:00:00Z", 72], ...]}
+#       adds wearable readings (core.vitals), which roll up into DailyLog;
+#       readings outside the metric's range are dropped and counted
+#
+# "user" is implied by a token bound to one patient. The batch is checked
+# one column at a time (one pass per field over every record) against the
+# DailyLogForm ranges (forms.DAILY_LOG_RANGES) and is all or nothing: any
+# invalid record fails the request with the list of errors. A valid batch
+# is written in one transaction, with one INSERT .. ON CONFLICT (user,
+# log_date) DO UPDATE per set of fields.
+#
+# Bulk upserts skip DailyLog's post_save signal, so dashboard caches are
+# invalidated here and goal progress is brought up to date by one job per
+# user (tasks.evaluate_logs).
+#
+# With an ``Idempotency-Key`` header the response is stored under the key;
+# retrying the same body returns it without writing anything, and reusing
+# the key for a different body is refused.
+
+import datetime
+import hashlib
+import json
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from jobs.queue import enqueue
+from . import tasks, vitals
+from .cache import dashboard_cache
+from .forms import DAILY_LOG_RANGES, DailyLogForm
+from .models import DailyLog, IngestRequest, IngestToken
+
+MAX_RECORDS = getattr(settings, 'INGEST_MAX_RECORDS', 10000)
+IDEMPOTENCY_HOURS = getattr(settings, 'INGEST_IDEMPOTENCY_HOURS', 24)
+MAX_ERRORS = 100  # errors reported per failed request
+BATCH_SIZE = 500
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+class IngestError(Exception):
+    """The request body can't be ingested; ``errors`` lists the offending records."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+# --------------------------
+# Field conversion
+# --------------------------
+
+def _integer(value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError(value)
+    return value
+
+
+def _text(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+# internal type -> (converter, error message)
+CONVERTERS = {
+    "IntegerField": (_integer, "Enter a whole number."),
+    "FloatField": (_number, "Enter a number."),
+    "BooleanField": (_boolean, "Enter true or false."),
+    "TextField": (_text, "Enter text."),
+}
+LOG_FIELDS = {name: DailyLog._meta.get_field(name) for name in DailyLogForm.Meta.fields}
+RECORD_KEYS = {"user", "log_date", *LOG_FIELDS}
+SERIES_KEYS = {"user", "metric", "readings"}
+
+
+# --------------------------
+# Parsing and validation
+# --------------------------
+
+def parse(body, content_type):
+    """The records of a JSON or NDJSON request body."""
+    try:
+        if content_type in NDJSON_TYPES:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        data = json.loads(body)
+    except ValueError as e:
+        raise IngestError(f"Invalid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        raise IngestError('Send a list of records or {"records": [...]}')
+    return data
+
+
+def validate(records, token):
+    """Check a batch; returns ``(logs, series)`` ready for ``write``.
+
+    ``logs`` maps ``(user_id, date)`` to the fields to set (later records for
+    the same day win field by field); ``series`` maps ``(user_id, metric)``
+    to ``(datetime, value)`` readings. Raises IngestError listing every
+    problem found.
+    """
+    if len(records) > MAX_RECORDS:
+        raise IngestError(f"At most {MAX_RECORDS} records per request")
+    errors = []
+
+    def error(index, field, message):
+        errors.append({"record": index, "field": field, "error": message})
+
+    users = [None] * len(records)
+    log_rows, series_rows = [], []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            error(i, None, "Each record must be an object.")
+            continue
+        user_id = record.get("user", token.user_id)
+        if token.user_id is not None and user_id != token.user_id:
+            error(i, "user", "This token can only write its own user's data.")
+        elif isinstance(user_id, bool) or not isinstance(user_id, int):
+            error(i, "user", "A user id is required.")
+        else:
+            users[i] = user_id
+        (series_rows if "metric" in record else log_rows).append(i)
+        unknown = set(record) - (SERIES_KEYS if "metric" in record else RECORD_KEYS)
+        if unknown:
+            error(i, None, f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    known = set(get_user_model().objects.filter(pk__in={u for u in users if u is not None})
+                .values_list("pk", flat=True))
+    for i, user_id in enumerate(users):
+        if user_id is not None and user_id not in known:
+            error(i, "user", f"Unknown user {user_id}.")
+
+    # Daily log records, one column at a time
+    dates = {}
+    for i in log_rows:
+        raw = records[i].get("log_date")
+        try:
+            day = parse_date(raw) if isinstance(raw, str) else None
+        except ValueError:  # well formed but not a real date
+            day = None
+        if day is None:
+            error(i, "log_date", "Enter a date as YYYY-MM-DD.")
+        dates[i] = day
+    values = {i: {} for i in log_rows}
+    for name, field in LOG_FIELDS.items():
+        convert, message = CONVERTERS[field.get_internal_type()]
+        low, high, range_message = DAILY_LOG_RANGES.get(name, (None, None, None))
+        choices = {choice for choice, _ in field.choices} if field.choices else None
+        for i in log_rows:
+            if name not in records[i]:
+                continue
+            raw = records[i][name]
+            if raw is None:
+                if not field.null:
+                    error(i, name, "This field cannot be null.")
+                else:
+                    values[i][name] = None
+                continue
+            try:
+                value = convert(raw)
+            except (TypeError, ValueError):
+                error(i, name, message)
+                continue
+            if low is not None and (value < low or value > high):
+                error(i, name, range_message)
+            elif choices is not None and value not in choices:
+                error(i, name, f"Select a valid choice. {value} is not one of the available choices.")
+            else:
+                values[i][name] = value
+
+    # Wearable readings
+    series = defaultdict(list)
+    for i in series_rows:
+        metric, readings = records[i].get("metric"), records[i].get("readings")
+        if metric not in vitals.METRICS:
+            error(i, "metric", f"Unknown metric {metric!r}.")
+            continue
+        if not isinstance(readings, list):
+            error(i, "readings", "Send readings as a list of [timestamp, value] pairs.")
+            continue
+        parsed = []
+        for reading in readings:
+            try:
+                at, value = reading
+                at = parse_datetime(at)
+                value = _number(value)
+            except (TypeError, ValueError):
+                at = None
+            if at is None:
+                error(i, "readings", f"Invalid reading {reading!r}: expected [ISO timestamp, number].")
+                break
+            parsed.append((timezone.make_aware(at) if timezone.is_naive(at) else at, value))
+        else:
+            series[(users[i], metric)].extend(parsed)
+
+    if errors:
+        errors.sort(key=lambda item: item["record"])
+        raise IngestError(f"{len(errors)} invalid field(s); nothing was saved", errors)
+
+    logs = {}
+    for i in log_rows:
+        logs.setdefault((users[i], dates[i]), {}).update(values[i])
+    return logs, dict(series)
+
+
+# --------------------------
+# Writing
+# --------------------------
+
+def write(logs, series):
+    """Upsert a validated batch in one transaction; returns the response summary."""
+    groups = defaultdict(list)
+    for (user_id, day), fields in logs.items():
+        groups[tuple(sorted(fields))].append(DailyLog(user_id=user_id, log_date=day, **fields))
+
+    stored = rejected = 0
+    days_by_user = defaultdict(set)
+    for user_id, day in logs:
+        days_by_user[user_id].add(day.isoformat())
+    started = timezone.now()
+    with transaction.atomic():
+        for fields, batch in groups.items():
+            DailyLog.objects.bulk_create(batch, batch_size=BATCH_SIZE, update_conflicts=True,
+                                         unique_fields=["user", "log_date"], update_fields=[*fields, "updated_at"])
+        for (user_id, metric), readings in series.items():
+            added, dropped = vitals.ingest(user_id, metric, readings)
+            stored += added
+            rejected += dropped
+        for user_id, days in days_by_user.items():
+            enqueue(tasks.evaluate_logs, args=(user_id, sorted(days)))
+        users = set(days_by_user) | {user_id for user_id, _ in series}
+        # Restamp what the batch wrote so the sync API sees it committed
+        # right after its updated_at, however long the batch took (core.sync)
+        DailyLog.objects.filter(user_id__in=users, updated_at__gte=started).update(updated_at=timezone.now())
+        transaction.on_commit(lambda: [dashboard_cache.invalidate(group=f"user:{user_id}") for user_id in users])
+    return {"logs": len(logs), "readings": stored, "rejected_readings": rejected, "users": len(users)}
+
+
+# --------------------------
+# Requests
+# --------------------------
+
+def authenticate(request):
+    """The active IngestToken named by the request's bearer token, or None."""
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not key.strip():
+        return None
+    token = IngestToken.objects.filter(key_hash=IngestToken.hash_key(key.strip()), is_active=True).first()
+    if token is not None:
+        now = timezone.now()
+        if token.last_used_at is None or now - token.last_used_at > datetime.timedelta(minutes=1):
+            IngestToken.objects.filter(pk=token.pk).update(last_used_at=now)
+    return token
+
+
+def _expiry():
+    return timezone.now() - datetime.timedelta(hours=IDEMPOTENCY_HOURS)
+
+
+def _previous(token, key):
+    return IngestRequest.objects.filter(token=token, key=key, created_at__gte=_expiry()).first()
+
+
+def _replay(previous, digest):
+    if previous.request_hash != digest:
+        return 422, {"error": "This Idempotency-Key was already used for a different request body"}, False
+    return previous.status, previous.response, True
+
+
+def handle(token, body, content_type, key=""):
+    """Ingest one request body; returns ``(status, payload, replayed)``."""
+    digest = hashlib.sha256(body).hexdigest()
+    if key:
+        previous = _previous(token, key)
+        if previous is not None:
+            return _replay(previous, digest)
+
+    try:
+        logs, series = validate(parse(body, content_type), token)
+    except IngestError as e:
+        return 400, {"error": str(e), "errors": e.errors[:MAX_ERRORS]}, False
+
+    try:
+        with transaction.atomic():
+            result = write(logs, series)
+            if key:
+                # Expired keys may be reused; drop every expired response while at it
+                IngestRequest.objects.filter(created_at__lt=_expiry()).delete()
+                IngestRequest.objects.create(token=token, key=key, request_hash=digest, status=200, response=result)
+    except IntegrityError:
+        # A concurrent request with the same key got there first; this one was rolled back
+        previous = _previous(token, key) if key else None
+        if previous is None:
+            raise
+        return _replay(previous, digest)
+    return 200, result, False
@@ -0,0 +1,62 @@
+# core/llm.py
+#
+# Thin client for the Groq (OpenAI-compatible) chat completions API, shared
+# by every feature that talks to the LLM.
+
+import hashlib
+import json
+import re
+import time
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import llm_cache
+from .metrics import record_llm_call
+from .timing import measure
+
+_CODE_FENCE = re.compile(r"```json|```")
+
+
+def chat_completion(prompt, timeout=None, cache_timeout=None, **options):
+    """Send a single-message chat completion and return the reply text.
+
+    Extra keyword arguments (temperature, max_tokens, ...) are passed through
+    in the request payload. HTTP errors are raised as
+    ``requests.exceptions.HTTPError``; a missing GROQ_API_KEY raises
+    ImproperlyConfigured. With ``cache_timeout`` (seconds) the reply to an
+    identical model/prompt/options request is reused.
+    """
+    if not settings.GROQ_API_KEY:
+        raise ImproperlyConfigured("GROQ_API_KEY is not set; export it to use the LLM features")
+    if cache_timeout:
+        request = json.dumps([settings.GROQ_MODEL, prompt, options], sort_keys=True)
+        key = hashlib.sha256(request.encode()).hexdigest()
+        return llm_cache.get_or_set(key, lambda: chat_completion(prompt, timeout, **options), timeout=cache_timeout)
+
+    headers = {
+        "Authorization": f"Bearer {settings.GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        **options,
+    }
+    started = time.perf_counter()
+    try:
+        with measure("llm"):
+            response = requests.post(settings.GROQ_API_URL, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        body = response.json()
+    except Exception:
+        record_llm_call(time.perf_counter() - started, ok=False)
+        raise
+    record_llm_call(time.perf_counter() - started, ok=True, usage=body.get("usage"))
+    return body["choices"][0]["message"]["content"]
+
+
+def strip_code_fences(text):
+    """Remove markdown ```json fences the model sometimes wraps JSON in."""
+    return _CODE_FENCE.sub("", text).strip()
@@ -0,0 +1,232 @@
+# core/loadtest.py
+#
+# Closed-loop load generator for the LLM-bound endpoints and the dashboards
+# (``manage.py load_test``).
+#
+# Each virtual user is signed in as its own seeded patient, sends a request,
+# waits for the answer (plus an optional think time) and sends the next, so
+# the offered load adapts to how fast the app answers, the way real clients
+# do. Requests go straight into Django's WSGI or ASGI handler through the
+# test clients, but first pass a fixed number of worker slots standing in for
+# the server's workers/threads: when every slot is busy requests queue, and
+# the report shows that wait separately from the time spent in the app.
+
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from .models import PatientClinician
+
+# name -> (method, url name, role)
+SCENARIOS = {
+    "predict": ("post", "core:predict-patient", "patient"),
+    "goal-data": ("get", "core:goal_data_api", "patient"),
+    "user-dashboard": ("get", "core:user-dashboard", "patient"),
+    "doctor-dashboard": ("get", "core:doctor-dashboard", "doctor"),
+}
+LLM_SCENARIOS = ("predict", "goal-data")
+
+
+def predict_payload(rng):
+    """A plausible stability-check form submission; random, so the LLM cache misses."""
+    return {
+        "age": rng.randint(25, 85),
+        "gender": rng.choice(["Male", "Female"]),
+        "systolic_bp": rng.randint(100, 175),
+        "diastolic_bp": rng.randint(60, 110),
+        "heart_rate": rng.randint(55, 110),
+        "blood_glucose": rng.randint(70, 260),
+        "sleep_hours": round(rng.uniform(4, 9), 1),
+        "medications": rng.choice(["Amlodipine", "Metformin", "None", "Atorvastatin"]),
+    }
+
+
+def load_accounts(limit):
+    """(patient, doctor) pairs of seeded patients that have a clinician."""
+    links = PatientClinician.objects.select_related("patient", "clinician__user").order_by("pk")[:limit]
+    return [(link.patient, link.clinician.user) for link in links]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class WorkerSlots:
+    """Bookkeeping for the simulated server workers: busy time and peak use."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.busy = 0.0
+        self.in_use = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+        return time.perf_counter()
+
+    def leave(self, started):
+        with self._lock:
+            self.in_use -= 1
+            self.busy += time.perf_counter() - started
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (scenario, status, wait seconds, service seconds)
+        self._lock = threading.Lock()
+
+    def add(self, scenario, status, wait, service):
+        with self._lock:
+            self.samples.append((scenario, status, wait, service))
+
+    def summary(self, elapsed, slots):
+        def describe(samples):
+            latencies = [(wait + service) * 1000 for _, _, wait, service in samples]
+            waits = [wait * 1000 for _, _, wait, _ in samples]
+            errors = sum(1 for _, status, _, _ in samples if status is None or status >= 500)
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0,
+                "p50_ms": round(statistics.median(latencies), 1),
+                "p95_ms": round(_percentile(latencies, 95), 1),
+                "p99_ms": round(_percentile(latencies, 99), 1),
+                "max_ms": round(max(latencies), 1),
+                "queue_wait_ms": round(statistics.mean(waits), 1),
+            }
+
+        by_scenario = {}
+        for sample in self.samples:
+            by_scenario.setdefault(sample[0], []).append(sample)
+        statuses = {}
+        for _, status, _, _ in self.samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total": describe(self.samples) if self.samples else {},
+            "scenarios": {name: describe(samples) for name, samples in sorted(by_scenario.items())},
+            "statuses": statuses,
+            "workers": {
+                "slots": slots.workers,
+                "peak_in_use": slots.peak,
+                "utilisation": round(slots.busy / (slots.workers * elapsed), 3) if elapsed else 0,
+                "queued_share": round(sum(1 for s in self.samples if s[2] > 0.001) / len(self.samples), 3)
+                if self.samples else 0,
+            },
+        }
+
+
+class LoadTest:
+    def __init__(self, scenarios, accounts, concurrency=8, workers=None, duration=30, think_time=0.0,
+                 repeat_payload=False, seed=0):
+        self.scenarios = list(scenarios)
+        self.accounts = accounts
+        self.concurrency = concurrency
+        self.slots = WorkerSlots(workers or concurrency)
+        self.duration = duration
+        self.think_time = think_time
+        self.repeat_payload = repeat_payload
+        self.seed = seed
+        self.recorder = Recorder()
+        self.urls = {name: reverse(url_name) for name, (_, url_name, _) in SCENARIOS.items()}
+
+    def _request(self, rng):
+        name = rng.choice(self.scenarios)
+        method, _, role = SCENARIOS[name]
+        kwargs = {}
+        if method == "post":
+            body = predict_payload(random.Random(0) if self.repeat_payload else rng)
+            kwargs = {"data": json.dumps(body), "content_type": "application/json"}
+        return name, method, role, kwargs
+
+    def _clients(self, client_class, index):
+        patient, doctor = self.accounts[index % len(self.accounts)]
+        clients = {"patient": client_class(raise_request_exception=False),
+                   "doctor": client_class(raise_request_exception=False)}
+        clients["patient"].force_login(patient)
+        clients["doctor"].force_login(doctor)
+        return clients
+
+    def run(self, app="wsgi"):
+        """Drive the app for ``duration`` seconds and return the summary."""
+        started = time.perf_counter()
+        if app == "asgi":
+            asyncio.run(self._run_asgi())
+        else:
+            self._run_wsgi()
+        return self.recorder.summary(time.perf_counter() - started, self.slots)
+
+    # WSGI: one thread per virtual user, a semaphore for the worker slots
+
+    def _run_wsgi(self):
+        gate = threading.BoundedSemaphore(self.slots.workers)
+        deadline = time.monotonic() + self.duration
+        clients = [self._clients(Client, i) for i in range(self.concurrency)]
+
+        def virtual_user(index):
+            rng = random.Random(self.seed + index)
+            try:
+                while time.monotonic() < deadline:
+                    name, method, role, kwargs = self._request(rng)
+                    queued = time.perf_counter()
+                    with gate:
+                        started = self.slots.enter()
+                        try:
+                            status = getattr(clients[index][role], method)(self.urls[name], **kwargs).status_code
+                        except Exception:
+                            status = None
+                        finally:
+                            self.slots.leave(started)
+                    self.recorder.add(name, status, started - queued, time.perf_counter() - started)
+                    if self.think_time:
+                        time.sleep(rng.expovariate(1 / self.think_time))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=virtual_user, args=(i,), name=f"vu-{i}") for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # ASGI: one task per virtual user on a single event loop. Sync views run
+    # through sync_to_async, so this also shows how much they serialise.
+
+    async def _run_asgi(self):
+        from asgiref.sync import sync_to_async
+
+        clients = [await sync_to_async(self._clients)(AsyncClient, i) for i in range(self.concurrency)]
+        gate = asyncio.Semaphore(self.slots.workers)
+        deadline = time.monotonic() + self.duration
+
+        async def virtual_user(index):
+            rng = random.Random(self.seed + index)
+            while time.monotonic() < deadline:
+                name, method, role, kwargs = self._request(rng)
+                queued = time.perf_counter()
+                async with gate:
+                    started = self.slots.enter()
+                    try:
+                        response = await getattr(clients[index][role], method)(self.urls[name], **kwargs)
+                        status = response.status_code
+                    except Exception:
+                        status = None
+                    finally:
+                        self.slots.leave(started)
+                self.recorder.add(name, status, started - queued, time.perf_counter() - started)
+                if self.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / self.think_time))
+
+        await asyncio.gather(*(virtual_user(i) for i in range(self.concurrency)))
+        await sync_to_async(connections.close_all)()
@@ -0,0 +1,37 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import ARCHIVE_AFTER_DAYS, archive_cutoff, archive_logs, restore_logs
+
+
+class Command(BaseCommand):
+    help = "Move daily logs older than LOG_ARCHIVE_AFTER_DAYS into monthly compressed archives (or back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=ARCHIVE_AFTER_DAYS,
+                            help=f"Archive whole months older than this many days (default {ARCHIVE_AFTER_DAYS})")
+        parser.add_argument("--user", type=int, action="append", help="Only this user id (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would move without moving it")
+        parser.add_argument("--restore", action="store_true", help="Move archived months back into DailyLog")
+        parser.add_argument("--since", help="With --restore: only months from YYYY-MM on")
+
+    def handle(self, *args, **options):
+        verb = "Would move" if options["dry_run"] else "Moved"
+        if options["restore"]:
+            since = None
+            if options["since"]:
+                try:
+                    since = datetime.datetime.strptime(options["since"], "%Y-%m").date()
+                except ValueError:
+                    raise CommandError("--since must look like YYYY-MM")
+            months, rows = restore_logs(since, options["user"], options["dry_run"])
+            self.stdout.write(self.style.SUCCESS(f"{verb} {rows} logs ({months} archived months) back to DailyLog."))
+            return
+
+        if options["since"]:
+            raise CommandError("--since only applies with --restore")
+        cutoff = archive_cutoff(older_than=options["older_than"])
+        months, rows = archive_logs(cutoff, options["user"], options["dry_run"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {rows} logs dated before {cutoff.isoformat()} into {months} monthly archives."))
@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.identity import invalidate_user
+from core.models import Clinician, UserProfile
+
+User = get_user_model()
+
+# Before: database sessions, plain ModelBackend, no identity cache
+BASELINE = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+    "IDENTITY_CACHE_TIMEOUT": 0,
+    "backend": "django.contrib.auth.backends.ModelBackend",
+}
+# After: the project settings (cached_db sessions, IdentityBackend, cached identity)
+CURRENT = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+    "IDENTITY_CACHE_TIMEOUT": 30,
+    "backend": "core.identity.IdentityBackend",
+}
+
+PAGES = [
+    ("home", "core:home", "patient"),
+    ("user dashboard", "core:user-dashboard", "patient"),
+    ("stability check", "core:stability-check", "patient"),
+    ("doctor dashboard", "core:doctor-dashboard", "doctor"),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Measure queries and time per request for the home page and dashboards with "
+            "database sessions versus cached sessions and the cached identity")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20, help="Requests per page and configuration")
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back, so the
+        # benchmark users and sessions never reach the database
+        users = []
+        try:
+            with transaction.atomic():
+                self._benchmark(options["requests"], users)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # Rolled-back ids can be reused; don't leave their cached identities behind
+            for user in users:
+                invalidate_user(user.pk)
+
+    def _benchmark(self, requests, users):
+        patient = User.objects.create_user("bench-patient", password="bench", is_user=True)
+        UserProfile.objects.create(user=patient, is_filled=True)
+        doctor = User.objects.create_user("bench-doctor", password="bench", is_doctor=True)
+        Clinician.objects.create(user=doctor, specialization="Cardiology", license_number="BENCH")
+        users.extend([patient, doctor])
+
+        results = {}
+        for label, config in (("before", BASELINE), ("after", CURRENT)):
+            with override_settings(SESSION_ENGINE=config["SESSION_ENGINE"],
+                                   IDENTITY_CACHE_TIMEOUT=config["IDENTITY_CACHE_TIMEOUT"],
+                                   ALLOWED_HOSTS=["*"]):
+                clients = {"patient": Client(), "doctor": Client()}
+                clients["patient"].force_login(patient, backend=config["backend"])
+                clients["doctor"].force_login(doctor, backend=config["backend"])
+                for name, url_name, who in PAGES:
+                    results[(name, label)] = self._measure(clients[who], reverse(url_name), requests)
+
+        self.stdout.write(f"{'page':<18} {'queries before':>15} {'after':>7} {'ms before':>10} {'after':>7}")
+        for name, _, _ in PAGES:
+            before, after = results[(name, "before")], results[(name, "after")]
+            self.stdout.write(
+                f"{name:<18} {before['queries']:>15.1f} {after['queries']:>7.1f} "
+                f"{before['ms']:>10.1f} {after['ms']:>7.1f}"
+            )
+
+    def _measure(self, client, url, requests):
+        client.get(url)  # warm the caches
+        queries, timings = [], []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        return {"queries": statistics.mean(queries), "ms": statistics.median(timings)}
@@ -0,0 +1,143 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+TABLE = "bench_db_writes"
+
+# Scratch SQLite databases, one per mode being compared
+SQLITE_MODES = {
+    "sqlite-rollback": {
+        "OPTIONS": {},
+        "PRAGMAS": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    },
+    "sqlite-wal": {
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        "PRAGMAS": settings.SQLITE_PRAGMAS,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ("Compare write throughput under contention: SQLite with the default rollback journal, "
+            "SQLite in WAL mode, and (with --configured) the configured default database")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads")
+        parser.add_argument("--writes", type=int, default=200, help="Transactions per writer")
+        parser.add_argument("--configured", action="store_true",
+                            help="Also benchmark the 'default' database (e.g. PostgreSQL)")
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp(prefix="vitalcircle-bench-")
+        aliases = []
+        base = connections["default"].settings_dict
+        for mode, overrides in SQLITE_MODES.items():
+            connections.settings[mode] = {
+                **base,
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(tmpdir, f"{mode}.sqlite3"),
+                "CONN_MAX_AGE": 0,
+                "TEST": {},
+                **overrides,
+            }
+            aliases.append(mode)
+        if options["configured"]:
+            aliases.append("default")
+
+        self.stdout.write(f"{options['writers']} writers x {options['writes']} transactions, "
+                          f"{options['readers']} readers\n")
+        for alias in aliases:
+            self._create_table(alias)
+            try:
+                result = self._run(alias, options["writers"], options["readers"], options["writes"])
+            finally:
+                self._drop_table(alias)
+            self.stdout.write(
+                f"{alias:<16} {result['tps']:>8.0f} writes/s  p50={result['p50']:.1f}ms  "
+                f"p95={result['p95']:.1f}ms  locked={result['errors']:<5} reads={result['reads']}"
+            )
+
+    def _create_table(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (user_id integer NOT NULL, day integer NOT NULL, "
+                f"value double precision, PRIMARY KEY (user_id, day))"
+            )
+
+    def _drop_table(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        connections[alias].close()
+
+    def _run(self, alias, writers, readers, writes):
+        latencies = []
+        errors = []
+        reads = []
+        done = threading.Event()
+
+        def writer(user_id):
+            try:
+                for i in range(writes):
+                    started = time.perf_counter()
+                    try:
+                        # Read-then-write, like editing a DailyLog
+                        with transaction.atomic(using=alias):
+                            with connections[alias].cursor() as cursor:
+                                cursor.execute(f"SELECT value FROM {TABLE} WHERE user_id = %s AND day = %s",
+                                               [user_id, i % 30])
+                                cursor.fetchone()
+                                cursor.execute(
+                                    f"INSERT INTO {TABLE} (user_id, day, value) VALUES (%s, %s, %s) "
+                                    f"ON CONFLICT (user_id, day) DO UPDATE SET value = excluded.value",
+                                    [user_id, i % 30, random.random()],
+                                )
+                    except OperationalError:
+                        errors.append(1)
+                        continue
+                    latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections[alias].close()
+
+        def reader():
+            count = 0
+            try:
+                while not done.is_set():
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*), AVG(value) FROM {TABLE}")
+                        cursor.fetchone()
+                    count += 1
+            except OperationalError:
+                errors.append(1)
+            finally:
+                reads.append(count)
+                connections[alias].close()
+
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        started = time.perf_counter()
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        latencies.sort()
+        return {
+            "tps": len(latencies) / elapsed if elapsed else 0,
+            "p50": statistics.median(latencies) if latencies else 0,
+            "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            "errors": len(errors),
+            "reads": sum(reads),
+        }
@@ -0,0 +1,200 @@
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.cache import dashboard_cache, forum_cache, l1, llm_cache
+from core.models import DailyLog, ForumPost, PatientClinician, StabilityScore, UserGoal
+from forums.models import Comment, Post, Topic
+from jobs.models import Job
+
+User = get_user_model()
+
+# (label, url name, role, url kwargs / query from the fixtures)
+PAGES = [
+    ("home", "core:home", "anonymous", None),
+    ("user dashboard", "core:user-dashboard", "patient", None),
+    ("stability check", "core:stability-check", "patient", None),
+    ("complete profile", "core:complete-profile", "patient", None),
+    ("edit profile", "core:edit-profile", "patient", None),
+    ("daily log form", "core:daily-log-create", "patient", None),
+    ("daily log list", "core:daily-log-list", "patient", None),
+    ("daily log detail", "core:daily-log-detail", "patient", lambda f: {"log_id": f["log_id"]}),
+    ("daily log edit", "core:daily-log-edit", "patient", lambda f: {"log_id": f["log_id"]}),
+    ("goal dashboard", "core:goal_dashboard", "patient", None),
+    ("goal data api", "core:goal_data_api", "patient", None),
+    ("doctor dashboard", "core:doctor-dashboard", "doctor", None),
+    ("patient panel", "core:patient-panel", "doctor", None),
+    ("patient panel api", "core:patient-panel-api", "doctor", None),
+    ("forum list", "forum_list", "patient", None),
+    ("forum topic", "topic_post_list", "patient", lambda f: {"slug": f["topic_slug"]}),
+    ("forum post", "post_detail", "patient", lambda f: {"pk": f["post_id"]}),
+    ("forum new post", "post_create", "patient", lambda f: {"slug": f["topic_slug"]}),
+    ("forum search", "forum_search", "patient", "?q=blood+pressure"),
+    ("login", "users:login", "anonymous", None),
+    ("patient register", "users:user_register", "anonymous", None),
+    ("doctor register", "users:doctor_register", "anonymous", None),
+]
+
+# Not benchmarked: they write, call the LLM or hold the connection open
+SKIPPED = {
+    "core:predict-patient": "POST, calls the LLM",
+    "core:generate-panel-reports": "POST, queues LLM report jobs",
+    "core:react": "POST",
+    "post_comment_stream": "server-sent event stream",
+    "users:logout": "ends the session",
+}
+# Pages measured without part of their work
+PARTIAL = {
+    "goal data api": "AI summary job is queued, never run (no LLM call)",
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _clear_caches():
+    l1.clear()
+    for namespace in (dashboard_cache, forum_cache, llm_cache):
+        namespace.invalidate()
+
+
+class Command(BaseCommand):
+    help = ("Measure p50/p95 latency and queries per request for every page of core, forums and users "
+            "against the current database (fill it with seed_data first)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=30, help="Measured requests per page")
+        parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per page first")
+        parser.add_argument("--cold", action="store_true", help="Clear the application caches before every request")
+        parser.add_argument("--label", default="", help="Name for this run in the JSON output, e.g. 100k")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--page", action="append", help="Only run pages whose label contains this (repeatable)")
+
+    def handle(self, *args, **options):
+        fixtures = self._fixtures()
+        pages = PAGES
+        if options["page"]:
+            pages = [page for page in PAGES if any(part in page[0] for part in options["page"])]
+
+        clients = {"anonymous": Client(), "patient": Client(), "doctor": Client()}
+        clients["patient"].force_login(fixtures["patient"])
+        clients["doctor"].force_login(fixtures["doctor"])
+
+        results = []
+        # goal_data_api hands its AI summary to tasks.goal_summary on the job
+        # queue, so with a placeholder key it measures the enqueue (then the
+        # poll for the pending job) and never reaches Groq. The jobs it
+        # queues are removed afterwards.
+        last_job = Job.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+        with override_settings(GROQ_API_KEY="bench-no-llm", ALLOWED_HOSTS=["*"]):
+            for label, url_name, role, extra in pages:
+                if callable(extra):
+                    url = reverse(url_name, kwargs=extra(fixtures))
+                else:
+                    url = reverse(url_name) + (extra or "")
+                results.append({"page": label, "url": url, "role": role,
+                                **self._measure(clients[role], url, options)})
+        Job.objects.filter(pk__gt=last_job, task="core.tasks.goal_summary").delete()
+
+        self._report(results)
+        if options["output"]:
+            payload = {"meta": self._meta(options, fixtures), "results": results, "skipped": SKIPPED,
+                       "partial": PARTIAL}
+            with open(options["output"], "w") as f:
+                json.dump(payload, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _fixtures(self):
+        """The busiest patient with a clinician, that clinician, and a post/topic/log to open."""
+        link = (PatientClinician.objects.annotate(logs=Count("patient__dailylog"))
+                .select_related("patient", "clinician__user").order_by("-logs").first())
+        if link is None:
+            raise CommandError("No patient with a clinician found; run seed_data first.")
+        log = DailyLog.objects.filter(user=link.patient).order_by("-log_date").first()
+        post = Post.objects.annotate(comment_count=Count("comments")).order_by("-comment_count").first()
+        if log is None or post is None:
+            raise CommandError("Need daily logs and forum posts; run seed_data first.")
+        return {
+            "patient": link.patient,
+            "doctor": link.clinician.user,
+            "log_id": log.pk,
+            "post_id": post.pk,
+            "topic_slug": post.topic.slug,
+        }
+
+    def _measure(self, client, url, options):
+        for _ in range(options["warmup"]):
+            client.get(url)
+        timings, queries = [], []
+        status = None
+        for _ in range(options["requests"]):
+            if options["cold"]:
+                _clear_caches()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        return {
+            "status": status,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+            "max_ms": round(max(timings), 2),
+            "queries": round(statistics.mean(queries), 1),
+        }
+
+    def _report(self, results):
+        self.stdout.write(f"{'page':<20} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for row in results:
+            marker = " *" if row["page"] in PARTIAL else ""
+            self.stdout.write(f"{row['page']:<20} {row['status']:>6} {row['p50_ms']:>8.1f} "
+                              f"{row['p95_ms']:>8.1f} {row['queries']:>8.1f}{marker}")
+        for page, note in PARTIAL.items():
+            if any(row["page"] == page for row in results):
+                self.stdout.write(f"* {page}: {note}")
+
+    def _meta(self, options, fixtures):
+        return {
+            "label": options["label"],
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": connections["default"].vendor,
+            "requests": options["requests"],
+            "cold": options["cold"],
+            "rows": {
+                "users": User.objects.count(),
+                "daily_logs": DailyLog.objects.count(),
+                "stability_scores": StabilityScore.objects.count(),
+                "goals": UserGoal.objects.count(),
+                "group_posts": ForumPost.objects.count(),
+                "topics": Topic.objects.count(),
+                "forum_posts": Post.objects.count(),
+                "forum_comments": Comment.objects.count(),
+            },
+            "patient_logs": DailyLog.objects.filter(user=fixtures["patient"]).count(),
+        }
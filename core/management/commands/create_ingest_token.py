@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import IngestToken
+
+
+class Command(BaseCommand):
+    help = "Create a bearer token for the batch ingestion API (/api/ingest/) and print its key once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Who the token is for, e.g. the app or device service")
+        parser.add_argument("--user", type=int, help="Limit the token to this user id's data")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = get_user_model().objects.filter(pk=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user with id {options['user']}")
+        token, key = IngestToken.issue(options["name"], user=user)
+        scope = f"user {user.pk} only" if user else "any user"
+        self.stdout.write(self.style.SUCCESS(f"Created ingestion token {token.name!r} ({scope}). Key (not shown again):"))
+        self.stdout.write(key)
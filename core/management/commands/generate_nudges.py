@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.nudges import CHUNK_SIZE, run_nudges
+from core.tasks import schedule_nightly_nudges
+
+
+class Command(BaseCommand):
+    help = "Evaluate the nudge rules for every patient and create today's nudges (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Evaluate rules without saving nudges")
+        parser.add_argument('--schedule', action='store_true',
+                            help="Don't run now; queue the nightly job (runworker then runs it every night)")
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_nightly_nudges()
+            self.stdout.write(self.style.SUCCESS(f"Nightly nudges scheduled: job {job.pk} at {job.run_at:%Y-%m-%d %H:%M %Z}."))
+            return
+
+        started = time.monotonic()
+        created, metrics = run_nudges(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        for name, m in metrics.items():
+            self.stdout.write(
+                f"{name:<20} matched={m['matched']:<7} emitted={m['emitted']:<7} "
+                f"errors={m['errors']:<4} time={m['seconds']:.3f}s"
+            )
+        verb = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(f"{created} nudges {verb} in {elapsed:.1f}s."))
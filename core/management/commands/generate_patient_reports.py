@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Clinician
+from core.reports import REPORT_CONCURRENCY, generate_panel_reports
+
+
+class Command(BaseCommand):
+    help = "Generate PatientReports for every patient of one or all clinicians"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinician', type=int, help="Clinician id (default: all clinicians)")
+        parser.add_argument('--concurrency', type=int, default=REPORT_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        clinicians = Clinician.objects.all()
+        if options['clinician']:
+            clinicians = clinicians.filter(pk=options['clinician'])
+            if not clinicians.exists():
+                raise CommandError(f"Clinician {options['clinician']} does not exist.")
+
+        for clinician in clinicians:
+            reports = generate_panel_reports(clinician, concurrency=options['concurrency'])
+            self.stdout.write(f"Clinician {clinician.pk}: {len(reports)} reports generated.")
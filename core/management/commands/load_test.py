@@ -0,0 +1,115 @@
+import json
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.loadtest import LLM_SCENARIOS, SCENARIOS, LoadTest, load_accounts
+from core.mockllm import MockLLMServer
+from jobs.queue import queue_depth
+from jobs.worker import work_loop
+
+
+class Command(BaseCommand):
+    help = ("Closed-loop load test of /predict-patient/, /goal-data/ and the dashboards at a fixed concurrency, "
+            "reporting throughput, tail latency and worker saturation (seed the database first)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--app", choices=["wsgi", "asgi"], default="wsgi", help="Handler to drive")
+        parser.add_argument("--concurrency", type=int, default=8, help="Virtual users")
+        parser.add_argument("--workers", type=int,
+                            help="Server worker slots requests must get through (default: one per virtual user)")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument("--think-time", type=float, default=0, help="Mean pause between requests, in ms")
+        parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                            help="Endpoint to include (repeatable; default all)")
+        parser.add_argument("--repeat-payload", action="store_true",
+                            help="Send the same predict body every time (measures LLM cache hits)")
+        parser.add_argument("--mock-llm", metavar="LATENCY",
+                            help="Start an in-process mock LLM with this latency spec, e.g. lognormal:800:0.5")
+        parser.add_argument("--mock-error-rate", type=float, default=0.0)
+        parser.add_argument("--allow-real-llm", action="store_true",
+                            help="Permit LLM scenarios against the configured GROQ_API_URL without a mock")
+        parser.add_argument("--job-workers", type=int, default=2,
+                            help="Job queue worker threads running during the test (goal summaries)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the summary to this JSON file")
+
+    def handle(self, *args, **options):
+        scenarios = options["scenario"] or sorted(SCENARIOS)
+        uses_llm = any(name in LLM_SCENARIOS for name in scenarios)
+        if uses_llm and not options["mock_llm"] and "api.groq.com" in settings.GROQ_API_URL \
+                and not options["allow_real_llm"]:
+            raise CommandError("Refusing to load-test the real Groq API; pass --mock-llm (or run mock_llm "
+                               "and point GROQ_API_URL at it), or --allow-real-llm.")
+
+        accounts = load_accounts(options["concurrency"])
+        if not accounts:
+            raise CommandError("No patient with a clinician found; run seed_data first.")
+
+        mock = None
+        overrides = {"ALLOWED_HOSTS": ["*"]}
+        if options["mock_llm"]:
+            try:
+                mock = MockLLMServer(port=0, latency=options["mock_llm"], error_rate=options["mock_error_rate"],
+                                     seed=options["seed"]).start()
+            except ValueError as e:
+                raise CommandError(e)
+            overrides.update(GROQ_API_URL=mock.url, GROQ_API_KEY="mock")
+
+        stop = threading.Event()
+        job_workers = [threading.Thread(target=work_loop, args=(stop, f"load-test/{i}", 0.2), daemon=True)
+                       for i in range(options["job_workers"])]
+        test = LoadTest(scenarios, accounts, concurrency=options["concurrency"], workers=options["workers"],
+                        duration=options["duration"], think_time=options["think_time"] / 1000,
+                        repeat_payload=options["repeat_payload"], seed=options["seed"])
+
+        self.stdout.write(f"{options['app'].upper()}: {options['concurrency']} virtual users, "
+                          f"{test.slots.workers} worker slots, {options['duration']:g}s, "
+                          f"scenarios {', '.join(scenarios)}")
+        try:
+            with override_settings(**overrides):
+                for worker in job_workers:
+                    worker.start()
+                summary = test.run(options["app"])
+        finally:
+            stop.set()
+            for worker in job_workers:
+                worker.join()
+            if mock:
+                mock.stop()
+
+        summary["app"] = options["app"]
+        summary["concurrency"] = options["concurrency"]
+        summary["job_queue_depth"] = queue_depth()
+        if mock:
+            summary["mock_llm"] = mock.stats()
+        self._report(summary)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(summary, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Summary written to {options['output']}"))
+
+    def _report(self, summary):
+        self.stdout.write(f"{'scenario':<18} {'reqs':>6} {'errors':>6} {'rps':>7} {'p50':>8} {'p95':>8} "
+                          f"{'p99':>8} {'max':>8} {'wait':>7}")
+        rows = list(summary["scenarios"].items()) + [("total", summary["total"])]
+        for name, row in rows:
+            if not row:
+                continue
+            self.stdout.write(
+                f"{name:<18} {row['requests']:>6} {row['errors']:>6} {row['throughput_rps']:>7.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} "
+                f"{row['queue_wait_ms']:>7.1f}"
+            )
+        workers = summary["workers"]
+        self.stdout.write(
+            f"Workers: {workers['slots']} slots, peak {workers['peak_in_use']} busy, "
+            f"{workers['utilisation']:.0%} utilised, {workers['queued_share']:.0%} of requests queued. "
+            f"Statuses {summary['statuses']}. Job queue depth at end: {summary['job_queue_depth']}."
+        )
+        if "mock_llm" in summary:
+            mock = summary["mock_llm"]
+            self.stdout.write(f"Mock LLM: {mock['requests']} calls, {mock['errors']} injected errors, "
+                              f"peak {mock['peak_in_flight']} in flight.")
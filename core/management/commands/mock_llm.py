@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.mockllm import MockLLMServer
+
+
+class Command(BaseCommand):
+    help = ("Run a mock of the Groq chat completions API with configurable latency, error rate and "
+            "streaming; point GROQ_API_URL at it")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--latency", default="lognormal:800:0.5",
+                            help="Latency distribution in ms: fixed:MS, uniform:LO:HI, normal:MEAN:SD, "
+                                 "lognormal:MEDIAN:SIGMA or exponential:MEAN")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (0-1)")
+        parser.add_argument("--error-status", default="429,500,503",
+                            help="Comma-separated statuses failures are drawn from")
+        parser.add_argument("--chunk-delay", type=float, default=20, help="Milliseconds between streamed chunks")
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            server = MockLLMServer(
+                host=options["host"], port=options["port"], latency=options["latency"],
+                error_rate=options["error_rate"],
+                error_statuses=[int(s) for s in options["error_status"].split(",")],
+                chunk_delay=options["chunk_delay"] / 1000, seed=options["seed"],
+            )
+        except (ValueError, OSError) as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(
+            f"Mock LLM listening on {server.url} (latency {server.latency}, error rate {server.error_rate:.0%}); "
+            f"stats at /stats"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.sync import TOMBSTONE_DAYS, purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=TOMBSTONE_DAYS,
+                            help=f"Keep tombstones this many days (default {TOMBSTONE_DAYS})")
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones older than {options['days']} days."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import feed
+from core.models import FeedEntry, GroupMembership, SupportGroup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed community feeds from support group memberships and posts"
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.all().delete()
+        for group in SupportGroup.objects.all():
+            feed.refresh_group_mode(group)
+            if group.fanout_on_read:
+                continue
+            member_ids = GroupMembership.objects.filter(group=group).values_list('user_id', flat=True).distinct()
+            for user_id in member_ids.iterator():
+                feed.backfill_member(user_id, group.pk)
+        self.stdout.write(self.style.SUCCESS(f"Feeds rebuilt ({FeedEntry.objects.count()} entries)."))
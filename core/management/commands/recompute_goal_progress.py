@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.goals import recompute_goal
+from core.models import UserGoal
+
+
+class Command(BaseCommand):
+    help = "Rebuild goal progress counters and award missing achievements from the full log history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Only recompute goals of this user id")
+
+    def handle(self, *args, **options):
+        goals = UserGoal.objects.select_related("user").order_by("pk")
+        if options["user"]:
+            goals = goals.filter(user_id=options["user"])
+        count = 0
+        for goal in goals.iterator(chunk_size=500):
+            recompute_goal(goal)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Recomputed progress for {count} goals."))
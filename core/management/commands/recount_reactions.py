@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.reactions import recount_reactions
+
+
+class Command(BaseCommand):
+    help = "Recompute the aggregated forum reaction counters from individual reactions"
+
+    def handle(self, *args, **options):
+        rows = recount_reactions()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} reaction counters."))
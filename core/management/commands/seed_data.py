@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.seed import PASSWORD, SCALES, Seeder
+
+COUNTS = ("patients", "clinicians", "days", "groups", "posts", "comments", "reactions", "topics")
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with realistic synthetic users, clinicians, daily logs, goals, "
+            "support groups and forum activity for development and benchmarks")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="1k",
+                            help="Preset sized to roughly this many rows in total (default 1k)")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed; runs with the same seed produce the same data")
+        for name in COUNTS:
+            parser.add_argument(f"--{name}", type=int, help=f"Override the preset's number of {name}")
+
+    def handle(self, *args, **options):
+        counts = dict(SCALES[options["scale"]])
+        counts.update({name: options[name] for name in COUNTS if options[name] is not None})
+        self.stdout.write("Seeding " + ", ".join(f"{name}={value}" for name, value in counts.items()))
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            Seeder(seed=options["seed"], log=self.stdout.write).run(**counts)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.perf_counter() - started:.1f}s. "
+            f"Accounts are seed{options['seed']}_<name><n> with password '{PASSWORD}'."
+        ))
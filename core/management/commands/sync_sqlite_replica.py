@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import REPLICA_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto the local replica file (a stand-in for replication)"
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("No replica database configured (set SQLITE_REPLICA_PATH).")
+        primary, replica = connections['default'], connections[REPLICA_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("sync_sqlite_replica only works with SQLite databases.")
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}."))
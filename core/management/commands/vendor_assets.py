@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import VENDOR_ASSETS, VENDOR_DIR, IntegrityError, vendor_asset
+
+
+class Command(BaseCommand):
+    help = ("Download the pinned third-party CSS/JS/font assets into vitalcircle/static/vendor/, "
+            "checking each against its integrity hash")
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help=f"Assets to fetch (default: all of {', '.join(VENDOR_ASSETS)})")
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(VENDOR_ASSETS)
+        unknown = set(names) - set(VENDOR_ASSETS)
+        if unknown:
+            raise CommandError(f"Unknown assets: {', '.join(sorted(unknown))}")
+        for name in names:
+            try:
+                paths, digest = vendor_asset(name)
+            except IntegrityError as exc:
+                raise CommandError(f"Refusing to vendor {name}: {exc}")
+            for path in paths:
+                self.stdout.write(f"  {path.relative_to(VENDOR_DIR)}")
+            if VENDOR_ASSETS[name][2] is None:
+                self.stdout.write(self.style.WARNING(f"  {name} is not pinned; downloaded {digest}"))
+        self.stdout.write(self.style.SUCCESS("Vendored assets updated. Run collectstatic to fingerprint and compress them."))
@@ -0,0 +1,238 @@
+# core/metrics.py
+#
+# Aggregate metrics in the Prometheus text format, served at /metrics.
+#
+# Each process keeps its counters and histograms in memory and, at most once
+# every METRICS_FLUSH_INTERVAL seconds, writes them to its own file in
+# METRICS_DIR (written to a temp file and renamed, so readers never see half a
+# file). The /metrics view sums every process's file, so gunicorn workers and
+# job workers on one host report as one. Recording is a dict update under a
+# lock, so it can stay on permanently.
+#
+# Request metrics come from MetricsMiddleware (using core.timing's per-request
+# numbers), LLM metrics from core.llm, and cache hit ratios (core.cache.stats)
+# and the job queue depth are read when /metrics is scraped.
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "vitalcircle_"
+
+# name -> (type, help)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by view, method and status"),
+    "http_request_duration_seconds": ("histogram", "Time to produce the response, by view"),
+    "db_queries_total": ("counter", "SQL queries run while handling requests, by view"),
+    "db_query_seconds_total": ("counter", "Time spent in SQL while handling requests, by view"),
+    "llm_requests_total": ("counter", "Chat completion API calls by outcome"),
+    "llm_request_duration_seconds": ("histogram", "Chat completion API call time"),
+    "llm_tokens_total": ("counter", "Tokens reported by the chat completion API, by kind"),
+    "cache_requests_total": ("counter", "Cache lookups by namespace and result (l1_hit, l2_hit, miss)"),
+    "cache_hit_ratio": ("gauge", "Share of lookups answered from L1 or L2, by namespace"),
+    "job_queue_depth": ("gauge", "Jobs that are runnable now"),
+    "metrics_processes": ("gauge", "Processes whose metrics are included"),
+}
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}  # key -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+
+    def inc(self, name, labels=None, value=1):
+        key = _key(name, labels or {})
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def set_total(self, name, labels, value):
+        """Set a counter this process tracks elsewhere (e.g. CacheStats) to its running total."""
+        with self._lock:
+            self.counters[_key(name, labels)] = value
+
+    def observe(self, name, value, labels=None):
+        key = _key(name, labels or {})
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if value <= bound), len(LATENCY_BUCKETS))
+            histogram[index] += 1
+            histogram[-1] += value
+        self._maybe_flush()
+
+    def snapshot(self):
+        _record_cache_stats(self)
+        with self._lock:
+            return {"counters": dict(self.counters), "histograms": {k: list(v) for k, v in self.histograms.items()}}
+
+    # Shared directory
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            self.flush()
+
+    def flush(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        self._flushed = time.monotonic()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def _record_cache_stats(target):
+    from .cache import stats
+    for namespace, counters in stats().items():
+        for field, result in (("l1_hits", "l1_hit"), ("l2_hits", "l2_hit"), ("misses", "miss")):
+            target.set_total("cache_requests_total", {"namespace": namespace, "result": result}, counters[field])
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Every process's counters and histograms summed (this process's live values included)."""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    snapshots = {os.getpid(): registry.snapshot()}
+    if directory and os.path.isdir(directory):
+        stale_after = getattr(settings, 'METRICS_STALE_SECONDS', 24 * 3600)
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(directory, filename)
+            pid = int(filename[:-5]) if filename[:-5].isdigit() else None
+            if pid is None or pid in snapshots:
+                continue
+            try:
+                if not _pid_alive(pid) and time.time() - os.path.getmtime(path) > stale_after:
+                    os.remove(path)  # a process that exited long ago
+                    continue
+                with open(path) as f:
+                    snapshots[pid] = json.load(f)
+            except (OSError, ValueError):
+                continue  # removed or replaced while we looked
+
+    counters, histograms = {}, {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, values in snapshot["histograms"].items():
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+    return counters, histograms, len(snapshots)
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render():
+    """The Prometheus text exposition of every metric."""
+    from jobs.queue import queue_depth
+
+    counters, histograms, processes = collect()
+    series = {}  # name -> lines
+    for key, value in counters.items():
+        name, pairs = json.loads(key)
+        series.setdefault(name, []).append(f"{PREFIX}{name}{_labels(pairs)} {_number(value)}")
+    for key, values in histograms.items():
+        name, pairs = json.loads(key)
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), values[:-1]):
+            cumulative += count
+            lines.append(f"{PREFIX}{name}_bucket{_labels(pairs + [['le', bound]])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_labels(pairs)} {values[-1]:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_labels(pairs)} {cumulative}")
+
+    # Gauges derived at scrape time
+    lookups = {}
+    for key, value in counters.items():
+        name, pairs = json.loads(key)
+        if name == "cache_requests_total":
+            labels = dict(pairs)
+            hits, total = lookups.get(labels["namespace"], (0, 0))
+            lookups[labels["namespace"]] = (hits + (value if labels["result"] != "miss" else 0), total + value)
+    series["cache_hit_ratio"] = [
+        f"{PREFIX}cache_hit_ratio{_labels([['namespace', namespace]])} {hits / total if total else 0:.4f}"
+        for namespace, (hits, total) in sorted(lookups.items())
+    ]
+    series["job_queue_depth"] = [f"{PREFIX}job_queue_depth {queue_depth()}"]
+    series["metrics_processes"] = [f"{PREFIX}metrics_processes {processes}"]
+
+    output = []
+    for name, (kind, help_text) in METRICS.items():
+        if name in series:
+            output.append(f"# HELP {PREFIX}{name} {help_text}")
+            output.append(f"# TYPE {PREFIX}{name} {kind}")
+            output.extend(sorted(series[name]) if kind != "histogram" else series[name])
+    return "\n".join(output) + "\n"
+
+
+# --------------------------
+# Recording
+# --------------------------
+
+def record_llm_call(seconds, ok, usage=None):
+    registry.inc("llm_requests_total", {"outcome": "ok" if ok else "error"})
+    registry.observe("llm_request_duration_seconds", seconds)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage and usage.get(kind):
+            registry.inc("llm_tokens_total", {"kind": kind.split("_")[0]}, usage[kind])
+
+
+class MetricsMiddleware:
+    """Records request metrics from request.timing (place it before RequestTimingMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            match = request.resolver_match
+            view = match.view_name if match else "<unresolved>"
+            registry.inc("http_requests_total",
+                         {"view": view, "method": request.method, "status": str(response.status_code)})
+            registry.observe("http_request_duration_seconds", timing.total, {"view": view})
+            if timing.counts.get("db"):
+                registry.inc("db_queries_total", {"view": view}, timing.counts["db"])
+                registry.inc("db_query_seconds_total", {"view": view}, timing.durations["db"])
+        return response
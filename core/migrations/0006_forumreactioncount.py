@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe_reactions(apps, schema_editor):
+    ForumReaction = apps.get_model('core', 'ForumReaction')
+    duplicates = (ForumReaction.objects
+                  .values('post', 'user', 'reaction_type')
+                  .annotate(keep=Min('id'), n=Count('id'))
+                  .filter(n__gt=1))
+    for row in duplicates:
+        (ForumReaction.objects
+         .filter(post=row['post'], user=row['user'], reaction_type=row['reaction_type'])
+         .exclude(id=row['keep'])
+         .delete())
+
+
+def populate_counts(apps, schema_editor):
+    ForumReaction = apps.get_model('core', 'ForumReaction')
+    ForumReactionCount = apps.get_model('core', 'ForumReactionCount')
+    totals = ForumReaction.objects.values('post', 'reaction_type').annotate(n=Count('id'))
+    ForumReactionCount.objects.bulk_create(
+        [ForumReactionCount(post_id=row['post'], reaction_type=row['reaction_type'], count=row['n'])
+         for row in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_feedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForumReactionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reaction_type', models.CharField(choices=[('like', 'Like'), ('celebrate', 'Celebrate'), ('support', 'Support')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(dedupe_reactions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='forumreaction',
+            constraint=models.UniqueConstraint(fields=('post', 'user', 'reaction_type'), name='unique_forum_reaction'),
+        ),
+        migrations.AddField(
+            model_name='forumreactioncount',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_counts', to='core.forumpost'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='forumreactioncount',
+            unique_together={('post', 'reaction_type')},
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
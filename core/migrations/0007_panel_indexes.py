@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_forumreactioncount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clinicianaction',
+            index=models.Index(fields=['clinician', 'acknowledged_by_patient'], name='core_clinic_clinici_381019_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stabilityscore',
+            index=models.Index(fields=['user', '-score_date'], name='core_stabil_user_id_9a6d3e_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_logsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nudge',
+            index=models.Index(fields=['user', '-nudge_date'], name='core_nudge_user_id_25d438_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_nudge_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('met', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GoalProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days_met', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('best_streak', models.IntegerField(default=0)),
+                ('last_value', models.FloatField(blank=True, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='achievement',
+            constraint=models.UniqueConstraint(condition=models.Q(('key', ''), _negated=True), fields=('user', 'key'), name='unique_achievement_key'),
+        ),
+        migrations.AddField(
+            model_name='goalday',
+            name='goal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='core.usergoal'),
+        ),
+        migrations.AddField(
+            model_name='goalprogress',
+            name='goal',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='core.usergoal'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='goalday',
+            unique_together={('goal', 'day')},
+        ),
+    ]
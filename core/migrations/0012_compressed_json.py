@@ -0,0 +1,67 @@
+# Converts the verbose JSON columns to CompressedJSONField (see core.fields).
+# Each column gets a compressed twin, existing rows are copied across in
+# batches, then the twin replaces the original. Reversible: going back
+# decompresses into plain JSON columns again.
+
+from django.db import migrations, models
+
+import core.fields
+
+FIELDS = [
+    ('stabilityscore', 'ai_response_raw'),
+    ('patientreport', 'ai_recommendations'),
+    ('patientreport', 'logs_snapshot'),
+]
+BATCH_SIZE = 500
+
+
+def pack(apps, schema_editor):
+    for model_name, field in FIELDS:
+        _copy_field(apps, model_name, field, field, f'{field}_packed')
+
+
+def unpack(apps, schema_editor):
+    for model_name, field in FIELDS:
+        _copy_field(apps, model_name, field, f'{field}_packed', field)
+
+
+def _copy_field(apps, model_name, field, source, target):
+    model = apps.get_model('core', model_name)
+    batch = []
+    for obj in model.objects.only('pk', source).iterator(chunk_size=BATCH_SIZE):
+        setattr(obj, target, getattr(obj, source))
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, [target])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, [target])
+
+
+def _before(model_name, field):
+    return [
+        migrations.AddField(model_name, f'{field}_packed',
+                            core.fields.CompressedJSONField(dictionary='llm-v1', null=True)),
+        migrations.AlterField(model_name, field, models.JSONField(null=True)),
+    ]
+
+
+def _after(model_name, field):
+    return [
+        migrations.RemoveField(model_name, field),
+        migrations.RenameField(model_name, f'{field}_packed', field),
+        migrations.AlterField(model_name, field, core.fields.CompressedJSONField(dictionary='llm-v1')),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_request_profile'),
+    ]
+
+    operations = [
+        *[op for model_name, field in FIELDS for op in _before(model_name, field)],
+        migrations.RunPython(pack, unpack),
+        *[op for model_name, field in FIELDS for op in _after(model_name, field)],
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:06
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_daily_log_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailylog',
+            name='log_date',
+            field=models.DateField(default=datetime.date.today, editable=False),
+        ),
+        migrations.CreateModel(
+            name='VitalSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('heart_rate', 'Heart rate'), ('blood_glucose', 'Blood glucose'), ('systolic_bp', 'Systolic blood pressure'), ('diastolic_bp', 'Diastolic blood pressure'), ('temperature', 'Temperature'), ('steps', 'Steps')], max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('times', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('value_min', models.FloatField(null=True)),
+                ('value_max', models.FloatField(null=True)),
+                ('value_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('user', 'metric', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Adds what the delta-sync API (core.sync) needs: updated_at on the synced
+# models (backfilled from their creation time), ClinicianAction.patient
+# (copied from report.patient), (user, updated_at) indexes and tombstones.
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill(apps, schema_editor):
+    ClinicianAction = apps.get_model('core', 'ClinicianAction')
+    PatientReport = apps.get_model('core', 'PatientReport')
+    ClinicianAction.objects.update(
+        patient=Subquery(PatientReport.objects.filter(pk=OuterRef('report_id')).values('patient_id')[:1]),
+        updated_at=F('created_at'),
+    )
+    apps.get_model('core', 'Nudge').objects.update(updated_at=F('created_at'))
+    apps.get_model('core', 'StabilityScore').objects.update(updated_at=F('score_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_ingest_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='clinicianaction',
+            name='patient',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='clinicianaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='nudge',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='stabilityscore',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='clinicianaction',
+            name='patient',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='clinicianaction',
+            index=models.Index(fields=['patient', 'updated_at'], name='core_clinic_patient_352fc7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailylog',
+            index=models.Index(fields=['user', 'updated_at'], name='core_dailyl_user_id_6e6a62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nudge',
+            index=models.Index(fields=['user', 'updated_at'], name='core_nudge_user_id_2053cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stabilityscore',
+            index=models.Index(fields=['user', 'updated_at'], name='core_stabil_user_id_1d55c2_idx'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='core_syncto_user_id_5e11ca_idx'),
+        ),
+    ]
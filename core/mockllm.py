@@ -0,0 +1,222 @@
+# core/mockllm.py
+#
+# Local stand-in for the Groq (OpenAI-compatible) chat completions API, for
+# load tests and offline development (``manage.py mock_llm``, or
+# ``load_test --mock-llm``). Point GROQ_API_URL at it:
+#
+#     GROQ_API_URL=http://127.0.0.1:8001/v1/chat/completions
+#
+# Replies take a latency drawn from a configurable distribution, a share of
+# requests fail with 429/5xx like the real API does under load, and
+# ``"stream": true`` requests get server-sent event chunks. The reply text is
+# canned per prompt so the views that parse JSON out of it keep working.
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class Latency:
+    """A latency distribution in milliseconds, parsed from ``kind:param[:param]``.
+
+    fixed:800           always 800 ms
+    uniform:200:1500    anywhere between 200 and 1500 ms
+    normal:800:150      mean 800 ms, standard deviation 150 ms
+    lognormal:800:0.5   median 800 ms, sigma 0.5 (long right tail, like real LLM APIs)
+    exponential:800     mean 800 ms
+    """
+
+    def __init__(self, spec="lognormal:800:0.5"):
+        kind, *params = spec.split(":")
+        if kind not in DISTRIBUTIONS or not params:
+            raise ValueError(f"Bad latency spec {spec!r}; expected one of {', '.join(DISTRIBUTIONS)} with parameters")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(p[0]), p[1])
+        else:
+            value = rng.expovariate(1 / p[0])
+        return max(0.0, value) / 1000  # seconds
+
+    def __str__(self):
+        return self.spec
+
+
+def canned_reply(prompt, rng):
+    """Reply text shaped like what the prompt asks for."""
+    if '"stability_score"' in prompt:
+        return json.dumps({
+            "stability_score": rng.randint(35, 95),
+            "risk_prediction": {
+                "english": "Your vitals are mostly within range. Keep taking your medicines on time and watch your salt intake.",
+                "hinglish": "Aapke vitals zyada tar theek hain. Dawai time par lijiye aur namak kam rakhiye.",
+            },
+        })
+    if '"recommendations"' in prompt:
+        return json.dumps({
+            "summary": "Readings have been stable over the period with good medication adherence.",
+            "recommendations": [
+                {"action": "Continue current medication", "reason": "Blood pressure is controlled"},
+                {"action": "Review sleep habits", "reason": "Several nights under six hours"},
+            ],
+        })
+    if '"praise"' in prompt:
+        return json.dumps({
+            "summary": "A steady week with regular logging and mostly normal readings.",
+            "praise": ["You logged every day", "Medication was taken consistently"],
+            "warnings": ["Sleep was short on a few nights"],
+            "suggestions": ["Aim for 7 hours of sleep", "Add a 20 minute walk after dinner"],
+        })
+    return "This is a reply from the mock LLM server."
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8001, latency="lognormal:800:0.5", error_rate=0.0,
+                 error_statuses=(429, 500, 503), chunk_delay=0.02, seed=None):
+        super().__init__((host, port), MockLLMHandler)
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.chunk_delay = chunk_delay  # seconds between streamed chunks
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "errors": 0, "streams": 0, "in_flight": 0, "peak_in_flight": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def draw(self):
+        """(latency in seconds, error status or None) for one request."""
+        with self._lock:
+            latency = self.latency.sample(self.rng)
+            failed = self.rng.random() < self.error_rate
+            return latency, self.rng.choice(self.error_statuses) if failed else None
+
+    def count(self, name, delta=1):
+        with self._lock:
+            self.counters[name] += delta
+            if name == "in_flight":
+                self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.counters["in_flight"])
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, latency=str(self.latency), error_rate=self.error_rate)
+
+    def start(self):
+        """Serve from a background thread (for use inside another process)."""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # one line per request drowns the load test output
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._json(200, self.server.stats())
+        else:
+            self._json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = payload["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return self._json(400, {"error": {"message": "Invalid request body", "type": "invalid_request_error"}})
+
+        server = self.server
+        server.count("requests")
+        server.count("in_flight")
+        try:
+            latency, error = server.draw()
+            if error:
+                time.sleep(latency / 4)  # failures come back faster than answers
+                server.count("errors")
+                headers = {"Retry-After": "1"} if error == 429 else {}
+                return self._json(error, {"error": {"message": f"Mock failure ({error})", "type": "server_error"}},
+                                  headers)
+
+            content = canned_reply(prompt, server.rng)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            model = payload.get("model", "mock")
+            if payload.get("stream"):
+                server.count("streams")
+                return self._stream(completion_id, model, content, latency)
+            time.sleep(latency)
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+        finally:
+            server.count("in_flight", -1)
+
+    def _json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, completion_id, model, content, first_token_latency):
+        time.sleep(first_token_latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+        for index, piece in enumerate(pieces):
+            delta = {"content": piece} if index else {"role": "assistant", "content": piece}
+            self._event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            time.sleep(self.server.chunk_delay)
+        self._event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _event(self, body):
+        self.wfile.write(f"data: {json.dumps(body)}\n\n".encode())
+        self.wfile.flush()
@@ -1,6 +1,13 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from datetime import date
+import hashlib
+import json
+import secrets
+import zlib
+
+from .fields import CompressedJSONField
 
 User = get_user_model()
 
@@ -63,7 +70,11 @@ class StabilityScore(models.Model):
     score_date = models.DateTimeField(auto_now_add=True)
     score_value = models.IntegerField()  # e.g., 0-100 stability index
     risk_prediction = models.TextField()  # e.g., "High probability of hypertensive episode"
-    ai_response_raw = models.JSONField()  # full response from Gemini
+    ai_response_raw = CompressedJSONField(dictionary='llm-v1')  # full LLM response
+    updated_at = models.DateTimeField(auto_now=True)  # sync cursor (core.sync)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-score_date']), models.Index(fields=['user', 'updated_at'])]
 
 
 # ------------------------------
@@ -76,6 +87,10 @@ class Nudge(models.Model):
     message = models.TextField()
     context_reason = models.TextField(blank=True, null=True)  # why this nudge was given
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # sync cursor (core.sync)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-nudge_date']), models.Index(fields=['user', 'updated_at'])]
 
 
 # ------------------------------
@@ -95,20 +110,46 @@ class PatientClinician(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class LogSnapshot(models.Model):
+    """zlib-compressed JSON copy of the DailyLog rows a report was built from.
+
+    Stored once per distinct content (``digest`` is the SHA-256 of the
+    uncompressed JSON), so regenerating reports over unchanged logs reuses
+    the existing blob instead of writing another copy.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    entry_count = models.IntegerField()
+    raw_size = models.IntegerField()  # bytes before compression
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def load(self):
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+
 class PatientReport(models.Model):
     patient = models.ForeignKey(User, on_delete=models.CASCADE)
     clinician = models.ForeignKey(Clinician, on_delete=models.CASCADE)
     generated_at = models.DateTimeField(auto_now_add=True)
 
     ai_summary = models.TextField()   # readable summary for clinician
-    ai_recommendations = models.JSONField()  # suggested actions
+    ai_recommendations = CompressedJSONField(dictionary='llm-v1')  # suggested actions
     stability_score = models.IntegerField()
-    logs_snapshot = models.JSONField()  # copy of patient logs sent
+    logs_snapshot = CompressedJSONField(dictionary='llm-v1')  # copy of patient logs sent (or a reference to ``snapshot``)
+    snapshot = models.ForeignKey(LogSnapshot, on_delete=models.SET_NULL, blank=True, null=True)
+
+    def get_logs(self):
+        """Return the log rows behind this report, wherever they are stored."""
+        if self.snapshot_id is not None:
+            return self.snapshot.load()
+        return self.logs_snapshot
 
 
 class ClinicianAction(models.Model):
     report = models.ForeignKey(PatientReport, on_delete=models.CASCADE)
     clinician = models.ForeignKey(Clinician, on_delete=models.CASCADE)
+    # Copied from report.patient so a patient's actions can be synced from one index
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, editable=False, related_name='+')
     
     action_type = models.CharField(max_length=50, choices=[
         ("advice", "Advice"),
@@ -119,6 +160,18 @@ class ClinicianAction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     acknowledged_by_patient = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)  # sync cursor (core.sync)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['clinician', 'acknowledged_by_patient']),
+            models.Index(fields=['patient', 'updated_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.patient_id is None:
+            self.patient_id = self.report.patient_id
+        super().save(*args, **kwargs)
 
 
 # ------------------------------
@@ -133,6 +186,7 @@ class SupportGroup(models.Model):
         ("lifestyle", "Lifestyle-based")
     ])
     created_at = models.DateTimeField(auto_now_add=True)
+    fanout_on_read = models.BooleanField(default=False)  # too many members to push posts to feeds
 
 
 class GroupMembership(models.Model):
@@ -149,6 +203,17 @@ class ForumPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class FeedEntry(models.Model):
+    """A support group post pushed into one member's community feed (fan-out-on-write)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    post = models.ForeignKey(ForumPost, on_delete=models.CASCADE)
+    created_at = models.DateTimeField()  # copy of post.created_at so the feed sorts by index alone
+
+    class Meta:
+        unique_together = ['user', 'post']
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
+
 class ForumComment(models.Model):
     post = models.ForeignKey(ForumPost, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -156,14 +221,32 @@ class ForumComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+REACTION_TYPES = [
+    ("like", "Like"), ("celebrate", "Celebrate"), ("support", "Support")
+]
+
+
 class ForumReaction(models.Model):
     post = models.ForeignKey(ForumPost, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    reaction_type = models.CharField(max_length=20, choices=[
-        ("like", "Like"), ("celebrate", "Celebrate"), ("support", "Support")
-    ])
+    reaction_type = models.CharField(max_length=20, choices=REACTION_TYPES)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'user', 'reaction_type'], name='unique_forum_reaction'),
+        ]
+
+
+class ForumReactionCount(models.Model):
+    """Aggregated reaction totals per post and type, maintained by core.reactions."""
+    post = models.ForeignKey(ForumPost, on_delete=models.CASCADE, related_name='reaction_counts')
+    reaction_type = models.CharField(max_length=20, choices=REACTION_TYPES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['post', 'reaction_type']
+
 
 # ------------------------------
 # Feature 5: Goal & Progress Dashboard
@@ -182,17 +265,61 @@ class UserGoal(models.Model):
     unit = models.CharField(max_length=20)  # e.g., "hours", "days", "score"
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def progress_percentage(self):
+        """Precomputed progress (see core.goals); 0 until the first evaluation."""
+        try:
+            progress = self.progress
+        except GoalProgress.DoesNotExist:
+            return 0
+        if not self.target_value:
+            return 0
+        if self.unit == "days":
+            value = progress.days_met
+        else:
+            value = progress.last_value or 0
+        return min(100, round(value / self.target_value * 100))
+
+
+class GoalProgress(models.Model):
+    """Running counters for a UserGoal, updated incrementally as logs are saved."""
+    goal = models.OneToOneField(UserGoal, on_delete=models.CASCADE, related_name="progress")
+    days_met = models.IntegerField(default=0)
+    current_streak = models.IntegerField(default=0)
+    best_streak = models.IntegerField(default=0)
+    last_value = models.FloatField(blank=True, null=True)
+    last_date = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class GoalDay(models.Model):
+    """Per-day outcome of a goal, so an edited log only adjusts the counters by its own change."""
+    goal = models.ForeignKey(UserGoal, on_delete=models.CASCADE, related_name="days")
+    day = models.DateField()
+    value = models.FloatField(blank=True, null=True)
+    met = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ['goal', 'day']
+
 
 class Achievement(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     description = models.TextField()
     achieved_at = models.DateTimeField(auto_now_add=True)
+    key = models.CharField(max_length=100, blank=True)  # set for automatically awarded achievements
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], condition=~models.Q(key=''), name='unique_achievement_key'),
+        ]
 
 
 class DailyLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    log_date = models.DateField(auto_now_add=True)  # Keep existing field name
+    # Defaults to today but, unlike auto_now_add, keeps an explicit date (imports, wearable rollups)
+    log_date = models.DateField(default=date.today, editable=False)  # Keep existing field name
     
     # Physical measurements - use existing field names where possible
     weight_kg = models.FloatField(blank=True, null=True)
@@ -223,6 +350,7 @@ class DailyLog(models.Model):
     class Meta:
         unique_together = ['user', 'log_date']  # Use existing field name
         ordering = ['-log_date']
+        indexes = [models.Index(fields=['user', 'updated_at'])]
     
     def __str__(self):
         return f"{self.user.username} - {self.log_date}"
@@ -241,3 +369,169 @@ class DailyLog(models.Model):
         return self.diastolic_bp
 
 
+class DailyLogArchive(models.Model):
+    """One user's DailyLog rows for one calendar month, moved out of the hot table.
+
+    ``data`` holds the rows column by column (see core.archive); read them
+    back through ``core.archive.iter_logs``, which merges both tiers.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    data = CompressedJSONField()
+    entry_count = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'month']
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.month:%Y-%m} ({self.entry_count} logs)"
+
+
+class VitalSeries(models.Model):
+    """One day of high-frequency readings of one metric from a wearable.
+
+    Readings are stored as two packed arrays (see core.vitals): seconds since
+    midnight and scaled integer values, each delta-encoded. count/min/max/sum
+    are kept alongside so day-level summaries and rollups don't decode them.
+    """
+    METRIC_CHOICES = [
+        ('heart_rate', 'Heart rate'),
+        ('blood_glucose', 'Blood glucose'),
+        ('systolic_bp', 'Systolic blood pressure'),
+        ('diastolic_bp', 'Diastolic blood pressure'),
+        ('temperature', 'Temperature'),
+        ('steps', 'Steps'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+    times = models.BinaryField()
+    values = models.BinaryField()
+    value_min = models.FloatField(null=True)
+    value_max = models.FloatField(null=True)
+    value_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'metric', 'day']
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.metric} {self.day} ({self.count} readings)"
+
+
+# ------------------------------
+# Machine ingestion API
+# ------------------------------
+
+class IngestToken(models.Model):
+    """A bearer token for the batch ingestion endpoint (see core.ingest).
+
+    Only a SHA-256 of the key is stored; ``issue`` returns the key once. A
+    token with a ``user`` (a patient's phone app) may only write that
+    user's data; one without (a device vendor's sync service) names the
+    user in each record.
+    """
+    name = models.CharField(max_length=100)
+    key_hash = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, name, user=None):
+        """Create a token and return ``(token, key)``."""
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(name=name, key_hash=cls.hash_key(key), user=user), key
+
+
+class IngestRequest(models.Model):
+    """The stored response to an ingestion batch sent with an Idempotency-Key.
+
+    A retry with the same key and body gets this response back without
+    writing anything again. Kept for INGEST_IDEMPOTENCY_HOURS.
+    """
+    token = models.ForeignKey(IngestToken, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.IntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ['token', 'key']
+
+    def __str__(self):
+        return f"{self.token} - {self.key}"
+
+
+# ------------------------------
+# Mobile delta sync
+# ------------------------------
+
+class SyncTombstone(models.Model):
+    """A deleted row that sync clients still have to hear about (see core.sync).
+
+    ``user`` has no database constraint: tombstones written while a user is
+    deleted outlive them until SYNC_TOMBSTONE_DAYS prunes them.
+    """
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    kind = models.CharField(max_length=30)  # a core.sync.SOURCES key
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} {self.object_id}"
+
+
+
+
+# ------------------------------
+# Operations: on-demand request profiles
+# ------------------------------
+
+class RequestProfile(models.Model):
+    """A profiled staff request (see core.profiling).
+
+    ``stats`` is a zlib-compressed pstats dump (cProfile) and ``stacks`` a
+    zlib-compressed folded-stack sample, the input format of flamegraph.pl
+    and speedscope.
+    """
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status = models.IntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.IntegerField(default=0)
+    samples = models.IntegerField(default=0)
+    stats = models.BinaryField()
+    stacks = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    def pstats_bytes(self):
+        return zlib.decompress(bytes(self.stats))
+
+    def folded_stacks(self):
+        return zlib.decompress(bytes(self.stacks)).decode()
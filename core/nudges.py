@@ -0,0 +1,263 @@
+# core/nudges.py
+#
+# Rule-based Context-Aware Nudges.
+#
+# Each rule is a declarative ``Rule`` over a small feature dict computed from
+# a user's recent DailyLogs (sleep streaks, missed medication, BP trend, ...).
+# ``run_nudges`` evaluates the whole library for every patient in chunks:
+# one query per chunk reads the logs, one reads who already has a nudge for
+# today, and the new nudges are written with ``bulk_create``. Each user gets
+# at most one nudge per run, from the highest-priority rule that matches.
+#
+# Users who have never logged (or whose logs are all archived, core.archive)
+# get no nudges, and a lapsed logger is
+# reminded on a back-off schedule (LAPSE_REMINDER_DAYS, then every
+# LAPSE_REMINDER_EVERY days) rather than every night. A rule that fails to
+# match or render is counted in its metrics and skipped for that user.
+
+import datetime
+import logging
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+
+from .models import DailyLog, Nudge
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+WINDOW_DAYS = 14
+CHUNK_SIZE = 2000
+LAPSE_REMINDER_DAYS = (3, 7, 14, 30)  # days without a log on which to remind
+LAPSE_REMINDER_EVERY = 30  # ... and every this many days after the last one
+
+
+class Rule:
+    def __init__(self, name, when, message, reason, priority=0):
+        self.name = name
+        self.when = when  # callable(features) -> bool
+        self.message = message  # str.format template over the features
+        self.reason = reason
+        self.priority = priority
+
+    def matches(self, features):
+        return bool(self.when(features))
+
+    def render(self, features):
+        return self.message.format(**features), self.reason.format(**features)
+
+
+RULES = [
+    Rule(
+        "rising_bp", priority=100,
+        when=lambda f: f["recent_systolic"] is not None and (
+            f["recent_systolic"] >= 140
+            or (f["earlier_systolic"] is not None and f["recent_systolic"] - f["earlier_systolic"] >= 10)),
+        message="Your blood pressure has been trending up (avg {recent_systolic:.0f} mmHg). "
+                "Cut back on salt today and take a few minutes to relax before your next reading.",
+        reason="Average systolic BP over the last 3 logs is {recent_systolic:.0f} mmHg",
+    ),
+    Rule(
+        "high_glucose", priority=90,
+        when=lambda f: f["latest_glucose"] is not None and f["latest_glucose"] > 180,
+        message="Your last blood glucose reading was {latest_glucose:.0f} mg/dL. "
+                "A short walk after meals can help bring it down.",
+        reason="Latest blood glucose above 180 mg/dL",
+    ),
+    Rule(
+        "missed_medication", priority=80,
+        when=lambda f: f["missed_medication_days"] >= 2,
+        message="You've missed your medication on {missed_medication_days} of your last 3 logged days. "
+                "Try setting a daily reminder at the same time each day.",
+        reason="Medication not taken on {missed_medication_days} of the last 3 logs",
+    ),
+    Rule(
+        "low_sleep_streak", priority=70,
+        when=lambda f: f["low_sleep_streak"] >= 3,
+        message="You've slept under 6 hours for {low_sleep_streak} nights in a row. "
+                "Aim to wind down 30 minutes earlier tonight.",
+        reason="Sleep under 6 hours for {low_sleep_streak} consecutive logs",
+    ),
+    Rule(
+        "high_stress_streak", priority=60,
+        when=lambda f: f["high_stress_streak"] >= 3,
+        message="Your stress levels seem high lately. Try a 2-minute breathing exercise.",
+        reason="Stress level 4 or above for {high_stress_streak} consecutive logs",
+    ),
+    Rule(
+        "low_activity", priority=40,
+        when=lambda f: f["avg_steps"] is not None and f["avg_steps"] < 3000,
+        message="You've averaged {avg_steps:.0f} steps a day recently. A 15-minute walk today is a great start.",
+        reason="Average steps below 3000 over the last logs",
+    ),
+    Rule(
+        "low_hydration", priority=30,
+        when=lambda f: f["avg_water"] is not None and f["avg_water"] < 1.5,
+        message="You're drinking about {avg_water:.1f} L of water a day. Keep a bottle nearby and aim for 2 L.",
+        reason="Average water intake below 1.5 L",
+    ),
+    Rule(
+        "logging_lapsed", priority=10,
+        when=lambda f: f["days_since_last_log"] is not None and _lapse_reminder_due(f["days_since_last_log"]),
+        message="We haven't seen a daily log from you in {days_since_last_log} days. "
+                "A quick check-in helps us spot problems early.",
+        reason="No daily log for {days_since_last_log} days",
+    ),
+]
+
+
+def _lapse_reminder_due(days):
+    if days in LAPSE_REMINDER_DAYS:
+        return True
+    last = LAPSE_REMINDER_DAYS[-1]
+    return days > last and (days - last) % LAPSE_REMINDER_EVERY == 0
+
+
+def _streak(values, predicate):
+    """Length of the run of most-recent values (newest first) satisfying predicate."""
+    count = 0
+    for value in values:
+        if value is None or not predicate(value):
+            break
+        count += 1
+    return count
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def compute_features(logs, today, last_log_date=None):
+    """Feature dict from a user's logs in the window (list of dicts, newest first).
+
+    ``last_log_date`` is the user's latest log when there are none in the
+    window (None if they have never logged).
+    """
+    if logs:
+        last_log_date = logs[0]["log_date"]
+    sleep = [log["sleep_hours"] for log in logs]
+    systolic = [log["systolic_bp"] for log in logs if log["systolic_bp"] is not None]
+    glucose = [log["blood_glucose"] for log in logs if log["blood_glucose"] is not None]
+    last3 = logs[:3]
+    return {
+        "days_logged": len(logs),
+        "days_since_last_log": (today - last_log_date).days if last_log_date else None,
+        "low_sleep_streak": _streak(sleep, lambda hours: hours < 6),
+        "high_stress_streak": _streak([log["stress_level"] for log in logs], lambda level: level >= 4),
+        "missed_medication_days": sum(1 for log in last3 if not log["medication_taken"]) if len(last3) == 3 else 0,
+        "recent_systolic": _mean(systolic[:3]),
+        "earlier_systolic": _mean(systolic[3:7]),
+        "latest_glucose": glucose[0] if glucose else None,
+        "avg_steps": _mean([log["steps_count"] for log in logs[:5]]),
+        "avg_water": _mean([log["water_intake_liters"] for log in logs[:5]]),
+    }
+
+
+LOG_FIELDS = [
+    "user_id", "log_date", "sleep_hours", "systolic_bp", "blood_glucose",
+    "stress_level", "medication_taken", "steps_count", "water_intake_liters",
+]
+
+
+class RuleMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.matched = 0  # rule condition was true
+        self.emitted = 0  # rule produced the nudge that was saved
+        self.errors = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {"matched": self.matched, "emitted": self.emitted, "errors": self.errors,
+                "seconds": round(self.seconds, 3)}
+
+
+def _evaluate(features, rules, metrics):
+    chosen = None
+    for rule in rules:
+        m = metrics[rule.name]
+        started = time.perf_counter()
+        try:
+            matched = rule.matches(features)
+        except Exception:
+            m.errors += 1
+            logger.exception("Nudge rule %s failed", rule.name)
+            matched = False
+        m.seconds += time.perf_counter() - started
+        if matched:
+            m.matched += 1
+            if chosen is None:
+                chosen = rule
+    return chosen
+
+
+def run_nudges(today=None, rules=RULES, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Evaluate the rule library for every patient and create today's nudges.
+
+    Returns ``(created_count, {rule_name: metrics_dict})``.
+    """
+    today = today or datetime.date.today()
+    since = today - datetime.timedelta(days=WINDOW_DAYS)
+    rules = sorted(rules, key=lambda rule: rule.priority, reverse=True)
+    metrics = {rule.name: RuleMetrics(rule.name) for rule in rules}
+    created = 0
+
+    user_ids = User.objects.filter(is_user=True).order_by("pk").values_list("pk", flat=True)
+    chunk = []
+    for user_id in user_ids.iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            created += _run_chunk(chunk, today, since, rules, metrics, dry_run)
+            chunk = []
+    if chunk:
+        created += _run_chunk(chunk, today, since, rules, metrics, dry_run)
+
+    return created, {name: m.as_dict() for name, m in metrics.items()}
+
+
+def _run_chunk(user_ids, today, since, rules, metrics, dry_run):
+    already_nudged = set(Nudge.objects
+                         .filter(user_id__in=user_ids, nudge_date=today)
+                         .values_list("user_id", flat=True))
+
+    logs_by_user = defaultdict(list)
+    rows = (DailyLog.objects
+            .filter(user_id__in=user_ids, log_date__gte=since, log_date__lte=today)
+            .order_by("user_id", "-log_date")
+            .values(*LOG_FIELDS))
+    for row in rows:
+        logs_by_user[row["user_id"]].append(row)
+    # Users with nothing in the window: when did they last log, if ever?
+    last_log_dates = dict(DailyLog.objects
+                          .filter(user_id__in=[u for u in user_ids if u not in logs_by_user], log_date__lte=today)
+                          .values("user_id")
+                          .annotate(last=Max("log_date"))
+                          .values_list("user_id", "last"))
+
+    nudges = []
+    for user_id in user_ids:
+        if user_id in already_nudged:
+            continue
+        logs = logs_by_user.get(user_id, [])
+        if not logs and user_id not in last_log_dates:
+            continue  # never logged: nothing to base a nudge on
+        features = compute_features(logs, today, last_log_dates.get(user_id))
+        rule = _evaluate(features, rules, metrics)
+        if rule is None:
+            continue
+        try:
+            message, reason = rule.render(features)
+        except Exception:
+            metrics[rule.name].errors += 1
+            logger.exception("Nudge rule %s failed to render for user %s", rule.name, user_id)
+            continue
+        metrics[rule.name].emitted += 1
+        nudges.append(Nudge(user_id=user_id, message=message, context_reason=reason))
+
+    if not dry_run and nudges:
+        Nudge.objects.bulk_create(nudges, batch_size=1000)
+    return len(nudges)
@@ -0,0 +1,122 @@
+# core/profiling.py
+#
+# On-demand profiling of single requests, for staff only.
+#
+# A staff user adds ``?_profile=1`` to a URL (or sends ``X-Profile: 1``) and
+# ProfilingMiddleware runs that one request under cProfile while a sampler
+# thread records the request thread's stack every PROFILE_SAMPLE_INTERVAL
+# seconds. The result is saved as a RequestProfile: a pstats dump (open it
+# with ``python -m pstats`` or snakeviz) and folded stacks (flamegraph.pl,
+# speedscope). The response's X-Profile-Id header points at it, and the
+# admin lists recent profiles with download links. Only the newest
+# PROFILE_KEEP profiles are kept.
+
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer into folded-stack counts."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def wants_profile(request):
+    if not getattr(settings, 'PROFILING_ENABLED', True):
+        return False
+    if request.GET.get(PROFILE_PARAM) != '1' and request.headers.get(PROFILE_HEADER) != '1':
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def _prune(keep):
+    from .models import RequestProfile
+    stale = RequestProfile.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[keep:]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+
+
+class ProfilingMiddleware:
+    """Profile staff requests that ask for it; goes after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request):
+            return self.get_response(request)
+
+        from .models import RequestProfile
+
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.005))
+        started = time.perf_counter()
+        with sampler:
+            response = profiler.runcall(self.get_response, request)
+        duration = time.perf_counter() - started
+        profiler.create_stats()
+
+        timing = getattr(request, 'timing', None)
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view_name=match.view_name if match else "",
+            status=response.status_code,
+            duration_ms=round(duration * 1000, 2),
+            query_count=timing.counts.get("db", 0) if timing else 0,
+            samples=sum(sampler.counts.values()),
+            stats=zlib.compress(marshal.dumps(profiler.stats)),
+            stacks=zlib.compress(sampler.folded().encode()),
+        )
+        _prune(getattr(settings, 'PROFILE_KEEP', 100))
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
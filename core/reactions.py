@@ -0,0 +1,167 @@
+# core/reactions.py
+#
+# Forum reactions and aggregated per-post counters.
+#
+# ForumReaction keeps one row per (post, user, type) and is the source of
+# truth. ForumReactionCount holds the totals shown next to posts. Counter
+# updates go through an in-process buffer that coalesces bursts on the same
+# post into a single delta and flushes them in batches, so a popular post
+# costs a handful of UPDATEs per flush instead of one per click. Deltas are
+# applied with F() expressions, which keeps multiple worker processes safe;
+# ``recount_reactions`` reconciles the counters if a process dies with
+# unflushed deltas.
+
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import ForumReaction, ForumReactionCount, REACTION_TYPES
+
+REACTION_TYPE_KEYS = [key for key, _ in REACTION_TYPES]
+
+REACTION_FLUSH_INTERVAL = getattr(settings, 'REACTION_FLUSH_INTERVAL', 2.0)  # seconds
+REACTION_FLUSH_SIZE = getattr(settings, 'REACTION_FLUSH_SIZE', 500)  # pending (post, type) keys
+
+
+class ReactionCounterBuffer:
+    """Coalesces counter deltas per (post_id, reaction_type) until flushed."""
+
+    def __init__(self, flush_interval=REACTION_FLUSH_INTERVAL, flush_size=REACTION_FLUSH_SIZE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, post_id, reaction_type, delta):
+        with self._lock:
+            self._pending[(post_id, reaction_type)] += delta
+            size = len(self._pending)
+        if size >= self.flush_size:
+            self.flush()
+
+    def pending_for(self, post_ids):
+        """Unflushed deltas for ``post_ids`` so readers see their own writes."""
+        post_ids = set(post_ids)
+        with self._lock:
+            return {key: delta for key, delta in self._pending.items() if key[0] in post_ids and delta}
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._last_flush = time.monotonic()
+        deltas = {key: delta for key, delta in pending.items() if delta}
+        if not deltas:
+            return 0
+        try:
+            apply_deltas(deltas)
+        except Exception:
+            # Put the deltas back so the next flush retries them.
+            with self._lock:
+                for key, delta in deltas.items():
+                    self._pending[key] += delta
+            raise
+        return len(deltas)
+
+
+def apply_deltas(deltas):
+    """Apply {(post_id, reaction_type): delta} with one UPDATE per distinct (type, delta)."""
+    with transaction.atomic():
+        ForumReactionCount.objects.bulk_create(
+            [ForumReactionCount(post_id=post_id, reaction_type=reaction_type, count=0)
+             for post_id, reaction_type in deltas],
+            ignore_conflicts=True,
+        )
+        grouped = defaultdict(list)
+        for (post_id, reaction_type), delta in deltas.items():
+            grouped[(reaction_type, delta)].append(post_id)
+        for (reaction_type, delta), post_ids in grouped.items():
+            (ForumReactionCount.objects
+             .filter(reaction_type=reaction_type, post_id__in=post_ids)
+             .update(count=F('count') + delta))
+
+
+buffer = ReactionCounterBuffer()
+atexit.register(buffer.flush)
+
+
+def set_reaction(user, post, reaction_type, active):
+    """Make the user's reaction present (``active``) or absent. Returns ``active``.
+
+    Idempotent: repeating a request (a retry, a double click) leaves the
+    reaction and its counter as the first one did, and the unique constraint
+    on ForumReaction decides who wins a race.
+    """
+    if reaction_type not in REACTION_TYPE_KEYS:
+        raise ValueError(f"Unknown reaction type: {reaction_type}")
+
+    if not active:
+        deleted, _ = ForumReaction.objects.filter(post=post, user=user, reaction_type=reaction_type).delete()
+        if deleted:
+            buffer.add(post.pk, reaction_type, -1)
+        return False
+
+    try:
+        with transaction.atomic():
+            ForumReaction.objects.create(post=post, user=user, reaction_type=reaction_type)
+    except IntegrityError:
+        return True  # already there (this request repeated, or a concurrent one counted it)
+    buffer.add(post.pk, reaction_type, 1)
+    return True
+
+
+def reaction_totals(post_ids):
+    """Return {post_id: {reaction_type: count}} for ``post_ids`` in a single query."""
+    post_ids = list(post_ids)
+    totals = {post_id: dict.fromkeys(REACTION_TYPE_KEYS, 0) for post_id in post_ids}
+    rows = (ForumReactionCount.objects
+            .filter(post_id__in=post_ids)
+            .values_list('post_id', 'reaction_type', 'count'))
+    for post_id, reaction_type, count in rows:
+        totals[post_id][reaction_type] = count
+    for (post_id, reaction_type), delta in buffer.pending_for(post_ids).items():
+        totals[post_id][reaction_type] += delta
+    return totals
+
+
+def attach_reaction_totals(posts, user=None):
+    """Set ``post.reaction_totals`` on each post; one query for the whole page.
+
+    With ``user``, also set ``post.user_reactions`` (the reaction types that
+    user has given), in one more query.
+    """
+    totals = reaction_totals(post.pk for post in posts)
+    given = defaultdict(set)
+    if user is not None:
+        rows = (ForumReaction.objects.filter(user=user, post_id__in=[post.pk for post in posts])
+                .values_list('post_id', 'reaction_type'))
+        for post_id, reaction_type in rows:
+            given[post_id].add(reaction_type)
+    for post in posts:
+        post.reaction_totals = totals[post.pk]
+        if user is not None:
+            post.user_reactions = given[post.pk]
+    return posts
+
+
+def recount_reactions():
+    """Rebuild ForumReactionCount from ForumReaction. Returns the number of counter rows."""
+    buffer.flush()
+    rows = ForumReaction.objects.values('post_id', 'reaction_type').annotate(n=Count('id'))
+    with transaction.atomic():
+        ForumReactionCount.objects.all().delete()
+        ForumReactionCount.objects.bulk_create(
+            [ForumReactionCount(post_id=row['post_id'], reaction_type=row['reaction_type'], count=row['n'])
+             for row in rows],
+            batch_size=1000,
+        )
+    return ForumReactionCount.objects.count()
@@ -0,0 +1,166 @@
+# core/reports.py
+#
+# Background PatientReport generation.
+#
+# 1. The logs snapshot is built by streaming log rows (``archive.iter_logs``)
+#    through a JSON encoder straight into a SHA-256 hash and a zlib compressor, so the
+#    full history is never held in memory as model instances or one big string.
+# 2. Snapshots are stored once per content hash in ``LogSnapshot``; reports
+#    point at them instead of each carrying their own JSON copy.
+# 3. A clinician's whole panel is generated on a bounded thread pool, run as
+#    a background job (core.tasks.panel_reports), because each report waits
+#    on the LLM.
+
+import datetime
+import hashlib
+import json
+import logging
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+
+from . import archive
+from .llm import chat_completion, strip_code_fences
+from .models import LogSnapshot, PatientClinician, PatientReport, StabilityScore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DAYS = getattr(settings, "REPORT_SNAPSHOT_DAYS", 90)
+REPORT_CONCURRENCY = getattr(settings, "REPORT_CONCURRENCY", 4)
+PROMPT_DAYS = 14  # most recent entries included verbatim in the LLM prompt
+
+SNAPSHOT_FIELDS = [
+    "log_date", "weight_kg", "systolic_bp", "diastolic_bp", "heart_rate",
+    "blood_glucose", "temperature", "sleep_hours", "exercise_minutes",
+    "steps_count", "water_intake_liters", "stress_level", "mood_rating",
+    "symptoms", "diet_notes", "notes", "medication_taken",
+]
+
+
+# --------------------------
+# Snapshots
+# --------------------------
+
+def iter_log_rows(patient, days=SNAPSHOT_DAYS):
+    """Yield compact dicts (None values dropped) for the patient's recent logs, oldest first."""
+    since = datetime.date.today() - datetime.timedelta(days=days)
+    for row in archive.iter_logs(patient.pk, start=since, fields=SNAPSHOT_FIELDS):
+        row["log_date"] = row["log_date"].isoformat()
+        yield {key: value for key, value in row.items() if value is not None}
+
+
+def store_snapshot(rows, keep_last=PROMPT_DAYS):
+    """Compress and store ``rows`` (deduplicated by hash).
+
+    Returns ``(snapshot, recent_rows)`` where ``recent_rows`` are the last
+    ``keep_last`` rows, kept aside for the prompt while streaming.
+    """
+    digest = hashlib.sha256()
+    compressor = zlib.compressobj(6)
+    chunks = []
+    recent = deque(maxlen=keep_last)
+    raw_size = 0
+    count = 0
+
+    def feed(text):
+        nonlocal raw_size
+        data = text.encode("utf-8")
+        raw_size += len(data)
+        digest.update(data)
+        chunks.append(compressor.compress(data))
+
+    feed("[")
+    for row in rows:
+        feed(("," if count else "") + json.dumps(row, separators=(",", ":"), sort_keys=True))
+        recent.append(row)
+        count += 1
+    feed("]")
+    chunks.append(compressor.flush())
+
+    hexdigest = digest.hexdigest()
+    snapshot = LogSnapshot.objects.filter(digest=hexdigest).first()
+    if snapshot is None:
+        try:
+            with transaction.atomic():
+                snapshot = LogSnapshot.objects.create(
+                    digest=hexdigest,
+                    data=b"".join(chunks),
+                    entry_count=count,
+                    raw_size=raw_size,
+                )
+        except IntegrityError:
+            snapshot = LogSnapshot.objects.get(digest=hexdigest)
+    return snapshot, list(recent)
+
+
+# --------------------------
+# Report generation
+# --------------------------
+
+REPORT_PROMPT = """
+You are a clinical assistant AI preparing a brief for a patient's doctor.
+Review the patient's recent daily health logs and return JSON with these exact keys:
+- "summary": one short paragraph on overall trends and stability
+- "recommendations": a list of 2-4 suggested clinician actions, each an object with "action" and "reason"
+
+Return only valid JSON, no markdown.
+
+Latest stability score: {score}
+Daily logs ({count} days on record, most recent {shown} shown):
+{logs}
+"""
+
+
+def generate_report(patient, clinician):
+    """Build the snapshot, ask the LLM for a summary and save a PatientReport."""
+    snapshot, recent_rows = store_snapshot(iter_log_rows(patient))
+    latest = StabilityScore.objects.filter(user=patient).order_by("-score_date").values_list("score_value", flat=True).first()
+
+    prompt = REPORT_PROMPT.format(
+        score=latest if latest is not None else "not available",
+        count=snapshot.entry_count,
+        shown=len(recent_rows),
+        logs=json.dumps(recent_rows, indent=1),
+    )
+    cleaned = strip_code_fences(chat_completion(prompt, timeout=60, temperature=0.2, max_tokens=700))
+    try:
+        parsed = json.loads(cleaned)
+    except json.JSONDecodeError:
+        parsed = {"summary": cleaned, "recommendations": []}
+
+    return PatientReport.objects.create(
+        patient=patient,
+        clinician=clinician,
+        ai_summary=parsed.get("summary", ""),
+        ai_recommendations=parsed.get("recommendations", []),
+        stability_score=latest if latest is not None else parsed.get("stability_score") or 0,
+        logs_snapshot={"snapshot": snapshot.digest, "entries": snapshot.entry_count},
+        snapshot=snapshot,
+    )
+
+
+def _generate_for_link(link):
+    try:
+        return generate_report(link.patient, link.clinician)
+    except Exception:
+        logger.exception("Report generation failed for patient %s", link.patient_id)
+        return None
+    finally:
+        connections.close_all()  # worker threads own their DB connections
+
+
+def generate_panel_reports(clinician, concurrency=REPORT_CONCURRENCY):
+    """Generate a report for every patient on the clinician's panel; returns the reports created."""
+    links = (PatientClinician.objects
+             .filter(clinician=clinician)
+             .select_related("patient", "clinician")
+             .order_by("patient_id")
+             .distinct())
+    seen = set()
+    unique_links = [link for link in links if not (link.patient_id in seen or seen.add(link.patient_id))]
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="patient-report") as pool:
+        reports = list(pool.map(_generate_for_link, unique_links))
+    return [report for report in reports if report is not None]
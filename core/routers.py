@@ -0,0 +1,95 @@
+# core/routers.py
+#
+# Read-replica routing.
+#
+# Writes always go to 'default'. Reads go to the replica alias only inside
+# a ``replica_reads()`` block (or a view wrapped in ``@use_replica``) and
+# only when a replica is configured. To keep read-your-own-writes:
+#
+# - once a request writes anything, the rest of that request reads from
+#   the primary;
+# - ReplicaStickinessMiddleware then sets a short-lived cookie, so the
+#   same client's next requests (the redirect after a form post, the
+#   dashboard poll) also read from the primary until the replica catches up.
+#
+# Coordination tables (the job queue, sessions) are always read from the
+# primary: a lagging copy there causes duplicate work, not just stale pages.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+STICKY_COOKIE = 'vc_read_primary'
+PRIMARY_ONLY_APPS = {'jobs', 'sessions'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class _RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned  # client wrote recently (sticky cookie)
+        self.wrote = False  # this request has written
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """Let reads in this block use the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view):
+    """View decorator: serve the view's reads from the replica."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        state = _request_state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return None
+        return REPLICA_ALIAS if replica_configured() else None
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replica holds the same rows as the primary
+
+
+class ReplicaStickinessMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(pinned=STICKY_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote and replica_configured():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,266 @@
+# core/seed.py
+#
+# Synthetic data for development and benchmarks (``manage.py seed_data``).
+#
+# Everything is written with bulk_create in batches, so signals don't run;
+# the derived tables (community feeds, search index, reaction counters,
+# goal progress) are rebuilt once at the end instead. auto_now_add
+# timestamps are switched off while seeding so logs and posts can be spread
+# over the past instead of all landing on today. Seeded usernames start with
+# ``seed<seed>_`` and share the password ``password``.
+
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.utils import timezone
+from faker import Faker
+
+from forums.models import Comment, Post, Topic
+from .models import (
+    Clinician, DailyLog, ForumComment, ForumPost, ForumReaction, GroupMembership,
+    PatientClinician, StabilityScore, SupportGroup, UserGoal, UserProfile, REACTION_TYPES,
+)
+from .cache import dashboard_cache, forum_cache
+from .fields import keep_timestamps
+from .reactions import recount_reactions
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+PASSWORD = "password"  # every seeded account shares it
+
+# Presets named after the approximate total row count they produce
+SCALES = {
+    "1k": dict(patients=20, clinicians=2, days=30, groups=3, posts=60, comments=120, reactions=150, topics=4),
+    "100k": dict(patients=250, clinicians=10, days=365, groups=10, posts=2000, comments=5000, reactions=8000, topics=8),
+    "1m": dict(patients=1400, clinicians=40, days=730, groups=25, posts=20000, comments=50000, reactions=80000, topics=12),
+}
+
+CONDITIONS = ["Hypertension", "Type 2 Diabetes", "Asthma", "COPD", "Heart Failure", "Hypothyroidism", "Arthritis"]
+SPECIALIZATIONS = ["Cardiology", "Endocrinology", "Pulmonology", "General Medicine", "Nephrology"]
+GROUPS = [
+    ("Blood Pressure Warriors", "condition"), ("Diabetes Support Circle", "condition"),
+    ("Breathe Easy", "condition"), ("Heart Health Hub", "condition"), ("Morning Walkers", "lifestyle"),
+    ("Mindful Eating", "lifestyle"), ("Sleep Better", "lifestyle"), ("Stress Less", "lifestyle"),
+]
+TOPICS = ["Medication", "Nutrition", "Exercise", "Mental Health", "Sleep", "Caregivers",
+          "Test Results", "Success Stories", "Travel", "Insurance", "Recipes", "Questions"]
+GOALS = [("medication", 30, "days"), ("exercise", 30, "minutes"), ("sleep", 7, "hours"), ("diet", 20, "days")]
+
+
+def _bulk(model, objects, log):
+    """bulk_create an iterable in batches; returns the number of rows."""
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    log(f"  {model.__name__}: {total}")
+    return total
+
+
+def _past(rng, days, now):
+    return now - datetime.timedelta(days=rng.uniform(0, days), seconds=rng.randint(0, 86399))
+
+
+class Seeder:
+    def __init__(self, seed=0, log=print):
+        self.rng = random.Random(seed)
+        self.fake = Faker("en_IN")
+        self.fake.seed_instance(seed)
+        self.log = log
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+        self.prefix = f"seed{seed}"
+
+    def run(self, patients, clinicians, days, groups, posts, comments, reactions, topics):
+        models = (User, UserProfile, DailyLog, StabilityScore, PatientClinician, SupportGroup, GroupMembership,
+                  ForumPost, ForumComment, ForumReaction, Topic, Post, Comment, UserGoal)
+        with keep_timestamps(*models):
+            patient_ids, doctor_ids = self.users(patients, clinicians)
+            self.profiles(patient_ids, doctor_ids)
+            self.daily_logs(patient_ids, days)
+            self.scores(patient_ids, days)
+            self.goals(patient_ids)
+            group_ids = self.support_groups(patient_ids, groups)
+            post_ids = self.group_posts(patient_ids, group_ids, posts, days)
+            self.group_comments(patient_ids, post_ids, comments, days)
+            self.group_reactions(patient_ids, post_ids, reactions)
+            self.forum(patient_ids + doctor_ids, topics, posts, comments, days)
+
+        self.log("Rebuilding derived tables")
+        recount_reactions()
+        call_command("rebuild_feeds")
+        call_command("rebuild_search_index")
+        call_command("recompute_goal_progress")
+        dashboard_cache.invalidate()
+        forum_cache.invalidate()
+
+    # Accounts
+
+    def users(self, patients, clinicians):
+        password = make_password(PASSWORD)
+        start = User.objects.filter(username__startswith=self.prefix).count()
+
+        def accounts(count, offset, **flags):
+            for i in range(offset, offset + count):
+                first, last = self.fake.first_name(), self.fake.last_name()
+                yield User(
+                    username=f"{self.prefix}_{first.lower()}{i}", first_name=first, last_name=last,
+                    email=f"{first.lower()}.{last.lower()}{i}@example.com", password=password,
+                    date_joined=_past(self.rng, 1000, self.now), **flags,
+                )
+
+        _bulk(User, accounts(patients, start, is_user=True), self.log)
+        _bulk(User, accounts(clinicians, start + patients, is_doctor=True), self.log)
+        seeded = User.objects.filter(username__startswith=self.prefix).order_by("-pk")
+        doctor_ids = list(seeded.filter(is_doctor=True).values_list("pk", flat=True)[:clinicians])
+        patient_ids = list(seeded.filter(is_user=True).values_list("pk", flat=True)[:patients])
+        return patient_ids, doctor_ids
+
+    def profiles(self, patient_ids, doctor_ids):
+        rng, fake = self.rng, self.fake
+        _bulk(UserProfile, (UserProfile(
+            user_id=user_id, is_filled=True,
+            date_of_birth=fake.date_of_birth(minimum_age=25, maximum_age=85),
+            gender=rng.choice(["M", "F", "O"]),
+            primary_condition=rng.choice(CONDITIONS),
+            medications=", ".join(fake.words(rng.randint(1, 3))).title(),
+            smoking_status=rng.choice(["Never", "Former", "Current"]),
+            alcohol_consumption=rng.choice(["None", "Occasional", "Regular"]),
+            height_cm=rng.randint(150, 190), weight_kg=round(rng.uniform(50, 110), 1),
+            resting_heart_rate=rng.randint(55, 90), created_at=self.now,
+        ) for user_id in patient_ids), self.log)
+
+        _bulk(Clinician, (Clinician(
+            user_id=user_id, specialization=rng.choice(SPECIALIZATIONS),
+            license_number=f"MCI-{rng.randint(100000, 999999)}", hospital_affiliation=f"{fake.city()} General Hospital",
+        ) for user_id in doctor_ids), self.log)
+
+        clinician_ids = list(Clinician.objects.filter(user_id__in=doctor_ids).values_list("pk", flat=True))
+        if clinician_ids:
+            _bulk(PatientClinician, (PatientClinician(
+                patient_id=user_id, clinician_id=rng.choice(clinician_ids), created_at=self.now,
+            ) for user_id in patient_ids), self.log)
+
+    # Health data
+
+    def daily_logs(self, patient_ids, days):
+        rng = self.rng
+
+        def logs():
+            for user_id in patient_ids:
+                systolic = rng.gauss(128, 12)
+                glucose = rng.gauss(120, 25)
+                adherence = rng.uniform(0.6, 0.98)
+                for offset in range(days):
+                    if rng.random() < 0.15:  # skipped days
+                        continue
+                    day = self.today - datetime.timedelta(days=offset)
+                    stamp = timezone.make_aware(datetime.datetime.combine(day, datetime.time(21)))
+                    yield DailyLog(
+                        user_id=user_id, log_date=day, created_at=stamp, updated_at=stamp,
+                        weight_kg=round(rng.gauss(75, 12), 1),
+                        systolic_bp=int(rng.gauss(systolic, 8)), diastolic_bp=int(rng.gauss(82, 6)),
+                        heart_rate=int(rng.gauss(74, 8)), blood_glucose=round(rng.gauss(glucose, 15), 1),
+                        temperature=round(rng.gauss(98.4, 0.6), 1),  # °F, like the log form
+                        sleep_hours=round(min(max(rng.gauss(6.8, 1.1), 3), 11), 1),
+                        exercise_minutes=max(0, int(rng.gauss(28, 18))), steps_count=max(0, int(rng.gauss(6500, 2500))),
+                        water_intake_liters=round(min(max(rng.gauss(2.0, 0.6), 0.5), 4.5), 1),
+                        stress_level=rng.randint(1, 5), mood_rating=rng.randint(3, 10),
+                        symptoms=rng.choice(["", "", "", "headache", "fatigue", "dizziness", "shortness of breath"]) or None,
+                        diet_notes=self.fake.sentence(nb_words=6) if rng.random() < 0.4 else None,
+                        medication_taken=rng.random() < adherence,
+                    )
+
+        _bulk(DailyLog, logs(), self.log)
+
+    def scores(self, patient_ids, days):
+        rng = self.rng
+        _bulk(StabilityScore, (StabilityScore(
+            user_id=user_id, score_date=self.now - datetime.timedelta(days=offset),
+            updated_at=self.now - datetime.timedelta(days=offset),
+            score_value=max(5, min(100, int(rng.gauss(65, 18)))),
+            risk_prediction=self.fake.sentence(nb_words=12), ai_response_raw={},
+        ) for user_id in patient_ids for offset in range(0, days, 7)), self.log)
+
+    def goals(self, patient_ids):
+        rng = self.rng
+        _bulk(UserGoal, (UserGoal(
+            user_id=user_id, goal_type=goal_type, target_value=target, unit=unit, created_at=self.now,
+        ) for user_id in patient_ids for goal_type, target, unit in rng.sample(GOALS, 2)), self.log)
+
+    # Community
+
+    def support_groups(self, patient_ids, groups):
+        rng = self.rng
+        names = [GROUPS[i % len(GROUPS)] for i in range(groups)]
+        _bulk(SupportGroup, (SupportGroup(
+            name=name if i < len(GROUPS) else f"{name} {i // len(GROUPS) + 1}", category=category,
+            description=self.fake.paragraph(nb_sentences=2), created_at=self.now,
+        ) for i, (name, category) in enumerate(names)), self.log)
+        group_ids = list(SupportGroup.objects.order_by("-pk").values_list("pk", flat=True)[:groups])
+        _bulk(GroupMembership, (GroupMembership(
+            group_id=group_id, user_id=user_id, joined_at=_past(rng, 365, self.now),
+        ) for user_id in patient_ids for group_id in rng.sample(group_ids, min(len(group_ids), rng.randint(1, 3)))),
+            self.log)
+        return group_ids
+
+    def group_posts(self, patient_ids, group_ids, count, days):
+        rng = self.rng
+        _bulk(ForumPost, (ForumPost(
+            group_id=rng.choice(group_ids), user_id=rng.choice(patient_ids),
+            content=self.fake.paragraph(nb_sentences=rng.randint(1, 4)),
+            is_milestone=rng.random() < 0.1, created_at=_past(rng, days, self.now),
+        ) for _ in range(count)), self.log)
+        return list(ForumPost.objects.order_by("-pk").values_list("pk", flat=True)[:count])
+
+    def group_comments(self, patient_ids, post_ids, count, days):
+        rng = self.rng
+        _bulk(ForumComment, (ForumComment(
+            post_id=rng.choice(post_ids), user_id=rng.choice(patient_ids),
+            content=self.fake.sentence(nb_words=rng.randint(5, 20)), created_at=_past(rng, days, self.now),
+        ) for _ in range(count)), self.log)
+
+    def group_reactions(self, patient_ids, post_ids, count):
+        rng = self.rng
+        types = [key for key, _ in REACTION_TYPES]
+        seen = set()
+        reactions = []
+        for _ in range(count):
+            key = (rng.choice(post_ids), rng.choice(patient_ids), rng.choice(types))
+            if key not in seen:
+                seen.add(key)
+                reactions.append(ForumReaction(post_id=key[0], user_id=key[1], reaction_type=key[2], created_at=self.now))
+        _bulk(ForumReaction, reactions, self.log)
+
+    def forum(self, user_ids, topics, posts, comments, days):
+        rng = self.rng
+        existing = set(Topic.objects.values_list("name", flat=True))
+        _bulk(Topic, (Topic(name=name, slug=name.lower().replace(" ", "-"), description=self.fake.sentence())
+                      for name in TOPICS[:topics] if name not in existing), self.log)
+        topic_ids = list(Topic.objects.filter(name__in=TOPICS[:topics]).values_list("pk", flat=True))
+
+        def forum_posts():
+            for _ in range(posts):
+                created = _past(rng, days, self.now)
+                yield Post(topic_id=rng.choice(topic_ids), author_id=rng.choice(user_ids),
+                           title=self.fake.sentence(nb_words=rng.randint(4, 9)).rstrip("."),
+                           content="\n\n".join(self.fake.paragraphs(rng.randint(1, 3))),
+                           created_at=created, updated_at=created)
+
+        _bulk(Post, forum_posts(), self.log)
+        post_ids = list(Post.objects.order_by("-pk").values_list("pk", flat=True)[:posts])
+        _bulk(Comment, (Comment(
+            post_id=rng.choice(post_ids), author_id=rng.choice(user_ids),
+            content=self.fake.paragraph(nb_sentences=rng.randint(1, 3)), created_at=_past(rng, days, self.now),
+        ) for _ in range(comments)), self.log)
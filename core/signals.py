@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Clinician, ClinicianAction, DailyLog, ForumPost, GroupMembership, Nudge, StabilityScore, UserGoal, UserProfile,
+)
+from . import archive, db, feed, goals, identity, reactions, sync
+from .cache import dashboard_cache
+
+
+# --------------------------
+# Database Connections
+# --------------------------
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    db.apply_sqlite_pragmas(connection)
+
+
+# --------------------------
+# Community Feed
+# --------------------------
+
+@receiver(post_save, sender=ForumPost)
+def push_post_to_feeds(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: feed.fan_out_post(instance))
+
+
+@receiver(post_save, sender=GroupMembership)
+def membership_joined(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.refresh_group_mode(instance.group)
+        if not instance.group.fanout_on_read:
+            feed.backfill_member(instance.user_id, instance.group_id)
+
+
+@receiver(post_delete, sender=GroupMembership)
+def membership_left(sender, instance, **kwargs):
+    feed.remove_member(instance.user_id, instance.group_id)
+    feed.refresh_group_mode(instance.group)
+
+
+# --------------------------
+# Reaction Counters
+# --------------------------
+
+@receiver(request_finished)
+def flush_reaction_counters(sender, **kwargs):
+    reactions.buffer.flush_if_due()
+
+
+# --------------------------
+# Goal Progress
+# --------------------------
+
+@receiver(post_save, sender=DailyLog)
+def daily_log_saved(sender, instance, raw=False, **kwargs):
+    if archive.moving():
+        return
+    dashboard_cache.invalidate(group=f"user:{instance.user_id}")
+    if not raw:
+        goals.evaluate_log(instance)
+
+
+@receiver(post_delete, sender=DailyLog)
+def daily_log_deleted(sender, instance, **kwargs):
+    if archive.moving():
+        return
+    dashboard_cache.invalidate(group=f"user:{instance.user_id}")
+    goals.forget_log(instance)
+
+
+@receiver(post_save, sender=StabilityScore)
+def stability_score_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        goals.evaluate_score(instance)
+
+
+@receiver(post_save, sender=UserGoal)
+def user_goal_saved(sender, instance, raw=False, **kwargs):
+    # A new goal or a changed target re-judges every past day
+    if not raw:
+        goals.recompute_goal(instance)
+
+
+# --------------------------
+# Identity Cache
+# --------------------------
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    identity.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Clinician)
+@receiver(post_delete, sender=Clinician)
+def identity_changed(sender, instance, **kwargs):
+    identity.invalidate_user(instance.user_id)
+
+
+# --------------------------
+# Sync Tombstones
+# --------------------------
+
+@receiver(post_delete, sender=DailyLog)
+@receiver(post_delete, sender=Nudge)
+@receiver(post_delete, sender=ClinicianAction)
+@receiver(post_delete, sender=StabilityScore)
+def synced_row_deleted(sender, instance, **kwargs):
+    # Archiving moves logs out of the table; clients keep them
+    if not archive.moving():
+        sync.record_deletion(instance)
@@ -348,4 +348,24 @@ skeletonStyle.textContent = `
 `;
 document.head.appendChild(skeletonStyle);
 
-console.log('🚀 Enhanced Dashboard JavaScript loaded successfully!');
\ No newline at end of file
+console.log('🚀 Enhanced Dashboard JavaScript loaded successfully!');
+// Set community reactions without reloading the dashboard; each form posts the state it wants (active=0/1)
+document.querySelectorAll('.reaction-form').forEach(form => {
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {'X-Requested-With': 'XMLHttpRequest'}
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.totals) return;
+                const type = form.querySelector('[name="reaction_type"]').value;
+                form.querySelector('.reaction-count').textContent = data.totals[type];
+                form.querySelector('button').classList.toggle('active', data.active);
+                // The next click asks for the opposite of the state the server confirmed
+                form.querySelector('[name="active"]').value = data.active ? '0' : '1';
+            });
+    });
+});
@@ -0,0 +1,135 @@
+# core/staticfiles.py
+#
+# Static asset pipeline.
+#
+# collectstatic (with CompressedManifestStaticFilesStorage) writes every file
+# under a content-hashed name, e.g. dashboard.3f2a9c81b0de.js, and next to
+# each text asset a .gz and, if the optional ``brotli`` package is
+# installed, a .br copy. StaticAssetMiddleware then serves STATIC_ROOT
+# itself:
+#
+# - the precompressed variant the browser accepts is sent as-is;
+# - hashed names get a one-year ``immutable`` Cache-Control, because a
+#   changed file gets a new name, so repeat visits make no asset requests;
+# - ETag / Last-Modified make any revalidation of unhashed names a 304.
+#
+# It is a stand-in for WhiteNoise with no extra dependency and only runs
+# when DEBUG is off (runserver serves static files in development).
+
+import gzip
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always produced
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.svg', '.txt', '.xml', '.html', '.ttf', '.eot', '.ico', '.map')
+MIN_COMPRESS_SIZE = 256  # bytes
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 60)  # seconds, for names without a hash
+
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz (and .br) copies of text assets."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self.compress(self.path(name))
+
+    @staticmethod
+    def compress(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data) * 0.95:  # not worth it otherwise
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+class StaticAsset:
+    def __init__(self, path, name):
+        stat = os.stat(path)
+        self.path = path
+        self.name = name
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'image/svg+xml'):
+            self.content_type += '; charset=utf-8'
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if _HASHED_NAME.search(name) else f'public, max-age={STATIC_MAX_AGE}'
+        # encoding -> file, best first
+        self.variants = {encoding: path + suffix
+                         for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+                         if os.path.exists(path + suffix)}
+
+
+class StaticAssetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = settings.STATIC_ROOT
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.enabled = bool(self.root) and getattr(settings, 'STATIC_SERVE', not settings.DEBUG)
+        self._assets = None
+
+    @property
+    def assets(self):
+        # Indexed once per process: collectstatic runs before the server starts
+        if self._assets is None:
+            assets = {}
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.endswith(('.gz', '.br')):
+                        continue
+                    path = os.path.join(directory, filename)
+                    name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    assets[name] = StaticAsset(path, name)
+            self._assets = assets
+        return self._assets
+
+    def __call__(self, request):
+        if self.enabled and request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            asset = self.assets.get(request.path_info[len(self.prefix):])
+            if asset is not None:
+                return self.serve(request, asset)
+        return self.get_response(request)
+
+    def serve(self, request, asset):
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = next((e for e in asset.variants if e in accepted), None)
+        etag = f'{asset.etag[:-1]}-{encoding}"' if encoding else asset.etag
+        path = asset.variants[encoding] if encoding else asset.path
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=asset.content_type)
+            response['Content-Length'] = os.path.getsize(path)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+        if encoding and response.status_code == 200:
+            response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = asset.last_modified
+        response['Cache-Control'] = asset.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,174 @@
+# core/sync.py
+#
+# Delta sync for mobile clients.
+#
+# Instead of refetching whole lists, a client keeps an opaque cursor and
+# asks for what changed since: GET /api/sync/?cursor=... returns the
+# patient's DailyLogs, Nudges, ClinicianActions and StabilityScores whose
+# updated_at moved past the cursor, the ids of rows deleted since
+# (SyncTombstone, written by a post_delete receiver in core.signals) and
+# the next cursor. Without a cursor it returns everything in the hot
+# tables (archived logs are only in the CSV export).
+#
+# All sources are read in one UNION ALL query of (updated_at, kind, id)
+# ordered by that key, each branch on its (user, updated_at) index, so a
+# sync with nothing new is that one query; full rows are only loaded for
+# the ids it returns. The cursor is the last key sent (keyset pagination:
+# ``has_more`` means ask again right away).
+#
+# updated_at is stamped when a row is written, not when its transaction
+# commits, so a row can become visible with a stamp older than rows a
+# client has already been sent. The cursor therefore never moves past
+# ``now - SYNC_SETTLE_SECONDS``: rows newer than that are sent as soon as
+# they are seen but are sent again on the next sync (clients apply changes
+# and tombstones idempotently, by id). The guarantee: every change is
+# delivered at least once provided its transaction commits within
+# SYNC_SETTLE_SECONDS of stamping its rows, so the setting has to exceed
+# the longest write transaction on the synced tables (core.ingest restamps
+# its batch just before committing to keep that short). Tombstones are
+# kept for SYNC_TOMBSTONE_DAYS (`manage.py purge_sync_tombstones`); a
+# cursor older than that gets ``reset`` and has to sync from scratch.
+
+import base64
+import binascii
+import datetime
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import CharField, Q, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ClinicianAction, DailyLog, Nudge, StabilityScore, SyncTombstone
+
+SETTLE_SECONDS = getattr(settings, 'SYNC_SETTLE_SECONDS', 60)
+TOMBSTONE_DAYS = getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90)
+PAGE_SIZE = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+
+
+class Source(NamedTuple):
+    model: type
+    user_field: str
+    fields: tuple
+
+
+SOURCES = {
+    "clinician_actions": Source(ClinicianAction, "patient", (
+        "id", "report_id", "clinician_id", "action_type", "action_text", "acknowledged_by_patient",
+        "created_at", "updated_at")),
+    "daily_logs": Source(DailyLog, "user", tuple(
+        field.attname for field in DailyLog._meta.concrete_fields if field.attname != "user_id")),
+    "nudges": Source(Nudge, "user", ("id", "nudge_date", "message", "context_reason", "created_at", "updated_at")),
+    "stability_scores": Source(StabilityScore, "user", (
+        "id", "score_date", "score_value", "risk_prediction", "updated_at")),
+}
+DELETED = "deleted"  # kind of the tombstone branch
+SOURCE_BY_MODEL = {source.model: (kind, source) for kind, source in SOURCES.items()}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# --------------------------
+# Cursors
+# --------------------------
+
+def encode_cursor(key):
+    moment, kind, pk = key
+    raw = json.dumps([moment.isoformat(), kind, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        moment, kind, pk = json.loads(raw)
+        moment = parse_datetime(moment)
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if moment is None or not isinstance(kind, str) or not isinstance(pk, int):
+        raise InvalidCursor(cursor)
+    return moment, kind, pk
+
+
+def _after(kind, time_field, key):
+    """Rows of ``kind`` that sort after the cursor key (updated_at, kind, id)."""
+    moment, cursor_kind, pk = key
+    if kind > cursor_kind:
+        return Q(**{f"{time_field}__gte": moment})
+    if kind < cursor_kind:
+        return Q(**{f"{time_field}__gt": moment})
+    return Q(**{f"{time_field}__gt": moment}) | Q(**{time_field: moment, "pk__gt": pk})
+
+
+# --------------------------
+# Changes
+# --------------------------
+
+def changes(user_id, cursor=None, limit=PAGE_SIZE):
+    """One page of the user's changes after ``cursor``, as the API's response dict."""
+    now = timezone.now()
+    key = decode_cursor(cursor) if cursor else None
+    if key is not None and key[0] < now - datetime.timedelta(days=TOMBSTONE_DAYS):
+        return {"reset": True}
+    upper = now - datetime.timedelta(seconds=SETTLE_SECONDS)
+
+    branches = []
+    for kind, source in [*SOURCES.items(), (DELETED, None)]:
+        if source is None:
+            qs, user_field, time_field = SyncTombstone.objects.all(), "user", "deleted_at"
+        else:
+            qs, user_field, time_field = source.model.objects.all(), source.user_field, "updated_at"
+        qs = qs.filter(**{user_field: user_id})
+        if key is not None:
+            qs = qs.filter(_after(kind, time_field, key))
+        branches.append(qs.order_by().annotate(source=Value(kind, output_field=CharField()))
+                        .values_list(time_field, "source", "pk"))
+    first, *rest = branches
+    page = list(first.union(*rest, all=True).order_by("updated_at", "source", "id")[:limit + 1])
+
+    # A full page of settled rows continues from its last key. Otherwise
+    # every settled row has been sent and the cursor stops at ``upper``;
+    # the unsettled rows in the page are sent again next time.
+    has_more = len(page) > limit and page[limit - 1][0] <= upper
+    page = page[:limit]
+    ids = {}
+    for _, kind, pk in page:
+        ids.setdefault(kind, []).append(pk)
+
+    response = {"changes": {kind: [] for kind in SOURCES}, "deleted": {kind: [] for kind in SOURCES}}
+    for kind, source in SOURCES.items():
+        if ids.get(kind):
+            response["changes"][kind] = list(
+                source.model.objects.filter(pk__in=ids[kind]).order_by("updated_at", "pk").values(*source.fields))
+    if ids.get(DELETED):
+        for kind, object_id in (SyncTombstone.objects.filter(pk__in=ids[DELETED]).order_by("deleted_at", "pk")
+                                .values_list("kind", "object_id")):
+            response["deleted"][kind].append(object_id)
+
+    if has_more:
+        next_key = page[-1]
+    else:
+        next_key = max(key, (upper, "", 0)) if key is not None else (upper, "", 0)
+    response["cursor"] = encode_cursor(next_key)
+    response["has_more"] = has_more
+    return response
+
+
+# --------------------------
+# Tombstones
+# --------------------------
+
+def record_deletion(instance):
+    """Leave a tombstone for a deleted row of a synced model."""
+    kind, source = SOURCE_BY_MODEL[type(instance)]
+    SyncTombstone.objects.create(user_id=getattr(instance, f"{source.user_field}_id"), kind=kind,
+                                 object_id=instance.pk)
+
+
+def purge_tombstones(days=TOMBSTONE_DAYS):
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,87 @@
+# core/tasks.py
+#
+# Slow work that runs on the job queue (see the jobs app) instead of
+# inside an HTTP request.
+
+import datetime
+import json
+
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue, get_or_enqueue, task
+from . import goals
+from .llm import chat_completion, strip_code_fences
+from .models import Clinician, DailyLog
+from .nudges import run_nudges
+from .reports import generate_panel_reports
+
+
+@task
+def goal_summary(simplified_logs, monthly_active_count, current_streak):
+    """Ask the LLM for the goal dashboard's weekly health summary."""
+    prompt = f"""
+You are a health coach AI for an Indian audience.
+Analyze the last 7 days of health data and return JSON with these exact keys:
+- "summary": brief paragraph about overall trends
+- "praise": 1-2 positive points about good habits
+- "warnings": 1-2 concerns or areas needing attention  
+- "suggestions": 2-3 specific actionable recommendations
+
+Return only valid JSON, no markdown.
+
+Health Data: {json.dumps(simplified_logs, indent=2)}
+Monthly Stats: {monthly_active_count} active days, Current streak: {current_streak} days.
+"""
+
+    llm_output = chat_completion(prompt, timeout=20, cache_timeout=6 * 3600, temperature=0.1, max_tokens=500)
+    cleaned = strip_code_fences(llm_output)
+
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return {"summary": cleaned}
+
+
+@task
+def evaluate_logs(user_id, dates):
+    """Update goal progress for logs upserted in bulk by the ingestion API (which skips post_save)."""
+    logs = list(DailyLog.objects.filter(user_id=user_id, log_date__in=dates))
+    for log in logs:
+        goals.evaluate_log(log)
+    return len(logs)
+
+
+@task
+def panel_reports(clinician_id):
+    """Generate reports for every patient on a clinician's panel."""
+    clinician = Clinician.objects.get(pk=clinician_id)
+    return len(generate_panel_reports(clinician))
+
+
+NIGHTLY_NUDGES_KEY = "nightly-nudges"
+NIGHTLY_NUDGES_AT = datetime.time(2, 0)  # local time
+
+
+def _next_nudge_run(now=None):
+    now = timezone.localtime(now)
+    run_at = timezone.make_aware(datetime.datetime.combine(now.date(), NIGHTLY_NUDGES_AT))
+    return run_at if run_at > now else run_at + datetime.timedelta(days=1)
+
+
+def schedule_nightly_nudges():
+    """Start the nightly_nudges chain unless a run is already queued or running; returns that Job."""
+    return get_or_enqueue(nightly_nudges, NIGHTLY_NUDGES_KEY, reuse_done=False, run_at=_next_nudge_run())
+
+
+@task
+def nightly_nudges():
+    """Schedule tomorrow night's run, then run the nudge rules for every patient.
+
+    The next run is queued first so a failing run doesn't end the chain; a
+    retry finds it already queued and doesn't add another.
+    """
+    if not Job.objects.filter(key=NIGHTLY_NUDGES_KEY, status=Job.QUEUED).exists():
+        enqueue(nightly_nudges, run_at=_next_nudge_run(), key=NIGHTLY_NUDGES_KEY)
+    created, metrics = run_nudges()
+    return {"created": created, "rules": metrics}
@@ -0,0 +1,11 @@
+from django import template
+
+from core.assets import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """``{% vendor_asset 'bootstrap.css' %}``: self-hosted copy if vendored, else the CDN."""
+    return vendor_url(name)
@@ -1,3 +1,1171 @@
-from django.test import TestCase
+# core/tests.py
 
-# Create your tests here.
+import datetime
+import gzip
+import io
+import json
+import marshal
+import os
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Max, Min
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from . import (archive, assets, cache, db, feed, goals, identity, metrics, nudges, profiling, reactions, reports,
+               routers, sync, tasks, vitals)
+from .fields import compress_json, decompress_json
+from .forms import DAILY_LOG_RANGES
+from .llm import chat_completion
+from .models import (Clinician, ClinicianAction, DailyLog, DailyLogArchive, FeedEntry, ForumPost, ForumReaction,
+                     ForumReactionCount, GoalProgress, GroupMembership, IngestRequest, IngestToken, LogSnapshot,
+                     Nudge, PatientClinician, PatientReport, RequestProfile, StabilityScore, SupportGroup, UserGoal,
+                     UserProfile, VitalSeries)
+from .panel import high_risk_patients, patient_panel
+from .staticfiles import STATIC_MAX_AGE, CompressedManifestStaticFilesStorage, StaticAssetMiddleware
+from .timing import RequestTimingMiddleware, measure
+
+User = get_user_model()
+
+# No collectstatic in tests: templates resolve {% static %} without the manifest
+PLAIN_STATIC = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+
+
+# --------------------------
+# Community feed
+# --------------------------
+
+class CommunityFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='x', is_user=True)
+        cls.bob = User.objects.create_user('bob', password='x', is_user=True)
+        cls.carol = User.objects.create_user('carol', password='x', is_user=True)
+        cls.group = SupportGroup.objects.create(name='Hypertension', description='', category='condition')
+        GroupMembership.objects.create(group=cls.group, user=cls.alice)
+        GroupMembership.objects.create(group=cls.group, user=cls.bob)
+
+    def test_posts_are_pushed_to_members(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = ForumPost.objects.create(group=self.group, user=self.alice, content='Down to 128/82 this week')
+        self.assertEqual(set(FeedEntry.objects.filter(post=post).values_list('user_id', flat=True)),
+                         {self.alice.pk, self.bob.pk})
+        self.assertEqual(feed.community_feed(self.bob), [post])
+        self.assertEqual(feed.community_feed(self.carol), [])
+
+    def test_joining_backfills_and_leaving_clears(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = ForumPost.objects.create(group=self.group, user=self.alice, content='Salt swaps that worked')
+        membership = GroupMembership.objects.create(group=self.group, user=self.carol)
+        self.assertEqual(feed.community_feed(self.carol), [post])
+        membership.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.carol).exists())
+
+    @mock.patch('core.feed.FEED_FANOUT_MAX_MEMBERS', 2)
+    def test_large_groups_are_read_on_demand(self):
+        membership = GroupMembership.objects.create(group=self.group, user=self.carol)
+        self.group.refresh_from_db()
+        self.assertTrue(self.group.fanout_on_read)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = ForumPost.objects.create(group=self.group, user=self.alice, content='Morning walks')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(feed.community_feed(self.carol), [post])
+
+        # Back under half the limit: pushed again, with recent posts backfilled
+        membership.delete()
+        GroupMembership.objects.filter(group=self.group, user=self.bob).delete()
+        self.group.refresh_from_db()
+        self.assertFalse(self.group.fanout_on_read)
+        self.assertEqual(list(FeedEntry.objects.filter(post=post).values_list('user_id', flat=True)), [self.alice.pk])
+
+
+# --------------------------
+# Reactions
+# --------------------------
+
+class ReactionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='x', is_user=True)
+        cls.bob = User.objects.create_user('bob', password='x', is_user=True)
+        group = SupportGroup.objects.create(name='Diabetes', description='', category='condition')
+        cls.post = ForumPost.objects.create(group=group, user=cls.alice, content='A1c down to 6.4')
+
+    def setUp(self):
+        self.addCleanup(reactions.buffer.flush)
+
+    def stored_count(self, reaction_type='like'):
+        row = ForumReactionCount.objects.filter(post=self.post, reaction_type=reaction_type).first()
+        return row.count if row else 0
+
+    def test_set_reaction_is_idempotent(self):
+        self.assertTrue(reactions.set_reaction(self.bob, self.post, 'like', True))
+        self.assertTrue(reactions.set_reaction(self.bob, self.post, 'like', True))
+        reactions.set_reaction(self.alice, self.post, 'like', True)
+        reactions.buffer.flush()
+        self.assertEqual(self.stored_count(), 2)
+
+        self.assertFalse(reactions.set_reaction(self.bob, self.post, 'like', False))
+        self.assertFalse(reactions.set_reaction(self.bob, self.post, 'like', False))
+        reactions.buffer.flush()
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_totals_include_unflushed_deltas(self):
+        reactions.set_reaction(self.bob, self.post, 'celebrate', True)
+        self.assertEqual(self.stored_count('celebrate'), 0)
+        self.assertEqual(reactions.reaction_totals([self.post.pk])[self.post.pk],
+                         {'like': 0, 'celebrate': 1, 'support': 0})
+        reactions.attach_reaction_totals([self.post], user=self.bob)
+        self.assertEqual(self.post.user_reactions, {'celebrate'})
+
+    def test_buffer_coalesces_per_post_and_type(self):
+        buffer = reactions.ReactionCounterBuffer(flush_interval=60, flush_size=100)
+        for _ in range(3):
+            buffer.add(self.post.pk, 'support', 1)
+        buffer.add(self.post.pk, 'like', 1)
+        buffer.add(self.post.pk, 'like', -1)
+        self.assertEqual(buffer.flush(), 1)  # the like deltas cancelled out
+        self.assertEqual(self.stored_count('support'), 3)
+
+    def test_recount(self):
+        ForumReaction.objects.create(post=self.post, user=self.bob, reaction_type='like')
+        ForumReactionCount.objects.create(post=self.post, reaction_type='like', count=7)
+        reactions.recount_reactions()
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_view_sets_explicit_state(self):
+        self.client.force_login(self.bob)
+        url = reverse('core:react', args=[self.post.pk])
+        for _ in range(2):  # a double submit changes nothing the second time
+            response = self.client.post(url, {'reaction_type': 'like', 'active': '1'})
+            self.assertEqual(response.json(), {'active': True, 'totals': {'like': 1, 'celebrate': 0, 'support': 0}})
+        response = self.client.post(url, {'reaction_type': 'like', 'active': '0'})
+        self.assertEqual(response.json()['totals']['like'], 0)
+        self.assertEqual(self.client.post(url, {'reaction_type': 'like'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'reaction_type': 'boo', 'active': '1'}).status_code, 400)
+
+
+# --------------------------
+# Patient panel
+# --------------------------
+
+class PatientPanelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        doctor = User.objects.create_user('doctor', password='x')
+        cls.clinician = Clinician.objects.create(user=doctor, specialization='Cardiology', license_number='C-1')
+        cls.stable = User.objects.create_user('stable', password='x', is_user=True)
+        cls.critical = User.objects.create_user('critical', password='x', is_user=True)
+        cls.unscored = User.objects.create_user('unscored', password='x', is_user=True)
+        cls.other = User.objects.create_user('not_mine', password='x', is_user=True)
+        for patient in (cls.stable, cls.critical, cls.unscored):
+            PatientClinician.objects.create(patient=patient, clinician=cls.clinician)
+
+        StabilityScore.objects.create(user=cls.stable, score_value=20, risk_prediction='', ai_response_raw={})
+        StabilityScore.objects.create(user=cls.stable, score_value=85, risk_prediction='', ai_response_raw={})
+        StabilityScore.objects.create(user=cls.critical, score_value=25, risk_prediction='', ai_response_raw={})
+        StabilityScore.objects.create(user=cls.other, score_value=10, risk_prediction='', ai_response_raw={})
+        DailyLog.objects.create(user=cls.stable, log_date=datetime.date(2026, 3, 1))
+        DailyLog.objects.create(user=cls.critical, log_date=datetime.date(2026, 3, 9))
+        report = PatientReport.objects.create(patient=cls.unscored, clinician=cls.clinician, ai_summary='',
+                                              ai_recommendations=[], stability_score=50, logs_snapshot=[])
+        for _ in range(2):
+            ClinicianAction.objects.create(report=report, clinician=cls.clinician, patient=cls.unscored,
+                                           action_type='advice', action_text='Call the clinic')
+
+    def test_orderings(self):
+        def names(sort):
+            return [patient.username for patient in patient_panel(self.clinician, sort)]
+        self.assertEqual(names('risk'), ['critical', 'stable', 'unscored'])
+        self.assertEqual(names('open_actions'), ['unscored', 'critical', 'stable'])
+        self.assertEqual(names('last_log'), ['stable', 'critical', 'unscored'])
+
+    def test_one_query_for_the_panel(self):
+        with self.assertNumQueries(1):
+            patients = list(patient_panel(self.clinician))
+        self.assertEqual([(p.latest_score, p.open_actions) for p in patients], [(25, 0), (85, 0), (None, 2)])
+
+    def test_high_risk_uses_latest_score(self):
+        self.assertEqual([p.username for p in high_risk_patients(patient_panel(self.clinician))], ['critical'])
+
+    def test_api(self):
+        self.client.force_login(self.clinician.user)
+        data = self.client.get(reverse('core:patient-panel-api'), {'page_size': 2}).json()
+        self.assertEqual((data['count'], data['num_pages'], data['sort']), (3, 2, 'risk'))
+        self.assertEqual([(p['username'], p['risk_level']) for p in data['patients']],
+                         [('critical', 'high'), ('stable', 'low')])
+
+        self.client.force_login(self.stable)
+        self.assertEqual(self.client.get(reverse('core:patient-panel-api')).status_code, 403)
+
+    @override_settings(STORAGES=PLAIN_STATIC)
+    def test_dashboard_counts_high_risk_over_the_whole_panel(self):
+        self.client.force_login(self.clinician.user)
+        response = self.client.get(reverse('core:doctor-dashboard'))
+        self.assertEqual((response.context['patient_count'], response.context['high_risk_count']), (3, 1))
+        self.assertEqual([p.username for p in response.context['high_risk_patients']], ['critical'])
+
+
+# --------------------------
+# Patient reports
+# --------------------------
+
+class PatientReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        doctor = User.objects.create_user('gp', password='x')
+        cls.clinician = Clinician.objects.create(user=doctor, specialization='General', license_number='G-1')
+        cls.patient = User.objects.create_user('patient', password='x', is_user=True)
+        today = datetime.date.today()
+        for days_ago in (200, 3, 2, 1):
+            DailyLog.objects.create(user=cls.patient, log_date=today - datetime.timedelta(days=days_ago),
+                                    sleep_hours=7, systolic_bp=120 + days_ago)
+        StabilityScore.objects.create(user=cls.patient, score_value=64, risk_prediction='', ai_response_raw={})
+
+    def test_snapshot_rows_are_recent_and_compact(self):
+        rows = list(reports.iter_log_rows(self.patient))
+        self.assertEqual(len(rows), 3)  # the 200-day-old log is outside SNAPSHOT_DAYS
+        self.assertEqual(set(rows[0]), {'log_date', 'sleep_hours', 'systolic_bp', 'medication_taken'})
+
+    def test_snapshots_are_stored_once_per_content(self):
+        rows = list(reports.iter_log_rows(self.patient))
+        snapshot, recent = reports.store_snapshot(iter(rows), keep_last=2)
+        self.assertEqual(recent, rows[-2:])
+        self.assertEqual((snapshot.entry_count, snapshot.load()), (3, rows))
+        again, _ = reports.store_snapshot(iter(rows))
+        self.assertEqual((again.pk, LogSnapshot.objects.count()), (snapshot.pk, 1))
+
+    def test_generate_report(self):
+        reply = '```json\n{"summary": "Blood pressure easing", "recommendations": [{"action": "Review", "reason": "BP"}]}```'
+        with mock.patch('core.reports.chat_completion', return_value=reply) as llm:
+            report = reports.generate_report(self.patient, self.clinician)
+        self.assertIn('3 days on record', llm.call_args.args[0])
+        report = PatientReport.objects.get(pk=report.pk)
+        self.assertEqual((report.ai_summary, report.stability_score), ('Blood pressure easing', 64))
+        self.assertEqual(report.ai_recommendations, [{'action': 'Review', 'reason': 'BP'}])
+        self.assertEqual(len(report.get_logs()), 3)
+
+    @override_settings(GROQ_API_KEY='')
+    def test_llm_needs_an_api_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            chat_completion('Hello')
+
+
+# --------------------------
+# Nudges
+# --------------------------
+
+class NudgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date.today()
+        cls.hypertensive = User.objects.create_user('hypertensive', password='x', is_user=True)
+        cls.lapsed = User.objects.create_user('lapsed', password='x', is_user=True)
+        cls.newcomer = User.objects.create_user('newcomer', password='x', is_user=True)
+        for days_ago, systolic in enumerate([150, 148, 146]):
+            DailyLog.objects.create(user=cls.hypertensive, log_date=cls.today - datetime.timedelta(days=days_ago),
+                                    systolic_bp=systolic, sleep_hours=5, medication_taken=True)
+        DailyLog.objects.create(user=cls.lapsed, log_date=cls.today - datetime.timedelta(days=3), sleep_hours=8)
+
+    def test_features(self):
+        logs = [{'log_date': self.today - datetime.timedelta(days=n), 'sleep_hours': hours, 'systolic_bp': 130,
+                 'blood_glucose': None, 'stress_level': 2, 'medication_taken': n != 0, 'steps_count': 4000,
+                 'water_intake_liters': 2.0} for n, hours in enumerate([5, 5.5, 7, 4])]
+        features = nudges.compute_features(logs, self.today)
+        self.assertEqual((features['days_since_last_log'], features['low_sleep_streak']), (0, 2))
+        self.assertEqual((features['missed_medication_days'], features['latest_glucose']), (1, None))
+        self.assertEqual(nudges.compute_features([], self.today, last_log_date=None)['days_since_last_log'], None)
+
+    def test_highest_priority_rule_wins(self):
+        created, metrics = nudges.run_nudges()
+        self.assertEqual(created, 2)
+        self.assertEqual(Nudge.objects.get(user=self.hypertensive).context_reason,
+                         'Average systolic BP over the last 3 logs is 148 mmHg')
+        self.assertEqual(metrics['rising_bp']['emitted'], 1)
+        self.assertEqual(metrics['low_sleep_streak'], {'matched': 1, 'emitted': 0, 'errors': 0, 'seconds': 0.0})
+        self.assertFalse(Nudge.objects.filter(user=self.newcomer).exists())  # never logged
+
+    def test_one_nudge_per_day(self):
+        nudges.run_nudges()
+        self.assertEqual(nudges.run_nudges()[0], 0)
+        self.assertEqual(Nudge.objects.count(), 2)
+
+    def test_dry_run_saves_nothing(self):
+        self.assertEqual(nudges.run_nudges(dry_run=True)[0], 2)
+        self.assertFalse(Nudge.objects.exists())
+
+    def test_lapse_reminders_back_off(self):
+        due = [days for days in range(1, 100) if nudges._lapse_reminder_due(days)]
+        self.assertEqual(due, [3, 7, 14, 30, 60, 90])
+        self.assertEqual(nudges.run_nudges(today=self.today + datetime.timedelta(days=1))[1]['logging_lapsed']['matched'], 0)
+
+    def test_failing_rule_is_skipped(self):
+        broken = nudges.Rule('broken', priority=1000, when=lambda f: f['no_such_feature'], message='', reason='')
+        with self.assertLogs('core.nudges', 'ERROR'):
+            created, metrics = nudges.run_nudges(rules=[broken, *nudges.RULES])
+        self.assertEqual((created, metrics['broken']['errors']), (2, 2))
+
+
+class NightlyNudgeTests(TestCase):
+    def test_schedule_is_idempotent(self):
+        first = tasks.schedule_nightly_nudges()
+        self.assertEqual(tasks.schedule_nightly_nudges().pk, first.pk)
+        self.assertEqual(timezone.localtime(first.run_at).time(), tasks.NIGHTLY_NUDGES_AT)
+        self.assertGreater(first.run_at, timezone.now())
+
+    def test_next_run_is_queued_even_if_this_one_fails(self):
+        queue.enqueue(tasks.nightly_nudges, key=tasks.NIGHTLY_NUDGES_KEY, max_attempts=2)
+        with mock.patch('core.tasks.run_nudges', side_effect=RuntimeError('boom')):
+            queue.run_job(queue.claim_job('worker-1'))
+            Job.objects.filter(status=Job.QUEUED, attempts=1).update(run_at=timezone.now())
+            queue.run_job(queue.claim_job('worker-1'))  # the retry doesn't queue another
+
+        self.assertEqual(list(Job.objects.order_by('pk').values_list('status', flat=True)), [Job.FAILED, Job.QUEUED])
+        self.assertEqual(tasks.schedule_nightly_nudges().pk, Job.objects.get(status=Job.QUEUED).pk)
+
+    def test_schedule_command(self):
+        call_command('generate_nudges', '--schedule', stdout=io.StringIO())
+        call_command('generate_nudges', '--schedule', stdout=io.StringIO())
+        self.assertEqual(Job.objects.filter(key=tasks.NIGHTLY_NUDGES_KEY).count(), 1)
+        self.assertFalse(Nudge.objects.exists())
+
+
+# --------------------------
+# Goal streaks
+# --------------------------
+
+class StreakTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('streaks', password='x', is_user=True)
+        cls.goal = UserGoal.objects.create(user=cls.user, goal_type='exercise', target_value=30, unit='minutes')
+        cls.days = [datetime.date(2026, 3, 1) + datetime.timedelta(days=n) for n in range(6)]
+
+    def assertMatchesRecompute(self, expected):
+        """The incrementally kept counters equal expected and a full recount."""
+        progress = GoalProgress.objects.get(goal=self.goal)
+        incremental = (progress.days_met, progress.current_streak, progress.best_streak, progress.last_date)
+        self.assertEqual(incremental, expected)
+        goals.recompute_goal(self.goal)
+        progress.refresh_from_db()
+        self.assertEqual((progress.days_met, progress.current_streak, progress.best_streak, progress.last_date),
+                         incremental)
+
+    def test_count_streaks(self):
+        days = [(self.days[0], True), (self.days[1], True), (self.days[2], False),
+                (self.days[3], True), (self.days[4], True), (self.days[5], True)]
+        self.assertEqual(goals._count_streaks(days), (3, 3))
+        self.assertEqual(goals._count_streaks(days[:3]), (0, 2))
+        self.assertEqual(goals._count_streaks(days[:1] + days[3:]), (3, 3))  # a missing day breaks the run
+        self.assertEqual(goals._count_streaks(days[:2] + days[4:]), (2, 2))
+        self.assertEqual(goals._count_streaks([]), (0, 0))
+
+    def test_new_days_extend_the_streak(self):
+        for day in self.days[:4]:
+            DailyLog.objects.create(user=self.user, log_date=day, exercise_minutes=45)
+        self.assertMatchesRecompute((4, 4, 4, self.days[3]))
+        DailyLog.objects.create(user=self.user, log_date=self.days[5], exercise_minutes=45)  # gap: a new run
+        self.assertMatchesRecompute((5, 1, 4, self.days[5]))
+
+    def test_older_day_turning_unmet_splits_the_run(self):
+        logs = [DailyLog.objects.create(user=self.user, log_date=day, exercise_minutes=45) for day in self.days[:5]]
+        logs[2].exercise_minutes = 10
+        logs[2].save()
+        self.assertMatchesRecompute((4, 2, 2, self.days[4]))
+        logs[2].exercise_minutes = 60
+        logs[2].save()
+        self.assertMatchesRecompute((5, 5, 5, self.days[4]))
+
+    def test_filling_a_gap_joins_runs(self):
+        for day in self.days[:2] + self.days[3:5]:
+            DailyLog.objects.create(user=self.user, log_date=day, exercise_minutes=45)
+        self.assertMatchesRecompute((4, 2, 2, self.days[4]))
+        DailyLog.objects.create(user=self.user, log_date=self.days[2], exercise_minutes=45)
+        self.assertMatchesRecompute((5, 5, 5, self.days[4]))
+
+    def test_deleting_days_recounts(self):
+        logs = [DailyLog.objects.create(user=self.user, log_date=day, exercise_minutes=45) for day in self.days[:5]]
+        logs[4].delete()
+        self.assertMatchesRecompute((4, 4, 4, self.days[3]))
+        logs[1].delete()
+        self.assertMatchesRecompute((3, 2, 2, self.days[3]))
+
+
+# --------------------------
+# Cache namespaces
+# --------------------------
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheNamespaceTests(TestCase):
+    def setUp(self):
+        cache.l1.clear()
+        self.addCleanup(cache.l1.clear)
+        self.namespace = cache.Namespace('test-namespace')
+        self.addCleanup(cache._namespaces.pop, 'test-namespace')
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = cache.LRUCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b', None), lru.get('c')), (1, None, 3))
+
+    def test_get_or_set_computes_once(self):
+        compute = mock.Mock(return_value=42)
+        self.assertEqual(self.namespace.get_or_set('answer', compute), 42)
+        self.assertEqual(self.namespace.get_or_set('answer', compute), 42)
+        cache.l1.clear()  # a fresh process still finds it in L2
+        self.assertEqual(self.namespace.get_or_set('answer', compute), 42)
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(self.namespace.stats.as_dict()['l2_hits'], 1)
+
+    def test_invalidating_a_group_leaves_the_others(self):
+        self.namespace.set('stats', 'alice', group='user:1')
+        self.namespace.set('stats', 'bob', group='user:2')
+        self.namespace.invalidate(group='user:1')
+        self.assertIsNone(self.namespace.get('stats', group='user:1'))
+        self.assertEqual(self.namespace.get('stats', group='user:2'), 'bob')
+
+        self.namespace.invalidate()
+        self.assertIsNone(self.namespace.get('stats', group='user:2'))
+
+    def test_other_processes_see_invalidation_once_their_version_expires(self):
+        self.namespace.set('topics', ['old'], group='topics')
+        self.namespace.l2.incr('test-namespace:topics:version')  # invalidated by another worker
+        self.assertEqual(self.namespace.get('topics', group='topics'), ['old'])  # version still held in L1
+        cache.l1.delete('test-namespace:topics:version')  # ... until CACHE_VERSION_TTL passes
+        self.assertIsNone(self.namespace.get('topics', group='topics'))
+
+    def test_lost_version_never_revives_old_entries(self):
+        self.namespace.set('stats', 'stale', group='user:1')
+        self.namespace.invalidate(group='user:1')
+        self.namespace.l2.delete('test-namespace:user:1:version')  # evicted from L2
+        cache.l1.clear()
+        self.assertIsNone(self.namespace.get('stats', group='user:1'))
+
+    def test_saving_a_log_invalidates_the_users_dashboard(self):
+        user = User.objects.create_user('cached', password='x', is_user=True)
+        cache.dashboard_cache.set('stats', 'before', group=f'user:{user.pk}')
+        DailyLog.objects.create(user=user, sleep_hours=7)
+        self.assertIsNone(cache.dashboard_cache.get('stats', group=f'user:{user.pk}'))
+
+
+# --------------------------
+# Database connections
+# --------------------------
+
+class SQLitePragmaTests(TestCase):
+    def test_new_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+    def test_other_backends_are_left_alone(self):
+        other = mock.Mock(vendor='postgresql', settings_dict={'PRAGMAS': settings.SQLITE_PRAGMAS})
+        db.apply_sqlite_pragmas(other)
+        other.cursor.assert_not_called()
+
+
+# --------------------------
+# Read replica routing
+# --------------------------
+
+@mock.patch('core.routers.replica_configured', return_value=True)
+class ReplicaRouterTests(TestCase):
+    router = routers.ReplicaRouter()
+
+    def test_reads_use_the_replica_only_when_asked(self, configured):
+        self.assertIsNone(self.router.db_for_read(DailyLog))
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(DailyLog), 'replica')
+            self.assertIsNone(self.router.db_for_read(Job))  # coordination tables stay on the primary
+        configured.return_value = False
+        with routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(DailyLog))
+
+    def test_request_reads_the_primary_after_writing(self, configured):
+        def view(request):
+            with routers.replica_reads():
+                before = self.router.db_for_read(DailyLog)
+                self.assertEqual(self.router.db_for_write(DailyLog), 'default')
+                after = self.router.db_for_read(DailyLog)
+            return HttpResponse(f'{before} {after}')
+
+        response = routers.ReplicaStickinessMiddleware(view)(RequestFactory().post('/'))
+        self.assertEqual(response.content, b'replica None')
+        self.assertEqual(response.cookies[routers.STICKY_COOKIE]['max-age'], routers.STICKY_SECONDS)
+
+    def test_sticky_cookie_pins_later_reads(self, configured):
+        def view(request):
+            with routers.replica_reads():
+                return HttpResponse(str(self.router.db_for_read(DailyLog)))
+
+        middleware = routers.ReplicaStickinessMiddleware(view)
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual((response.content, response.cookies.get(routers.STICKY_COOKIE)), (b'replica', None))
+        request = RequestFactory().get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = '1'
+        self.assertEqual(middleware(request).content, b'None')
+
+
+# --------------------------
+# Identity cache
+# --------------------------
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IdentityCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('identity', password='x', is_user=True)
+        cls.profile = UserProfile.objects.create(user=cls.user, primary_condition='Asthma')
+
+    def setUp(self):
+        cache.l1.clear()
+        caches['default'].clear()  # entries cached by earlier tests outlive their rolled-back rows
+        self.addCleanup(cache.l1.clear)
+
+    def test_user_loads_with_relations_in_one_query(self):
+        with self.assertNumQueries(1):
+            user = identity.load_user(self.user.pk)
+            self.assertEqual(user.userprofile.primary_condition, 'Asthma')
+            self.assertFalse(hasattr(user, 'clinician'))
+        with self.assertNumQueries(0):
+            identity.load_user(self.user.pk)
+
+    def test_each_load_is_a_private_copy(self):
+        identity.load_user(self.user.pk).userprofile.primary_condition = 'changed in one request'
+        self.assertEqual(identity.load_user(self.user.pk).userprofile.primary_condition, 'Asthma')
+
+    def test_saving_related_rows_invalidates(self):
+        identity.load_user(self.user.pk)
+        self.profile.primary_condition = 'COPD'
+        self.profile.save()
+        self.assertEqual(identity.load_user(self.user.pk).userprofile.primary_condition, 'COPD')
+
+        Clinician.objects.create(user=self.user, specialization='Pulmonology', license_number='P-1')
+        self.assertEqual(identity.load_user(self.user.pk).clinician.specialization, 'Pulmonology')
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(identity.load_user(self.user.pk).first_name, 'Renamed')
+
+    def test_deleted_user_is_gone(self):
+        identity.load_user(self.user.pk)
+        self.user.delete()
+        self.assertIsNone(identity.load_user(self.user.pk))
+
+    @override_settings(IDENTITY_CACHE_TIMEOUT=0)
+    def test_timeout_zero_disables_the_cache(self):
+        identity.load_user(self.user.pk)
+        with self.assertNumQueries(1):
+            identity.load_user(self.user.pk)
+
+    def test_request_identity_needs_no_extra_queries(self):
+        request = RequestFactory().get('/')
+        request.user = identity.IdentityBackend().get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            current = identity.get_identity(request)
+            self.assertEqual((current.profile.pk, current.clinician), (self.profile.pk, None))
+
+
+# --------------------------
+# Cached sessions
+# --------------------------
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   STORAGES=PLAIN_STATIC)
+class CachedSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('sessions', password='x', is_user=True)
+        UserProfile.objects.create(user=cls.user, is_filled=True)
+
+    def setUp(self):
+        cache.l1.clear()
+        caches['default'].clear()
+        self.addCleanup(cache.l1.clear)
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        self.assertTrue(self.client.login(username='sessions', password='x'))
+        self.client.get(reverse('core:home'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('core:home'))
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('users_user', tables)
+
+    def test_sessions_are_written_through_to_the_database(self):
+        self.client.login(username='sessions', password='x')
+        caches['default'].clear()
+        cache.l1.clear()
+        self.assertEqual(self.client.get(reverse('core:home')).wsgi_request.user, self.user)
+
+
+# --------------------------
+# Static assets
+# --------------------------
+
+class VendorAssetTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = Path(tmp.name)
+
+    def test_css_fonts_are_vendored_next_to_it(self):
+        css = b'@font-face{src:url("remixicon.woff2?t=1") format("woff2")}\n/*# sourceMappingURL=remixicon.css.map */'
+        files = {'https://cdn.jsdelivr.net/npm/remixicon@4.2.0/fonts/remixicon.css': css,
+                 'https://cdn.jsdelivr.net/npm/remixicon@4.2.0/fonts/remixicon.woff2': b'font'}
+        with mock.patch('core.assets._fetch', side_effect=files.__getitem__):
+            paths, digest = assets.vendor_asset('remixicon.css', dest=self.dest)
+        self.assertEqual(digest, assets.integrity(css))
+        self.assertEqual([path.name for path in paths], ['remixicon.css', 'remixicon.woff2'])
+        self.assertEqual(paths[0].read_text(), '@font-face{src:url("remixicon.woff2") format("woff2")}\n')
+
+    def test_download_must_match_its_pin(self):
+        with mock.patch('core.assets._fetch', return_value=b'tampered'):
+            with self.assertRaises(assets.IntegrityError):
+                assets.vendor_asset('bootstrap.js', dest=self.dest)
+            with self.assertRaisesMessage(CommandError, 'Refusing to vendor bootstrap.css'):
+                call_command('vendor_assets', 'bootstrap.css', stdout=io.StringIO())
+        self.assertEqual(list(self.dest.iterdir()), [])
+
+    def test_pinned_hashes_are_sri(self):
+        for name, (url, path, pinned) in assets.VENDOR_ASSETS.items():
+            if pinned is not None:
+                self.assertRegex(pinned, r'^sha384-[A-Za-z0-9+/]{64}$', name)
+
+    def test_falls_back_to_the_cdn_until_vendored(self):
+        assets.vendor_url.cache_clear()
+        self.addCleanup(assets.vendor_url.cache_clear)
+        with override_settings(STATIC_ROOT=self.dest, STORAGES=PLAIN_STATIC):
+            self.assertEqual(assets.vendor_url('chart.js'), assets.VENDOR_ASSETS['chart.js'][0])
+            (self.dest / 'vendor/chartjs').mkdir(parents=True)
+            (self.dest / 'vendor/chartjs/chart.umd.min.js').write_text('')
+            assets.vendor_url.cache_clear()
+            self.assertEqual(assets.vendor_url('chart.js'), '/static/vendor/chartjs/chart.umd.min.js')
+
+
+class StaticAssetMiddlewareTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        (root / 'dashboard.0123456789ab.js').write_text('let x = 1;\n' * 100)
+        CompressedManifestStaticFilesStorage.compress(str(root / 'dashboard.0123456789ab.js'))
+        (root / 'robots.txt').write_text('')
+        with override_settings(STATIC_ROOT=tmp.name, STATIC_SERVE=True):
+            self.middleware = StaticAssetMiddleware(lambda request: HttpResponse('app'))
+
+    def test_serves_precompressed_immutable_assets(self):
+        response = self.middleware(RequestFactory().get('/static/dashboard.0123456789ab.js',
+                                                        HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual((response['Content-Encoding'], response['Cache-Control']),
+                         ('gzip', 'public, max-age=31536000, immutable'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'let x = 1;\n' * 100)
+
+        revalidated = self.middleware(RequestFactory().get('/static/dashboard.0123456789ab.js',
+                                                           HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_unhashed_names_revalidate_and_unknown_paths_pass_through(self):
+        response = self.middleware(RequestFactory().get('/static/robots.txt'))
+        response.close()
+        self.assertEqual(response['Cache-Control'], f'public, max-age={STATIC_MAX_AGE}')
+        self.assertEqual(self.middleware(RequestFactory().get('/static/missing.js')).content, b'app')
+
+
+# --------------------------
+# Seed data and benchmarks
+# --------------------------
+
+class SeedDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', '--patients=3', '--clinicians=1', '--days=20', '--groups=2', '--posts=6',
+                     '--comments=8', '--reactions=10', '--topics=2', stdout=io.StringIO())
+
+    def test_seeded_logs_pass_the_form_ranges(self):
+        self.assertGreater(DailyLog.objects.count(), 30)
+        for field, (low, high, message) in DAILY_LOG_RANGES.items():
+            values = DailyLog.objects.filter(**{f'{field}__isnull': False}).aggregate(low=Min(field), high=Max(field))
+            self.assertGreaterEqual(values['low'], low, field)
+            self.assertLessEqual(values['high'], high, field)
+
+    def test_goal_data_benchmark_covers_only_the_enqueue(self):
+        out = io.StringIO()
+        call_command('bench_views', '--page=goal data', '--requests=2', '--warmup=0', stdout=out)
+        self.assertIn('* goal data api: AI summary job is queued, never run', out.getvalue())
+        self.assertFalse(Job.objects.exists())
+
+
+# --------------------------
+# Request timing
+# --------------------------
+
+class RequestTimingTests(TestCase):
+    @staticmethod
+    def view(request):
+        User.objects.count()
+        User.objects.exists()
+        engines.all()[0].from_string('{{ greeting }}').render({'greeting': 'hi'})
+        with measure('llm'):
+            pass
+        return HttpResponse('ok')
+
+    @override_settings(SERVER_TIMING_HEADER='all')
+    def test_server_timing_header(self):
+        response = RequestTimingMiddleware(self.view)(RequestFactory().get('/'))
+        parts = [part.split(';')[0] for part in response['Server-Timing'].split(', ')]
+        self.assertEqual(parts, ['total', 'db', 'tpl', 'llm'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(STORAGES=PLAIN_STATIC)
+    def test_header_is_for_staff_only_by_default(self):
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        patient = User.objects.create_user('patient', password='x', is_user=True)
+        self.client.force_login(patient)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('core:home')))
+        self.client.force_login(staff)
+        self.assertIn('Server-Timing', self.client.get(reverse('core:home')))
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_requests_are_logged_with_their_queries(self):
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            RequestTimingMiddleware(self.view)(RequestFactory().get('/slow/'))
+        record = json.loads(logs.records[0].getMessage().removeprefix('slow request '))
+        self.assertEqual((record['path'], record['db_queries'], record['llm_calls']), ('/slow/', 2, 1))
+        self.assertEqual(len(record['queries']), 2)
+        self.assertIn('SELECT', record['queries'][0]['sql'])
+
+
+# --------------------------
+# Metrics
+# --------------------------
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.metrics_dir = tmp.name
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.client.get(reverse('core:metrics')).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_gate(self):
+        url = reverse('core:metrics')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE vitalcircle_http_requests_total counter')
+
+    def test_sums_every_process(self):
+        other = {'counters': {metrics._key('llm_requests_total', {'outcome': 'ok'}): 5}, 'histograms': {}}
+        with open(os.path.join(self.metrics_dir, f'{os.getppid()}.json'), 'w') as f:
+            json.dump(other, f)
+        with override_settings(METRICS_DIR=self.metrics_dir):
+            before = metrics.collect()[0].get(metrics._key('llm_requests_total', {'outcome': 'ok'}), 0)
+            metrics.record_llm_call(0.2, ok=True)
+            counters, histograms, processes = metrics.collect()
+        self.assertEqual(processes, 2)
+        self.assertEqual(counters[metrics._key('llm_requests_total', {'outcome': 'ok'})], before + 1)
+        self.assertGreaterEqual(before, 5)
+
+
+# --------------------------
+# Request profiling
+# --------------------------
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.patient = User.objects.create_user('patient', password='x', is_user=True)
+
+    def test_sampler_folds_the_threads_stack(self):
+        with profiling.StackSampler(threading.get_ident(), interval=0.001) as sampler:
+            _busy(0.1)
+        self.assertGreater(sum(sampler.counts.values()), 10)
+        stack, count = sampler.counts.most_common(1)[0]
+        self.assertIn('test_sampler_folds_the_threads_stack (core/tests.py:', stack)
+        self.assertTrue(stack.split(';')[-1].startswith('_busy (core/tests.py:'))
+        self.assertEqual(sampler.folded().splitlines()[0], f'{stack} {count}')
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('core:home'), {'_profile': '1'})
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.view_name, profile.path), (self.staff, 'core:home', '/?_profile=1'))
+        stats = marshal.loads(zlib.decompress(profile.stats))
+        self.assertTrue(any(name == 'home_view' for filename, line, name in stats))
+
+    def test_others_are_not_profiled(self):
+        self.client.force_login(self.patient)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('core:home'), {'_profile': '1'}))
+        self.client.force_login(self.staff)
+        with override_settings(PROFILING_ENABLED=False):
+            self.assertNotIn('X-Profile-Id', self.client.get(reverse('core:home'), {'_profile': '1'}))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_only_the_newest_are_kept(self):
+        self.client.force_login(self.staff)
+        ids = [int(self.client.get(reverse('core:home'), HTTP_X_PROFILE='1')['X-Profile-Id']) for _ in range(3)]
+        self.assertEqual(sorted(RequestProfile.objects.values_list('pk', flat=True)), ids[1:])
+
+
+# --------------------------
+# Compressed JSON
+# --------------------------
+
+AI_RESPONSE = {
+    'stability_score': 72,
+    'risk_prediction': {'english': 'Stable, keep monitoring blood pressure', 'hinglish': 'Stable hai'},
+    'recommendations': [{'action': 'Continue current medication', 'reason': 'Readings are stable'}] * 5,
+}
+
+
+class CompressedJSONFieldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('compressed', password='x', is_user=True)
+        cls.score = StabilityScore.objects.create(user=user, score_value=72, risk_prediction='Stable',
+                                                  ai_response_raw=AI_RESPONSE)
+        cls.small = StabilityScore.objects.create(user=user, score_value=1, risk_prediction='', ai_response_raw=[1])
+
+    def stored(self, score):
+        """The raw column value, bypassing the field."""
+        return bytes(StabilityScore.objects.filter(pk=score.pk).values_list('ai_response_raw', flat=True)[0])
+
+    def test_round_trip(self):
+        self.assertEqual(StabilityScore.objects.get(pk=self.score.pk).ai_response_raw, AI_RESPONSE)
+        blob = self.stored(self.score)
+        self.assertEqual(blob[:1], b'z')
+        self.assertLess(len(blob), len(json.dumps(AI_RESPONSE)))
+
+    def test_small_values_are_plain_json(self):
+        self.assertEqual(self.stored(self.small), b'j\x00[1]')
+        self.assertEqual(StabilityScore.objects.get(pk=self.small.pk).ai_response_raw, [1])
+
+    def test_untouched_value_is_written_back_as_is(self):
+        blob = self.stored(self.score)
+        loaded = StabilityScore.objects.get(pk=self.score.pk)
+        loaded.score_value = 70
+        loaded.save()
+        self.assertEqual(self.stored(self.score), blob)
+
+    def test_dictionary(self):
+        blob = compress_json(AI_RESPONSE, 'llm-v1')
+        self.assertEqual(blob[1], 1)
+        self.assertLess(len(blob), len(compress_json(AI_RESPONSE)))
+        self.assertEqual(decompress_json(blob), AI_RESPONSE)
+
+
+class CompressJSONMigrationTests(TransactionTestCase):
+    before = [('core', '0011_request_profile')]
+    after = [('core', '0012_compressed_json')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_pack_and_unpack(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model('users', 'User').objects.create(username='migrated')
+        score = apps.get_model('core', 'StabilityScore').objects.create(
+            user=user, score_value=72, risk_prediction='Stable', ai_response_raw=AI_RESPONSE)
+
+        apps = self.migrate(self.after)
+        self.assertEqual(apps.get_model('core', 'StabilityScore').objects.get(pk=score.pk).ai_response_raw,
+                         AI_RESPONSE)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT ai_response_raw FROM core_stabilityscore WHERE id = %s', [score.pk])
+            self.assertEqual(bytes(cursor.fetchone()[0])[:2], b'z\x01')
+
+        apps = self.migrate(self.before)
+        self.assertEqual(apps.get_model('core', 'StabilityScore').objects.get(pk=score.pk).ai_response_raw,
+                         AI_RESPONSE)
+
+
+# --------------------------
+# Log archive
+# --------------------------
+
+class LogArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('archived', password='x', is_user=True)
+        cls.days = [datetime.date(2025, 1, 30), datetime.date(2025, 1, 31), datetime.date(2025, 2, 1),
+                    datetime.date(2025, 3, 10)]
+        for n, day in enumerate(cls.days):
+            DailyLog.objects.create(user=cls.user, log_date=day, sleep_hours=6 + n, steps_count=1000 * n)
+
+    def test_archive_and_restore(self):
+        self.assertEqual(archive.archive_logs(datetime.date(2025, 3, 1)), (2, 3))
+        self.assertEqual(list(DailyLog.objects.values_list('log_date', flat=True)), self.days[3:])
+        self.assertEqual(DailyLogArchive.objects.get(month=datetime.date(2025, 1, 1)).entry_count, 2)
+
+        self.assertEqual(archive.restore_logs(), (2, 3))
+        self.assertFalse(DailyLogArchive.objects.exists())
+        self.assertEqual(list(DailyLog.objects.order_by('log_date').values_list('sleep_hours', flat=True)),
+                         [6, 7, 8, 9])
+
+    def test_iter_logs_reads_both_tiers_in_order(self):
+        archive.archive_logs(datetime.date(2025, 2, 1))
+        rows = list(archive.iter_logs(self.user.pk, fields=['sleep_hours']))
+        self.assertEqual([(row['log_date'], row['sleep_hours']) for row in rows],
+                         list(zip(self.days, [6, 7, 8, 9])))
+        window = archive.iter_logs(self.user.pk, start=datetime.date(2025, 1, 31), end=datetime.date(2025, 2, 28))
+        self.assertEqual([row['log_date'] for row in window], self.days[1:3])
+
+    def test_day_in_both_tiers_is_merged_on_read(self):
+        archive.archive_logs(datetime.date(2025, 2, 1))
+        DailyLog.objects.create(user=self.user, log_date=self.days[0], steps_count=4321)  # e.g. a wearable rollup
+        rows = list(archive.iter_logs(self.user.pk, end=self.days[1], fields=['sleep_hours', 'steps_count']))
+        self.assertEqual([(row['log_date'], row['sleep_hours'], row['steps_count']) for row in rows],
+                         [(self.days[0], 6, 4321), (self.days[1], 7, 1000)])
+
+    def test_moving_rows_leaves_goal_progress_alone(self):
+        goal = UserGoal.objects.create(user=self.user, goal_type='sleep', target_value=7, unit='hours')
+        goals.recompute_goal(goal)
+        before = GoalProgress.objects.values('days_met', 'best_streak').get(goal=goal)
+        archive.archive_logs(datetime.date(2025, 3, 1))
+        self.assertEqual(GoalProgress.objects.values('days_met', 'best_streak').get(goal=goal), before)
+        goals.recompute_goal(goal)  # reads the archive through iter_logs
+        self.assertEqual(GoalProgress.objects.values('days_met', 'best_streak').get(goal=goal), before)
+
+
+# --------------------------
+# Wearable readings
+# --------------------------
+
+class VitalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('wearable', password='x', is_user=True)
+        cls.day = datetime.date(2026, 3, 1)
+        cls.hours = [timezone.make_aware(datetime.datetime.combine(cls.day, datetime.time(hour)))
+                     for hour in range(24)]
+
+    def test_varint_round_trip(self):
+        for numbers in ([], [0], [1, 2, 3], [5, -5, 0, 2 ** 40, -(2 ** 40)], list(range(0, 86400, 60))):
+            self.assertEqual(list(vitals.decode(vitals.encode(numbers))), numbers)
+
+    def test_varint_encoding(self):
+        self.assertEqual(vitals.encode([1, 0, 64]), b'\x02\x01\x80\x01')
+        self.assertEqual(len(vitals.encode(range(0, 3600, 60))), 60)  # a regular trace costs a byte per point
+
+    def test_ingest_stores_and_rolls_up(self):
+        readings = [(self.hours[8], 70), (self.hours[9], 80), (self.hours[10], 250), (self.hours[11], None)]
+        self.assertEqual(vitals.ingest(self.user.pk, 'heart_rate', readings), (2, 2))
+        series = VitalSeries.objects.get(user=self.user, metric='heart_rate', day=self.day)
+        self.assertEqual((series.count, series.value_min, series.value_max, series.value_sum), (2, 70, 80, 150))
+        self.assertEqual(list(vitals.decode(series.times)), [8 * 3600, 9 * 3600])
+        self.assertEqual(DailyLog.objects.get(user=self.user, log_date=self.day).heart_rate, 75)
+
+    def test_repeated_timestamp_replaces_reading(self):
+        vitals.ingest(self.user.pk, 'blood_glucose', [(self.hours[8], 100.5), (self.hours[9], 120)])
+        vitals.ingest(self.user.pk, 'blood_glucose', [(self.hours[9], 140), (self.hours[10], 160)])
+        self.assertEqual(list(vitals.readings(self.user.pk, 'blood_glucose', self.hours[0], self.hours[23])),
+                         [(self.hours[8], 100.5), (self.hours[9], 140), (self.hours[10], 160)])
+        self.assertEqual(DailyLog.objects.get(user=self.user, log_date=self.day).blood_glucose, 133.5)
+
+
+# --------------------------
+# Batch ingestion
+# --------------------------
+
+class IngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('device', password='x', is_user=True)
+        cls.other = User.objects.create_user('other', password='x', is_user=True)
+        cls.auth = f'Bearer {IngestToken.issue("phone", user=cls.user)[1]}'
+        cls.service_auth = f'Bearer {IngestToken.issue("vendor")[1]}'
+        cls.url = reverse('core:ingest')
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.post(self.url, '[]', content_type='application/json').status_code, 401)
+        response = self.client.post(self.url, '[]', content_type='application/json', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_logs_and_readings(self):
+        records = [
+            {'log_date': '2026-03-01', 'sleep_hours': 7.5, 'medication_taken': True},
+            {'log_date': '2026-03-02', 'heart_rate': 72},
+            {'metric': 'steps', 'readings': [['2026-03-02T08:00:00Z', 1200], ['2026-03-02T09:00:00Z', 800]]},
+        ]
+        response = self.client.post(self.url, json.dumps(records), content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.json(), {'logs': 2, 'readings': 2, 'rejected_readings': 0, 'users': 1})
+        logs = {log.log_date.isoformat(): log for log in DailyLog.objects.filter(user=self.user)}
+        self.assertEqual(logs['2026-03-01'].sleep_hours, 7.5)
+        self.assertEqual((logs['2026-03-02'].heart_rate, logs['2026-03-02'].steps_count), (72, 2000))
+
+    def test_ndjson(self):
+        body = '{"log_date": "2026-03-01", "sleep_hours": 6}\n\n{"log_date": "2026-03-02", "sleep_hours": 8}\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DailyLog.objects.filter(user=self.user).count(), 2)
+
+    def test_upsert_only_touches_sent_fields(self):
+        DailyLog.objects.create(user=self.user, log_date=datetime.date(2026, 3, 1), sleep_hours=6, heart_rate=60)
+        self.client.post(self.url, '[{"log_date": "2026-03-01", "sleep_hours": 8}]', content_type='application/json',
+                         HTTP_AUTHORIZATION=self.auth)
+        log = DailyLog.objects.get(user=self.user)
+        self.assertEqual((log.sleep_hours, log.heart_rate), (8, 60))
+
+    def test_invalid_batch_writes_nothing(self):
+        records = [
+            {'log_date': '2026-03-01', 'sleep_hours': 7},
+            {'log_date': '2026-02-30', 'heart_rate': 500, 'mood': 'fine'},
+            {'metric': 'heart_rate', 'readings': [['not a time', 70]]},
+            {'user': self.other.pk, 'log_date': '2026-03-01'},
+        ]
+        response = self.client.post(self.url, json.dumps(records), content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 400)
+        errors = {(error['record'], error['field']) for error in response.json()['errors']}
+        self.assertEqual(errors, {(1, None), (1, 'log_date'), (1, 'heart_rate'), (2, 'readings'), (3, 'user')})
+        self.assertFalse(DailyLog.objects.exists())
+
+    def test_service_token_names_users(self):
+        records = [{'user': self.other.pk, 'log_date': '2026-03-01', 'sleep_hours': 7}]
+        response = self.client.post(self.url, json.dumps(records), content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.service_auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(DailyLog.objects.filter(user=self.other).exists())
+        response = self.client.post(self.url, '[{"user": 999999, "log_date": "2026-03-01"}]',
+                                    content_type='application/json', HTTP_AUTHORIZATION=self.service_auth)
+        self.assertEqual(response.json()['errors'][0]['error'], 'Unknown user 999999.')
+
+    def test_idempotency_key(self):
+        body = '[{"log_date": "2026-03-01", "sleep_hours": 7}]'
+        first = self.client.post(self.url, body, content_type='application/json', HTTP_AUTHORIZATION=self.auth,
+                                 HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        DailyLog.objects.filter(user=self.user).update(sleep_hours=5)  # a retry must not overwrite this
+        retry = self.client.post(self.url, body, content_type='application/json', HTTP_AUTHORIZATION=self.auth,
+                                 HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual((retry.status_code, retry.json(), retry['Idempotent-Replayed']), (200, first.json(), 'true'))
+        self.assertEqual(DailyLog.objects.get(user=self.user).sleep_hours, 5)
+        self.assertEqual(IngestRequest.objects.count(), 1)
+
+        reused = self.client.post(self.url, '[{"log_date": "2026-03-02", "sleep_hours": 7}]',
+                                  content_type='application/json', HTTP_AUTHORIZATION=self.auth,
+                                  HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual(reused.status_code, 422)
+        self.assertFalse(DailyLog.objects.filter(log_date=datetime.date(2026, 3, 2)).exists())
+
+
+# --------------------------
+# Delta sync
+# --------------------------
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('mobile', password='x', is_user=True)
+        cls.ids = [DailyLog.objects.create(user=cls.user, log_date=datetime.date(2026, 1, n)).pk for n in range(1, 5)]
+        settled = timezone.now() - datetime.timedelta(seconds=sync.SETTLE_SECONDS + 600)
+        DailyLog.objects.filter(pk__in=cls.ids).update(updated_at=settled)
+
+    def drain(self, cursor=None, limit=sync.PAGE_SIZE):
+        """Follow has_more; returns the daily log ids sent, the ids deleted and the final cursor."""
+        sent, deleted = [], []
+        while True:
+            page = sync.changes(self.user.pk, cursor, limit)
+            sent += [row['id'] for row in page['changes']['daily_logs']]
+            deleted += page['deleted']['daily_logs']
+            cursor = page['cursor']
+            if not page['has_more']:
+                return sent, deleted, cursor
+
+    def test_pages_through_everything_once(self):
+        Nudge.objects.create(user=self.user, message='Drink water', context_reason='')
+        page = sync.changes(self.user.pk, None, 3)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(len(page['changes']['daily_logs']), 3)
+        sent, _, cursor = self.drain(limit=3)
+        self.assertEqual(sent, self.ids)
+        self.assertEqual(sync.changes(self.user.pk, cursor)['changes']['daily_logs'], [])
+
+    def test_changes_since_cursor(self):
+        _, _, cursor = self.drain()
+        DailyLog.objects.filter(pk=self.ids[1]).update(updated_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.drain(cursor)[0], [self.ids[1]])
+
+    def test_unsettled_rows_are_sent_again(self):
+        fresh = [DailyLog.objects.create(user=self.user, log_date=datetime.date(2026, 2, n)).pk for n in (1, 2)]
+        sent, _, cursor = self.drain(limit=1)
+        self.assertEqual(sent, self.ids + fresh[:1])  # stops instead of paging through the window
+        settle_start = timezone.now() - datetime.timedelta(seconds=sync.SETTLE_SECONDS - 5)
+        self.assertLess(sync.decode_cursor(cursor)[0], settle_start)
+        self.assertEqual(self.drain(cursor)[0], fresh)
+
+    def test_late_commit_is_not_skipped(self):
+        _, _, cursor = self.drain()
+        # Committed after the sync above, but stamped before it ran
+        late = timezone.now() - datetime.timedelta(seconds=sync.SETTLE_SECONDS // 2)
+        DailyLog.objects.filter(pk=self.ids[0]).update(updated_at=late)
+        self.assertEqual(self.drain(cursor)[0], [self.ids[0]])
+
+    def test_tombstones(self):
+        _, _, cursor = self.drain()
+        DailyLog.objects.get(pk=self.ids[0]).delete()
+        self.assertEqual(self.drain(cursor)[:2], ([], [self.ids[0]]))
+
+    def test_old_cursor_resets(self):
+        old = timezone.now() - datetime.timedelta(days=sync.TOMBSTONE_DAYS + 1)
+        self.assertEqual(sync.changes(self.user.pk, sync.encode_cursor((old, '', 0))), {'reset': True})
+
+    def test_api(self):
+        self.client.force_login(self.user)
+        body = self.client.get(reverse('core:sync'), {'limit': 1}).json()
+        self.assertTrue(body['has_more'])
+        self.assertEqual([row['id'] for row in body['changes']['daily_logs']], self.ids[:1])
+        self.assertEqual(self.client.get(reverse('core:sync'), {'cursor': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('core:sync'), {'limit': 'x'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('core:sync')).status_code, 302)
@@ -0,0 +1,173 @@
+# core/timing.py
+#
+# Per-request performance instrumentation.
+#
+# RequestTimingMiddleware measures every request: total time, SQL queries
+# and their time (through an execute_wrapper on each database connection),
+# template rendering (through the TimedDjangoTemplates backend) and outbound
+# LLM calls (core.llm wraps them in ``measure("llm")``). The numbers are sent
+# back in a ``Server-Timing`` header, which browser dev tools show next to the
+# request (to staff users only unless SERVER_TIMING_HEADER is 'all'), and
+# logged as one JSON line per request on ``core.timing``.
+# Requests slower than REQUEST_TIMING_SLOW_MS are sampled
+# (REQUEST_TIMING_SAMPLE_RATE) and logged at WARNING with their queries.
+
+import contextlib
+import contextvars
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+MAX_RECORDED_QUERIES = 200  # per request, for the slow-request sample
+SLOW_SQL_CHARS = 500  # each sampled query is truncated to this
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.durations = {}  # category -> seconds
+        self.counts = {}  # category -> number of timed calls
+        self.queries = []  # (alias, sql, seconds)
+
+    def add(self, category, seconds):
+        self.durations[category] = self.durations.get(category, 0.0) + seconds
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self
+
+    def ms(self, category):
+        return round(self.durations.get(category, 0.0) * 1000, 2)
+
+    def server_timing(self):
+        """Value for the Server-Timing header."""
+        parts = [f"total;dur={self.total * 1000:.1f}"]
+        parts.append(f'db;dur={self.ms("db"):.1f};desc="{self.counts.get("db", 0)} queries"')
+        for category, label in (("template", "tpl"), ("llm", "llm")):
+            if category in self.counts:
+                parts.append(f'{label};dur={self.ms(category):.1f}')
+        return ", ".join(parts)
+
+
+def current_timing():
+    """The RequestTiming of the request being handled, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def measure(category):
+    """Add the time spent in the block to the current request's ``category``."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(category, time.perf_counter() - started)
+
+
+class _QueryTimer:
+    def __init__(self, timing, alias):
+        self.timing = timing
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timing.add("db", elapsed)
+            if len(self.timing.queries) < MAX_RECORDED_QUERIES:
+                self.timing.queries.append((self.alias, sql, elapsed))
+
+
+class TimedTemplate:
+    """A backend template whose top-level render() counts as template time."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with measure("template"):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)  # set further down the middleware stack
+    return user is not None and user.is_staff
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'SERVER_TIMING_HEADER', 'staff')  # 'staff', 'all' or 'off'
+        self.slow = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500) / 1000
+        self.sample_rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            with contextlib.ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_QueryTimer(timing, alias)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            timing.finish()
+
+        if self.header == 'all' or (self.header == 'staff' and _is_staff(request)):
+            response['Server-Timing'] = timing.server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def log(self, request, response, timing):
+        slow = timing.total >= self.slow and random.random() < self.sample_rate
+        if not (slow or logger.isEnabledFor(logging.INFO)):
+            return
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(timing.total * 1000, 2),
+            "db_ms": timing.ms("db"),
+            "db_queries": timing.counts.get("db", 0),
+            "template_ms": timing.ms("template"),
+            "llm_ms": timing.ms("llm"),
+            "llm_calls": timing.counts.get("llm", 0),
+        }
+        if slow:
+            record["queries"] = [
+                {"db": alias, "ms": round(seconds * 1000, 2), "sql": sql[:SLOW_SQL_CHARS]}
+                for alias, sql, seconds in timing.queries
+            ]
+            logger.warning("slow request %s", json.dumps(record))
+        else:
+            logger.info("request %s", json.dumps(record))
@@ -7,19 +7,28 @@ urlpatterns = [
     path('', views.home_view, name='home'),
     path('dashboard/', views.dashboard_view, name='user-dashboard'),
     path('doctor-dashboard/', views.doctor_dashboard_view, name='doctor-dashboard'),
+    path('doctor-dashboard/patients/', views.patient_panel_view, name='patient-panel'),
+    path('doctor-dashboard/patients/data/', views.patient_panel_api, name='patient-panel-api'),
+    path('doctor-dashboard/patients/reports/', views.generate_panel_reports_view, name='generate-panel-reports'),
     path('complete-profile/', views.complete_profile_view, name='complete-profile'),
     path('stability-check/', views.stability_view, name='stability-check'),
     path('predict-patient/', views.predict_patient_view, name='predict-patient'),
     path('edit-profile/', views.edit_profile_view, name='edit-profile'),
+    path('community/posts/<int:post_id>/react/', views.reaction_view, name='react'),
     
     # Daily Log URLs
     path('daily-log/', views.daily_log_create, name='daily-log-create'),
     path('daily-log/list/', views.daily_log_list, name='daily-log-list'),
+    path('daily-log/export/', views.daily_log_export, name='daily-log-export'),
     path('daily-log/<int:log_id>/', views.daily_log_detail, name='daily-log-detail'),
     path('daily-log/<int:log_id>/edit/', views.daily_log_edit, name='daily-log-edit'),
 
     path("goal-dashboard/", views.goal_dashboard_view, name="goal_dashboard"),
     path("goal-data/", views.goal_data_api, name="goal_data_api"),  # for JS to fetch data
+    path("vitals/<str:metric>/", views.vitals_api, name="vitals_api"),  # wearable readings for charts
+    path("api/ingest/", views.ingest_view, name="ingest"),  # batch writes for apps and device services
+    path("api/sync/", views.sync_api, name="sync"),  # delta sync for mobile clients
+    path("metrics", views.metrics_view, name="metrics"),  # Prometheus scrape endpoint
 
 ]
 
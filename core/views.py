@@ -4,16 +4,40 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import (
     UserProfile, DailyLog, StabilityScore, Nudge, ClinicianAction,
-    ForumPost, UserGoal, Achievement, SupportGroup, GroupMembership,
-    Clinician
+    ForumPost, UserGoal, Achievement, SupportGroup
 )
 from .forms import UserProfileForm, DailyLogForm
+from .cache import dashboard_cache
+from .feed import community_feed
+from .llm import chat_completion, strip_code_fences
+from . import archive
+from . import ingest
+from . import metrics
+from . import sync
+from . import tasks
+from . import vitals
+from jobs.models import Job
+from jobs.queue import get_or_enqueue
+from .panel import high_risk_patients, patient_panel, risk_level, serialize_patient, SORT_OPTIONS, DEFAULT_SORT
+from .routers import use_replica
+from .reactions import attach_reaction_totals, set_reaction, reaction_totals, REACTION_TYPE_KEYS
 import requests
 import json
-import re
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.core.paginator import Paginator
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+import csv
 import datetime
+import hashlib
+import hmac
+
+User = get_user_model()
 
 # --------------------------
 # Home View
@@ -38,18 +62,15 @@ def dashboard_view(request):
     user = request.user
     
     # Check if user profile is filled
-    try:
-        profile = UserProfile.objects.get(user=user)
-        if not profile.is_filled:
-            return redirect('core:complete-profile')
-    except UserProfile.DoesNotExist:
+    profile = request.identity.profile
+    if profile is None or not profile.is_filled:
         return redirect('core:complete-profile')
 
     # Latest Daily Log
     latest_log = DailyLog.objects.filter(user=user).order_by('-log_date').first()
 
     # Latest Stability Score
-    stability = StabilityScore.objects.filter(user=user).order_by('-score_date').first()
+    stability = StabilityScore.objects.filter(user=user).defer('ai_response_raw').order_by('-score_date').first()
 
     # Today's Nudge
     nudge = Nudge.objects.filter(user=user).order_by('-nudge_date').first()
@@ -57,12 +78,11 @@ def dashboard_view(request):
     # Recent Clinician Actions
     clinician_actions = ClinicianAction.objects.filter(clinician__user=user).order_by('-created_at')[:5]
 
-    # Community Highlights (recent forum posts)
-    groups = GroupMembership.objects.filter(user=user).values_list('group', flat=True)
-    posts = ForumPost.objects.filter(group__in=groups).order_by('-created_at')[:5]
+    # Community Highlights (recent forum posts, precomputed per user)
+    posts = attach_reaction_totals(community_feed(user, limit=5), user)
 
     # User Goals & Achievements
-    goals = UserGoal.objects.filter(user=user)
+    goals = UserGoal.objects.filter(user=user).select_related('progress')
     achievements = Achievement.objects.filter(user=user).order_by('-achieved_at')[:5]
 
     # Recent Daily Logs (last 7 days)
@@ -85,13 +105,112 @@ def dashboard_view(request):
     return render(request, "user-dashboard.html", context)
 
 @login_required
+@use_replica
 def doctor_dashboard_view(request):
-    user = request.user
-    profile = Clinician.objects.filter(user=user).first()
+    profile = request.identity.clinician
+    patients = patient_panel(profile) if profile else User.objects.none()
+    high_risk = high_risk_patients(patients) if profile else patients
     context = {
         "profile": profile,
+        "patient_count": patients.count(),
+        "high_risk_count": high_risk.count(),
+        "high_risk_patients": list(high_risk[:5]),
     }
-    return render(request, "doctor-dashboard.html")
+    return render(request, "doctor-dashboard.html", context)
+
+
+def _panel_page(request):
+    """Resolve the requesting clinician's panel page, or None if they aren't a clinician."""
+    clinician = request.identity.clinician
+    if clinician is None:
+        return None, None
+    sort = request.GET.get("sort", DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    try:
+        per_page = min(max(int(request.GET.get("page_size", 25)), 1), 100)
+    except ValueError:
+        per_page = 25
+    paginator = Paginator(patient_panel(clinician, sort), per_page)
+    return paginator.get_page(request.GET.get("page")), sort
+
+
+@login_required
+@use_replica
+def patient_panel_view(request):
+    """Paginated list of the clinician's patients, triaged server-side"""
+    page_obj, sort = _panel_page(request)
+    if page_obj is None:
+        messages.error(request, "Only clinicians can view a patient panel.")
+        return redirect("core:home")
+
+    for patient in page_obj:
+        patient.risk_level = risk_level(patient.latest_score)
+
+    context = {
+        "page_obj": page_obj,
+        "sort": sort,
+        "sort_options": list(SORT_OPTIONS),
+    }
+    return render(request, "patient_panel.html", context)
+
+
+@login_required
+@require_POST
+def generate_panel_reports_view(request):
+    """Queue report generation for the clinician's whole panel"""
+    clinician = request.identity.clinician
+    if clinician is None:
+        messages.error(request, "Only clinicians can generate patient reports.")
+        return redirect("core:home")
+
+    get_or_enqueue(tasks.panel_reports, f"panel-reports:{clinician.pk}", args=(clinician.pk,),
+                   reuse_done=False, max_attempts=1)
+    messages.success(request, "Report generation started. New reports will appear as they finish.")
+    return redirect("core:patient-panel")
+
+
+@login_required
+@use_replica
+def patient_panel_api(request):
+    """JSON version of the patient panel for the dashboard / mobile clients"""
+    page_obj, sort = _panel_page(request)
+    if page_obj is None:
+        return JsonResponse({"error": "Clinician profile required."}, status=403)
+
+    return JsonResponse({
+        "patients": [serialize_patient(patient) for patient in page_obj],
+        "sort": sort,
+        "page": page_obj.number,
+        "num_pages": page_obj.paginator.num_pages,
+        "count": page_obj.paginator.count,
+    })
+
+# --------------------------
+# Community Reactions
+# --------------------------
+
+@login_required
+@require_POST
+def reaction_view(request, post_id):
+    """Set the current user's reaction on a support group post (active=1 or 0) and return the new totals.
+
+    The client sends the state it wants rather than "toggle", so a retried or
+    double-submitted request changes nothing the second time.
+    """
+    post = get_object_or_404(ForumPost, pk=post_id)
+    reaction_type = request.POST.get("reaction_type")
+    if reaction_type not in REACTION_TYPE_KEYS:
+        return JsonResponse({"error": "Unknown reaction type."}, status=400)
+    active = request.POST.get("active")
+    if active not in ("0", "1"):
+        return JsonResponse({"error": "active must be 0 or 1."}, status=400)
+
+    active = set_reaction(request.user, post, reaction_type, active == "1")
+    return JsonResponse({
+        "active": active,
+        "totals": reaction_totals([post.pk])[post.pk],
+    })
 
 # --------------------------
 # Stability Score Views
@@ -108,11 +227,6 @@ def predict_patient_view(request):
         patient_data = json.loads(request.body.decode("utf-8"))
 
 
-        # Groq API
-        GROQ_API_KEY = "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"
-        url = "https://api.groq.com/openai/v1/chat/completions"
-
-
         # Prompt with escaped braces
         prompt = f"""
 You are an experienced healthcare assistant AI with over 10 years of experience explaining health insights to the general public in India.
@@ -145,23 +259,8 @@ Patient data:
 """
 
 
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}]
-        }
-
-
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-
-
-        llm_output = data["choices"][0]["message"]["content"]
-        cleaned = re.sub(r"```json|```", "", llm_output).strip()
+        llm_output = chat_completion(prompt, cache_timeout=3600)
+        cleaned = strip_code_fences(llm_output)
 
 
         # ---- FIX: Parse inner JSON if it's returned as string ----
@@ -198,12 +297,7 @@ def stability_view(request):
     and check health stability.
     """
     # Get user profile data to pre-fill the form
-    profile = None
-    if request.user.is_authenticated:
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-        except UserProfile.DoesNotExist:
-            profile = None
+    profile = request.identity.profile
     
     context = {
         'profile': profile,
@@ -217,7 +311,10 @@ def stability_view(request):
 @login_required
 def complete_profile_view(request):
     """Complete user profile - required after registration"""
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    profile = request.identity.profile
+    if profile is None:
+        profile = UserProfile.objects.create(user=request.user)
+        request.identity.set_profile(profile)
     
     if request.method == 'POST':
         form = UserProfileForm(request.POST, instance=profile)
@@ -240,10 +337,10 @@ def complete_profile_view(request):
 @login_required
 def edit_profile_view(request):
     """Edit user profile information"""
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
+    profile = request.identity.profile
+    if profile is None:
         profile = UserProfile.objects.create(user=request.user, is_filled=False)
+        request.identity.set_profile(profile)
     
     if request.method == 'POST':
         form = UserProfileForm(request.POST, instance=profile)
@@ -329,6 +426,7 @@ def daily_log_edit(request, log_id):
 
 
 @login_required
+@use_replica
 def daily_log_list(request):
     """List all daily logs for the user"""
     daily_logs = DailyLog.objects.filter(user=request.user).order_by('-log_date')
@@ -340,6 +438,7 @@ def daily_log_list(request):
 
 
 @login_required
+@use_replica
 def daily_log_detail(request, log_id):
     """View details of a specific daily log"""
     try:
@@ -355,6 +454,20 @@ def daily_log_detail(request, log_id):
 
 
 
+@login_required
+@use_replica
+def daily_log_export(request):
+    """Download the user's whole log history, archived months included, as CSV"""
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="daily-logs.csv"'
+    fields = [name for name in archive.COLUMNS if name != 'id']
+    writer = csv.writer(response)
+    writer.writerow(fields)
+    for row in archive.iter_logs(request.user.pk, fields=fields):
+        writer.writerow([row[name] if row[name] is not None else '' for name in fields])
+    return response
+
+
 @login_required
 def goal_dashboard_view(request):
     """
@@ -366,22 +479,16 @@ def goal_dashboard_view(request):
 
 
 
-@login_required
-def goal_data_api(request):
-    """
-    Returns:
-    {
-      "logs": [ {date, systolic_bp, ...}, ... ]  # last 7 days for charts
-      "monthly_data": { "2025-09-01": 2, "2025-09-02": 0, ... }  # activity levels for heatmap
-      "max_streak": int,
-      "current_streak": int,
-      "monthly_active_count": int,
-      "ai_summary": dict_or_error
-    }
-    """
-    user = request.user
-    today = datetime.date.today()
+# Any of these filled in counts the day as logged for streaks
+STREAK_FIELDS = [
+    "log_date", "weight_kg", "systolic_bp", "diastolic_bp", "heart_rate", "blood_glucose", "temperature",
+    "sleep_hours", "exercise_minutes", "steps_count", "water_intake_liters", "stress_level", "mood_rating",
+    "symptoms", "diet_notes", "notes", "medication_taken",
+]
 
+
+def _goal_stats(user, today):
+    """Heatmap, 7-day chart data and streaks for the goal dashboard."""
     # --- Monthly Data for GitHub-style Heatmap ---
     first_day_of_month = today.replace(day=1)
     if today.month == 12:
@@ -458,18 +565,13 @@ def goal_data_api(request):
         })
 
     # --- Streak Calculations ---
-    all_logs_qs = DailyLog.objects.filter(user=user).order_by("log_date")
+    # Whole history, archived months included (see core.archive)
     logged_dates = set()
 
-    for log in all_logs_qs:
-        has_data = any([
-            log.weight_kg, log.systolic_bp, log.diastolic_bp, log.heart_rate,
-            log.blood_glucose, log.temperature, log.sleep_hours, log.exercise_minutes,
-            log.steps_count, log.water_intake_liters, log.stress_level, log.mood_rating,
-            log.symptoms, log.diet_notes, log.notes, log.medication_taken
-        ])
+    for log in archive.iter_logs(user.pk, fields=STREAK_FIELDS):
+        has_data = any(log[field] for field in STREAK_FIELDS if field != "log_date")
         if has_data:
-            logged_dates.add(log.log_date)
+            logged_dates.add(log["log_date"])
 
     all_dates = sorted(logged_dates)
 
@@ -496,11 +598,43 @@ def goal_data_api(request):
         current_streak += 1
         check_date -= datetime.timedelta(days=1)
 
+    return {
+        "logs": logs_list,
+        "monthly_data": monthly_data,
+        "max_streak": max_streak,
+        "current_streak": current_streak,
+        "monthly_active_count": monthly_active_count,
+    }
+
+
+@login_required
+@use_replica
+def goal_data_api(request):
+    """
+    Returns:
+    {
+      "logs": [ {date, systolic_bp, ...}, ... ]  # last 7 days for charts
+      "monthly_data": { "2025-09-01": 2, "2025-09-02": 0, ... }  # activity levels for heatmap
+      "max_streak": int,
+      "current_streak": int,
+      "monthly_active_count": int,
+      "ai_summary": dict_or_error
+    }
+    """
+    user = request.user
+    today = datetime.date.today()
+
+    # Cached per user until one of their DailyLogs changes (see core.signals)
+    stats = dashboard_cache.get_or_set(
+        f"goal-stats:{today.isoformat()}", lambda: _goal_stats(user, today), group=f"user:{user.pk}")
+    logs_list = stats["logs"]
+    monthly_active_count = stats["monthly_active_count"]
+    current_streak = stats["current_streak"]
+
     # --- AI Summary via Groq ---
     ai_summary = {}
     try:
-        GROQ_API_KEY = "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"
-        if not GROQ_API_KEY or GROQ_API_KEY == "YOUR_GROQ_KEY":
+        if not settings.GROQ_API_KEY or settings.GROQ_API_KEY == "YOUR_GROQ_KEY":
             ai_summary = {"error": "Groq API key not configured"}
         else:
             simplified_logs = []
@@ -512,48 +646,131 @@ def goal_data_api(request):
             if not simplified_logs:
                 ai_summary = {"summary": "No health data logged in the past 7 days. Start tracking your daily health metrics!"}
             else:
-                prompt = f"""
-You are a health coach AI for an Indian audience.
-Analyze the last 7 days of health data and return JSON with these exact keys:
-- "summary": brief paragraph about overall trends
-- "praise": 1-2 positive points about good habits
-- "warnings": 1-2 concerns or areas needing attention  
-- "suggestions": 2-3 specific actionable recommendations
-
-Return only valid JSON, no markdown.
-
-Health Data: {json.dumps(simplified_logs, indent=2)}
-Monthly Stats: {monthly_active_count} active days, Current streak: {current_streak} days.
-"""
+                # The LLM call runs on the job queue; the page polls until it is done.
+                inputs = json.dumps([simplified_logs, monthly_active_count, current_streak], sort_keys=True)
+                key = f"goal-summary:{user.pk}:{hashlib.sha1(inputs.encode()).hexdigest()}"
+                job = get_or_enqueue(
+                    tasks.goal_summary, key,
+                    args=(simplified_logs, monthly_active_count, current_streak),
+                    priority=10, max_attempts=2,
+                )
+                if job.status == Job.DONE:
+                    ai_summary = job.result
+                elif job.status == Job.FAILED:
+                    ai_summary = {"error": f"AI analysis failed: {job.last_error.strip().splitlines()[-1]}"}
+                else:
+                    ai_summary = {"pending": True}
 
-                url = "https://api.groq.com/openai/v1/chat/completions"
-                headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-                payload = {
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.1,
-                    "max_tokens": 500
-                }
+    except Exception as e:
+        ai_summary = {"error": f"AI analysis failed: {str(e)}"}
 
-                response = requests.post(url, headers=headers, json=payload, timeout=20)
-                response.raise_for_status()
+    return JsonResponse({**stats, "ai_summary": ai_summary})
 
-                llm_output = response.json()["choices"][0]["message"]["content"]
-                cleaned = re.sub(r"```json|```", "", llm_output).strip()
+# --------------------------
+# Wearable Vitals
+# --------------------------
 
-                try:
-                    ai_summary = json.loads(cleaned)
-                except json.JSONDecodeError:
-                    ai_summary = {"summary": cleaned}
+def _parse_moment(value, default):
+    """An ISO date or datetime query parameter as an aware datetime."""
+    if not value:
+        return default
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
 
-    except Exception as e:
-        ai_summary = {"error": f"AI analysis failed: {str(e)}"}
 
-    return JsonResponse({
-        "logs": logs_list,
-        "monthly_data": monthly_data,
-        "max_streak": max_streak,
-        "current_streak": current_streak,
-        "monthly_active_count": monthly_active_count,
-        "ai_summary": ai_summary
-    })
+@login_required
+@use_replica
+def vitals_api(request, metric):
+    """
+    Wearable readings of one metric for charts (see core.vitals).
+
+    ?start=&end= take ISO dates or datetimes (default: the last 24 hours);
+    ?bucket= is a bucket size in seconds or "day" (default: enough to stay
+    under vitals.MAX_POINTS points), or "raw" for every reading.
+    """
+    if metric not in vitals.METRICS:
+        return JsonResponse({"error": f"Unknown metric {metric!r}"}, status=404)
+    now = timezone.now()
+    try:
+        end = _parse_moment(request.GET.get("end"), now)
+        start = _parse_moment(request.GET.get("start"), end - datetime.timedelta(days=1))
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid date {e}"}, status=400)
+
+    bucket = request.GET.get("bucket") or vitals.bucket_for(start, end)
+    if bucket == "raw":
+        points = [{"t": at, "value": value} for at, value in vitals.readings(request.user.pk, metric, start, end)]
+        return JsonResponse({"metric": metric, "bucket": None, "points": points})
+    if bucket == "day":
+        bucket = vitals.DAY
+    try:
+        bucket = max(60, int(bucket))
+    except ValueError:
+        return JsonResponse({"error": "bucket must be a number of seconds, 'day' or 'raw'"}, status=400)
+    points = vitals.downsample(request.user.pk, metric, start, end, bucket)
+    return JsonResponse({"metric": metric, "bucket": bucket, "points": points})
+
+
+# --------------------------
+# Ingestion API
+# --------------------------
+
+@csrf_exempt
+@require_POST
+def ingest_view(request):
+    """Batched log and wearable ingestion for apps and device services (see core.ingest)."""
+    token = ingest.authenticate(request)
+    if token is None:
+        return JsonResponse({"error": "Invalid or missing ingestion token"}, status=401)
+    status, payload, replayed = ingest.handle(
+        token, request.body, request.content_type, request.headers.get("Idempotency-Key", ""))
+    response = JsonResponse(payload, status=status)
+    if replayed:
+        response["Idempotent-Replayed"] = "true"
+    return response
+
+
+# --------------------------
+# Mobile Sync
+# --------------------------
+
+@login_required
+def sync_api(request):
+    """
+    Changes to the user's logs, nudges, clinician actions and stability scores since ?cursor= (see core.sync).
+
+    Returns {"changes": {kind: [rows]}, "deleted": {kind: [ids]}, "cursor": str, "has_more": bool},
+    or {"reset": true} when the cursor is too old and the client must sync from scratch.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", sync.PAGE_SIZE)), 1), sync.PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "limit must be a number"}, status=400)
+    try:
+        payload = sync.changes(request.user.pk, request.GET.get("cursor") or None, limit)
+    except sync.InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    return JsonResponse(payload)
+
+
+# --------------------------
+# Metrics
+# --------------------------
+
+def metrics_view(request):
+    """Prometheus scrape endpoint (see core.metrics), behind METRICS_TOKEN as a bearer token.
+
+    Without a token it is only served with DEBUG on.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            raise Http404("Set METRICS_TOKEN to enable /metrics")
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
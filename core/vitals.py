@@ -0,0 +1,237 @@
+# core/vitals.py
+#
+# High-frequency readings from wearables (CGMs, smartwatches, cuffs).
+#
+# A device reports every 1-5 minutes, so one row per reading would grow the
+# database by hundreds of rows per patient per day. Instead each
+# (user, metric, day) is one VitalSeries row holding two packed arrays:
+#
+#   times   seconds since local midnight, ascending
+#   values  readings scaled to integers (glucose in tenths of mg/dL, ...)
+#
+# both delta-encoded as zigzag varints, so a regular 1-minute heart rate
+# trace costs about two bytes per reading. The row also keeps count, min,
+# max and sum, which is all day-level summaries and the DailyLog rollup
+# need, so those never decode the arrays.
+#
+# ``ingest`` merges a batch into the affected days in one transaction (a
+# repeated timestamp replaces the earlier reading) and then rolls the days
+# up into DailyLog: the mean heart rate, glucose, blood pressure and
+# temperature and the total steps overwrite those fields of the day's log,
+# creating the log if there is none. ``readings`` and ``downsample`` answer
+# range queries for charts.
+
+import datetime
+import math
+from array import array
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailyLog, VitalSeries
+
+
+class Metric(NamedTuple):
+    scale: int  # stored integer = round(value * scale)
+    low: float  # accepted range, as in DailyLogForm's clean_* checks
+    high: float
+    log_field: str  # DailyLog field the daily rollup fills
+    rollup: str  # 'mean' or 'sum'
+
+
+METRICS = {
+    "heart_rate": Metric(1, 30, 200, "heart_rate", "mean"),
+    "blood_glucose": Metric(10, 50, 500, "blood_glucose", "mean"),
+    "systolic_bp": Metric(1, 50, 250, "systolic_bp", "mean"),
+    "diastolic_bp": Metric(1, 30, 150, "diastolic_bp", "mean"),
+    "temperature": Metric(10, 95, 110, "temperature", "mean"),
+    "steps": Metric(1, 0, 100000, "steps_count", "sum"),
+}
+MAX_POINTS = 500  # default downsampling target for charts
+DAY = 86400
+
+
+# --------------------------
+# Packed arrays
+# --------------------------
+
+def encode(numbers):
+    """Delta + zigzag varint encoding of a sequence of integers."""
+    out = bytearray()
+    previous = 0
+    for number in numbers:
+        delta = number - previous
+        previous = number
+        zigzag = (delta << 1) ^ (delta >> 63)  # small negative deltas stay small
+        while zigzag >= 0x80:
+            out.append((zigzag & 0x7F) | 0x80)
+            zigzag >>= 7
+        out.append(zigzag)
+    return bytes(out)
+
+
+def decode(data):
+    """Inverse of ``encode``, as an array of signed 64-bit integers."""
+    numbers = array("q")
+    total = shift = zigzag = 0
+    for byte in bytes(data):
+        zigzag |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        total += (zigzag >> 1) ^ -(zigzag & 1)
+        numbers.append(total)
+        zigzag = shift = 0
+    return numbers
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _store(series, points, spec):
+    """Pack ``{second: scaled value}`` into ``series`` and refresh its stats."""
+    seconds = sorted(points)
+    scaled = [points[second] for second in seconds]
+    series.times = encode(seconds)
+    series.values = encode(scaled)
+    series.count = len(seconds)
+    series.value_min = min(scaled) / spec.scale
+    series.value_max = max(scaled) / spec.scale
+    series.value_sum = sum(scaled) / spec.scale
+
+
+# --------------------------
+# Ingest
+# --------------------------
+
+def ingest(user_id, metric, readings):
+    """Store ``(aware datetime, value)`` readings of one metric and roll the days up.
+
+    Readings outside the metric's range are skipped. Returns
+    ``(stored, rejected)``.
+    """
+    spec = METRICS[metric]
+    by_day = defaultdict(dict)
+    stored = rejected = 0
+    for at, value in readings:
+        if value is None or not spec.low <= value <= spec.high:
+            rejected += 1
+            continue
+        day = timezone.localdate(at)
+        by_day[day][int((at - _midnight(day)).total_seconds())] = round(value * spec.scale)
+        stored += 1
+    if not by_day:
+        return stored, rejected
+
+    with transaction.atomic():
+        existing = {series.day: series for series in VitalSeries.objects.select_for_update()
+                    .filter(user_id=user_id, metric=metric, day__in=list(by_day))}
+        created, updated = [], []
+        now = timezone.now()
+        for day, points in by_day.items():
+            series = existing.get(day)
+            if series is None:
+                series = VitalSeries(user_id=user_id, metric=metric, day=day)
+                created.append(series)
+            else:
+                merged = dict(zip(decode(series.times), decode(series.values)))
+                merged.update(points)
+                points = merged
+                series.updated_at = now
+                updated.append(series)
+            _store(series, points, spec)
+        VitalSeries.objects.bulk_create(created)
+        VitalSeries.objects.bulk_update(updated, ["times", "values", "count", "value_min", "value_max",
+                                                  "value_sum", "updated_at"])
+        rollup(user_id, by_day)
+    return stored, rejected
+
+
+def rollup(user_id, days):
+    """Write the wearable summaries of ``days`` into the user's DailyLogs."""
+    fields_by_day = defaultdict(dict)
+    series_rows = (VitalSeries.objects.filter(user_id=user_id, day__in=list(days))
+                   .values("day", "metric", "count", "value_sum"))
+    for row in series_rows:
+        spec = METRICS[row["metric"]]
+        fields_by_day[row["day"]][spec.log_field] = _summary(spec, row["count"], row["value_sum"])
+
+    for day, fields in fields_by_day.items():
+        log, created = DailyLog.objects.get_or_create(user_id=user_id, log_date=day, defaults=fields)
+        if not created and any(getattr(log, name) != value for name, value in fields.items()):
+            for name, value in fields.items():
+                setattr(log, name, value)
+            # save(), not update(): goal progress and dashboard caches follow the log (core.signals)
+            log.save(update_fields=[*fields, "updated_at"])
+
+
+def _summary(spec, count, total):
+    if spec.rollup == "sum":
+        return round(total)
+    mean = total / count
+    return round(mean) if spec.scale == 1 else round(mean, 1)
+
+
+# --------------------------
+# Range queries
+# --------------------------
+
+def readings(user_id, metric, start, end):
+    """Yield ``(datetime, value)`` for readings between aware datetimes ``start`` and ``end``."""
+    spec = METRICS[metric]
+    days = (timezone.localdate(start), timezone.localdate(end))
+    series_rows = (VitalSeries.objects.filter(user_id=user_id, metric=metric, day__range=days)
+                   .order_by("day").values_list("day", "times", "values"))
+    for day, times, values in series_rows.iterator(chunk_size=50):
+        midnight = _midnight(day)
+        for second, value in zip(decode(times), decode(values)):
+            at = midnight + datetime.timedelta(seconds=second)
+            if start <= at <= end:
+                yield at, value / spec.scale
+
+
+def bucket_for(start, end, max_points=MAX_POINTS):
+    """Smallest whole-minute bucket that keeps ``start``..``end`` under ``max_points`` points."""
+    span = (end - start).total_seconds()
+    return max(60, math.ceil(span / max_points / 60) * 60)
+
+
+def downsample(user_id, metric, start, end, bucket):
+    """Readings averaged into ``bucket``-second buckets (aligned to the epoch).
+
+    Returns dicts with the bucket start ``t`` and the readings' mean, min,
+    max and count. Day buckets (``DAY``) come from the stored stats without
+    decoding anything.
+    """
+    if bucket == DAY:
+        return daily_summaries(user_id, metric, timezone.localdate(start), timezone.localdate(end))
+    buckets = {}
+    for at, value in readings(user_id, metric, start, end):
+        key = int(at.timestamp()) // bucket * bucket
+        entry = buckets.get(key)
+        if entry is None:
+            buckets[key] = [value, value, value, 1]
+        else:
+            entry[0] += value
+            entry[1] = min(entry[1], value)
+            entry[2] = max(entry[2], value)
+            entry[3] += 1
+    return [
+        {"t": datetime.datetime.fromtimestamp(key, datetime.timezone.utc), "mean": round(total / count, 2),
+         "min": low, "max": high, "count": count}
+        for key, (total, low, high, count) in sorted(buckets.items())
+    ]
+
+
+def daily_summaries(user_id, metric, first_day, last_day):
+    """One point per day from the stored stats: mean, min, max and count (and sum for steps)."""
+    rows = (VitalSeries.objects.filter(user_id=user_id, metric=metric, day__range=(first_day, last_day))
+            .order_by("day").values("day", "count", "value_min", "value_max", "value_sum"))
+    return [
+        {"t": _midnight(row["day"]), "mean": round(row["value_sum"] / row["count"], 2), "min": row["value_min"],
+         "max": row["value_max"], "count": row["count"], "sum": row["value_sum"]}
+        for row in rows if row["count"]
+    ]
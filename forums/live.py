@@ -0,0 +1,130 @@
+# forums/live.py
+#
+# Live comment delivery for post_detail via server-sent events.
+#
+# New comments are announced through an in-process broker so readers served
+# by the same process are woken immediately. Every stream also polls the
+# database on a short interval, which covers comments written by other
+# processes/workers. Either way, the stream itself always reads "comments
+# newer than the last one sent" from the database, so wake-ups are cheap
+# hints and never carry data that could be lost or duplicated.
+#
+# A stream ends after FORUMS_LIVE_MAX_SECONDS and the browser reconnects
+# with Last-Event-ID, so a reader never pins a connection forever. Streams
+# need an ASGI server (uvicorn vitalcircle.asgi:application): under WSGI
+# Django buffers an async iterator before sending anything, so there the
+# page polls ``new_comments`` through a plain JSON view instead.
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .models import Comment
+
+POLL_INTERVAL = getattr(settings, 'FORUMS_LIVE_POLL_INTERVAL', 5)  # seconds
+KEEPALIVE_INTERVAL = getattr(settings, 'FORUMS_LIVE_KEEPALIVE_INTERVAL', 15)  # seconds
+MAX_STREAM_SECONDS = getattr(settings, 'FORUMS_LIVE_MAX_SECONDS', 300)
+MAX_BATCH = 50
+
+
+class CommentBroker:
+    """In-process pub/sub keyed by post id.
+
+    ``publish`` may be called from any thread (typically a sync view running
+    in a worker thread); subscribers are asyncio queues on the event loop
+    that created them.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, post_id):
+        queue = asyncio.Queue(maxsize=1)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[post_id].add(entry)
+        return entry
+
+    def unsubscribe(self, post_id, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(post_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[post_id]
+
+    def publish(self, post_id):
+        with self._lock:
+            subscribers = list(self._subscribers.get(post_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._wake, queue)
+            except RuntimeError:
+                pass  # loop already closed; the stream is gone
+
+    @staticmethod
+    def _wake(queue):
+        # A single pending wake-up is enough: the stream re-reads everything new.
+        if queue.empty():
+            queue.put_nowait(True)
+
+
+broker = CommentBroker()
+
+
+def new_comments(post_id, after_id):
+    """Up to MAX_BATCH comments on ``post_id`` with pk greater than ``after_id``, ready to send."""
+    comments = (Comment.objects
+                .filter(post_id=post_id, pk__gt=after_id)
+                .select_related('author')
+                .order_by('pk')[:MAX_BATCH])
+    return [
+        {
+            'id': comment.pk,
+            'author': comment.author.username,
+            'created_at': comment.created_at.isoformat(),
+            'html': render_to_string('forums/_comment.html', {'comment': comment}),
+        }
+        for comment in comments
+    ]
+
+
+fetch_new_comments = sync_to_async(new_comments, thread_sensitive=False)
+
+
+def format_event(comment):
+    return f"id: {comment['id']}\nevent: comment\ndata: {json.dumps(comment)}\n\n"
+
+
+async def comment_event_stream(post_id, last_id):
+    """Yield SSE frames for comments on ``post_id`` with pk greater than ``last_id``."""
+    subscription = broker.subscribe(post_id)
+    _, queue = subscription
+    loop = asyncio.get_running_loop()
+    last_sent = started = loop.time()
+    try:
+        yield f"retry: {POLL_INTERVAL * 1000}\n\n"
+        while loop.time() - started < MAX_STREAM_SECONDS:
+            comments = await fetch_new_comments(post_id, last_id)
+            for comment in comments:
+                last_id = comment['id']
+                yield format_event(comment)
+            if comments:
+                last_sent = loop.time()
+                if len(comments) == MAX_BATCH:
+                    continue  # more waiting; don't sleep
+            try:
+                await asyncio.wait_for(queue.get(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if loop.time() - last_sent >= KEEPALIVE_INTERVAL:
+                last_sent = loop.time()
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(post_id, subscription)
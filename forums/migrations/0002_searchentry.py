@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:30
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE forums_searchentry_fts USING fts5(
+        title, body,
+        content='forums_searchentry', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER forums_searchentry_ai AFTER INSERT ON forums_searchentry BEGIN
+        INSERT INTO forums_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER forums_searchentry_ad AFTER DELETE ON forums_searchentry BEGIN
+        INSERT INTO forums_searchentry_fts(forums_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER forums_searchentry_au AFTER UPDATE ON forums_searchentry BEGIN
+        INSERT INTO forums_searchentry_fts(forums_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO forums_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS forums_searchentry_au",
+    "DROP TRIGGER IF EXISTS forums_searchentry_ad",
+    "DROP TRIGGER IF EXISTS forums_searchentry_ai",
+    "DROP TABLE IF EXISTS forums_searchentry_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE forums_searchentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX forums_searchentry_vector_idx ON forums_searchentry USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS forums_searchentry_vector_idx",
+    "ALTER TABLE forums_searchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+create_fulltext_index = _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+drop_fulltext_index = _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Forum Post'), ('comment', 'Forum Comment'), ('group_post', 'Support Group Post')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField()),
+                ('context', models.CharField(blank=True, max_length=255)),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -41,4 +41,31 @@ class Comment(models.Model):
         ordering = ['created_at']
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
+        return f'Comment by {self.author.username} on {self.post.title}'
+
+class SearchEntry(models.Model):
+    """Denormalised row per searchable forum document.
+
+    The full-text index itself lives outside the ORM (an FTS5 table on
+    SQLite, a tsvector column on PostgreSQL) and is kept in sync with this
+    table; see ``forums/search.py``.
+    """
+    KIND_CHOICES = [
+        ('post', 'Forum Post'),
+        ('comment', 'Forum Comment'),
+        ('group_post', 'Support Group Post'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    context = models.CharField(max_length=255, blank=True)  # shown with the hit, not indexed
+    url = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
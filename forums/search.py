@@ -0,0 +1,265 @@
+# forums/search.py
+#
+# Full-text search over forum posts, forum comments and support group posts.
+#
+# Every searchable object is mirrored into ``SearchEntry`` (see signals.py).
+# The actual index is backend specific and maintained by the database:
+#   - SQLite:     an external-content FTS5 table kept in sync by triggers
+#   - PostgreSQL: a generated, weighted tsvector column with a GIN index
+# Any other backend falls back to a plain ``icontains`` scan.
+#
+# Support group posts are private to the group: a search only returns the
+# ``group_post`` entries of groups the searching user belongs to.
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import SearchEntry
+
+FTS_TABLE = 'forums_searchentry_fts'
+
+# Private-use code points mark highlighted terms so user content can be
+# HTML-escaped before the markers are turned into <mark> tags.
+_HL_START = '\ue000'
+_HL_STOP = '\ue001'
+
+_PG_HEADLINE_OPTIONS = f'StartSel={_HL_START}, StopSel={_HL_STOP}, MaxWords=35, MinWords=15, MaxFragments=2'
+
+REBUILD_BATCH_SIZE = 1000
+
+
+# --------------------------
+# Documents
+# --------------------------
+
+def document_for(instance):
+    """Return (kind, object_id, fields) for a searchable model instance, or None."""
+    from core.models import ForumPost
+    from .models import Post, Comment
+
+    if isinstance(instance, Post):
+        return 'post', instance.pk, {
+            'title': instance.title,
+            'body': instance.content,
+            'context': instance.topic.name,
+            'url': reverse('post_detail', args=[instance.pk]),
+            'created_at': instance.created_at,
+        }
+    if isinstance(instance, Comment):
+        return 'comment', instance.pk, {
+            'title': '',
+            'body': instance.content,
+            'context': f'Reply on "{instance.post.title}"',
+            'url': reverse('post_detail', args=[instance.post_id]) + f'#comment-{instance.pk}',
+            'created_at': instance.created_at,
+        }
+    if isinstance(instance, ForumPost):
+        return 'group_post', instance.pk, {
+            'title': '',
+            'body': instance.content,
+            'context': instance.group.name,
+            'url': '',
+            'created_at': instance.created_at,
+        }
+    return None
+
+
+def index_instance(instance):
+    """Insert or refresh the search entry for ``instance``."""
+    document = document_for(instance)
+    if document is None:
+        return
+    kind, object_id, fields = document
+    SearchEntry.objects.update_or_create(kind=kind, object_id=object_id, defaults=fields)
+
+
+def unindex_instance(instance):
+    """Drop the search entry for ``instance`` if it has one."""
+    from core.models import ForumPost
+    from .models import Post, Comment
+
+    kinds = {Post: 'post', Comment: 'comment', ForumPost: 'group_post'}
+    kind = kinds.get(type(instance))
+    if kind is not None:
+        SearchEntry.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def _iter_documents():
+    from core.models import ForumPost
+    from .models import Post, Comment
+
+    sources = [
+        Post.objects.select_related('topic'),
+        Comment.objects.select_related('post'),
+        ForumPost.objects.select_related('group'),
+    ]
+    for queryset in sources:
+        for instance in queryset.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            kind, object_id, fields = document_for(instance)
+            yield SearchEntry(kind=kind, object_id=object_id, **fields)
+
+
+def rebuild_index(batch_size=REBUILD_BATCH_SIZE):
+    """Recreate every search entry from the source tables. Returns the entry count."""
+    total = 0
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        batch = []
+        for entry in _iter_documents():
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                SearchEntry.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            SearchEntry.objects.bulk_create(batch)
+            total += len(batch)
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+    return total
+
+
+# --------------------------
+# Queries
+# --------------------------
+
+def _fts5_query(text):
+    """Turn free text into a safe FTS5 MATCH expression (AND of terms, last one prefix)."""
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return ''
+    parts = [f'"{term}"' for term in terms]
+    parts[-1] += '*'
+    return ' '.join(parts)
+
+
+def _highlight(text):
+    """Escape ``text`` and convert the highlight markers to <mark> tags."""
+    html = escape(text).replace(_HL_START, '<mark>').replace(_HL_STOP, '</mark>')
+    return mark_safe(html)
+
+
+def _hit(entry, title, snippet):
+    return {
+        'entry': entry,
+        'kind': entry.kind,
+        'kind_label': entry.get_kind_display(),
+        'context': entry.context,
+        'url': entry.url,
+        'created_at': entry.created_at,
+        'title': _highlight(title or ''),
+        'snippet': _highlight(snippet or ''),
+    }
+
+
+def _visible_sql(alias):
+    """WHERE clause limiting search entry ``alias`` to what user %s may see."""
+    from core.models import ForumPost, GroupMembership
+
+    return (f"({alias}.kind <> 'group_post' OR {alias}.object_id IN ("
+            f"SELECT p.id FROM {ForumPost._meta.db_table} p "
+            f"JOIN {GroupMembership._meta.db_table} m ON m.group_id = p.group_id WHERE m.user_id = %s))")
+
+
+class SearchResults:
+    """Lazy, ranked result set for a query; slicing runs one LIMIT/OFFSET query.
+
+    Supports ``count()`` and slicing so it can be handed straight to
+    ``django.core.paginator.Paginator``. Only entries ``user`` may read are
+    returned.
+    """
+
+    def __init__(self, query, user):
+        self.query = query.strip()
+        self.user_id = user.pk
+        self._count = None
+        if connection.vendor == 'sqlite':
+            self._match = _fts5_query(self.query)
+        else:
+            self._match = self.query
+
+    def count(self):
+        if self._count is None:
+            self._count = self._fetch_count() if self._match else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if not self._match or stop <= start:
+            return []
+        return self._fetch(start, stop - start)
+
+    def _fetch_count(self):
+        if connection.vendor == 'sqlite':
+            sql = (f"SELECT count(*) FROM {FTS_TABLE} JOIN forums_searchentry e ON e.id = {FTS_TABLE}.rowid "
+                   f"WHERE {FTS_TABLE} MATCH %s AND {_visible_sql('e')}")
+        elif connection.vendor == 'postgresql':
+            sql = ("SELECT count(*) FROM forums_searchentry e "
+                   f"WHERE e.search_vector @@ websearch_to_tsquery('english', %s) AND {_visible_sql('e')}")
+        else:
+            return self._fallback_queryset().count()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self._match, self.user_id])
+            return cursor.fetchone()[0]
+
+    def _fetch(self, offset, limit):
+        if connection.vendor == 'sqlite':
+            sql = f"""
+                SELECT {FTS_TABLE}.rowid,
+                       highlight({FTS_TABLE}, 0, %s, %s),
+                       snippet({FTS_TABLE}, 1, %s, %s, '…', 32)
+                FROM {FTS_TABLE}
+                JOIN forums_searchentry e ON e.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s AND {_visible_sql('e')}
+                ORDER BY bm25({FTS_TABLE}, 10.0, 1.0)
+                LIMIT %s OFFSET %s
+            """
+            params = [_HL_START, _HL_STOP, _HL_START, _HL_STOP, self._match, self.user_id, limit, offset]
+        elif connection.vendor == 'postgresql':
+            sql = f"""
+                SELECT e.id,
+                       ts_headline('english', e.title, q, %s),
+                       ts_headline('english', e.body, q, %s)
+                FROM forums_searchentry e, websearch_to_tsquery('english', %s) q
+                WHERE e.search_vector @@ q AND {_visible_sql('e')}
+                ORDER BY ts_rank_cd(e.search_vector, q) DESC, e.created_at DESC
+                LIMIT %s OFFSET %s
+            """
+            params = [_PG_HEADLINE_OPTIONS, _PG_HEADLINE_OPTIONS, self._match, self.user_id, limit, offset]
+        else:
+            entries = self._fallback_queryset()[offset:offset + limit]
+            return [_hit(e, e.title, Truncator(e.body).words(35)) for e in entries]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        entries = SearchEntry.objects.in_bulk([row[0] for row in rows])
+        return [_hit(entries[pk], title, snippet) for pk, title, snippet in rows if pk in entries]
+
+    def _fallback_queryset(self):
+        from core.models import ForumPost
+
+        member_posts = ForumPost.objects.filter(group__groupmembership__user_id=self.user_id).values('pk')
+        return SearchEntry.objects.filter(
+            Q(title__icontains=self.query) | Q(body__icontains=self.query)
+        ).filter(~Q(kind='group_post') | Q(object_id__in=member_posts)).order_by('-created_at')
+
+
+def search(query, user):
+    """Return a ``SearchResults`` for ``query`` as seen by ``user``."""
+    return SearchResults(query, user)
@@ -0,0 +1,48 @@
+# forums/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.cache import forum_cache
+from core.models import ForumPost
+from .models import Topic, Post, Comment
+from .search import index_instance, unindex_instance
+from .live import broker
+
+
+# Keep the full-text search index in sync with the searchable models
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ForumPost)
+def update_search_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return  # loaddata: the rebuild_search_index command handles fixtures
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ForumPost)
+def delete_search_entry(sender, instance, **kwargs):
+    unindex_instance(instance)
+
+
+# Wake live comment streams for the post once the new comment is committed
+@receiver(post_save, sender=Comment)
+def announce_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: broker.publish(instance.post_id))
+
+
+# Drop cached topic and post listings when they change
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_topic_list(sender, instance, **kwargs):
+    forum_cache.invalidate(group='topics')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_list(sender, instance, **kwargs):
+    forum_cache.invalidate(group=f'topic:{instance.topic_id}')
@@ -1,3 +1,127 @@
-from django.test import TestCase
+# forums/tests.py
 
-# Create your tests here.
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.models import ForumPost, GroupMembership, SupportGroup
+from .models import Comment, Post, Topic
+from .search import rebuild_index, search
+
+User = get_user_model()
+
+# No collectstatic in tests: templates resolve {% static %} without the manifest
+PLAIN_STATIC = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+
+
+# --------------------------
+# Search
+# --------------------------
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('member', password='x')
+        cls.outsider = User.objects.create_user('outsider', password='x')
+        topic = Topic.objects.create(name='Diabetes', description='')
+        cls.post = Post.objects.create(topic=topic, title='Metformin and breakfast', content='Taking it with oats',
+                                       author=cls.member)
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.outsider, content='Metformin upset my stomach')
+        group = SupportGroup.objects.create(name='Type 2', description='', category='condition')
+        GroupMembership.objects.create(group=group, user=cls.member)
+        ForumPost.objects.create(group=group, user=cls.member, content='Private note about metformin doses')
+
+    def test_finds_posts_and_comments(self):
+        results = search('breakfast', self.outsider)
+        self.assertEqual(results.count(), 1)
+        self.assertEqual(results[0]['kind'], 'post')
+        self.assertEqual(search('stomach', self.outsider)[0]['kind'], 'comment')
+
+    def test_group_posts_only_for_members(self):
+        self.assertEqual(sorted(hit['kind'] for hit in search('metformin', self.member)[:10]),
+                         ['comment', 'group_post', 'post'])
+        self.assertEqual(sorted(hit['kind'] for hit in search('metformin', self.outsider)[:10]), ['comment', 'post'])
+        self.assertEqual(search('metformin', self.outsider).count(), 2)
+        self.assertEqual(search('doses', self.outsider).count(), 0)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.post.title = 'Insulin timing'
+        self.post.save()
+        self.assertEqual(search('insulin', self.member).count(), 1)
+        self.assertEqual(search('breakfast', self.member).count(), 0)
+        self.comment.delete()
+        self.assertEqual(search('stomach', self.member).count(), 0)
+
+    def test_rebuild(self):
+        rebuild_index()
+        self.assertEqual(search('metformin', self.member).count(), 3)
+
+    @override_settings(STORAGES=PLAIN_STATIC)
+    def test_view_requires_login(self):
+        url = reverse('forum_search')
+        self.assertEqual(self.client.get(url, {'q': 'metformin'}).status_code, 302)
+        self.client.force_login(self.outsider)
+        response = self.client.get(url, {'q': 'metformin'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Private note')
+
+
+# --------------------------
+# Live comments
+# --------------------------
+
+class LiveCommentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='x')
+        topic = Topic.objects.create(name='Sleep', description='')
+        cls.post = Post.objects.create(topic=topic, title='Insomnia', content='Any tips?', author=cls.user)
+        cls.first = Comment.objects.create(post=cls.post, author=cls.user, content='Warm milk')
+        cls.second = Comment.objects.create(post=cls.post, author=cls.user, content='No screens after nine')
+
+    def test_poll_returns_newer_comments(self):
+        self.client.force_login(self.user)
+        url = reverse('post_comment_poll', args=[self.post.pk])
+        comments = self.client.get(url, {'last_id': self.first.pk}).json()['comments']
+        self.assertEqual([c['id'] for c in comments], [self.second.pk])
+        self.assertIn('No screens after nine', comments[0]['html'])
+        self.assertEqual(self.client.get(url, HTTP_LAST_EVENT_ID=str(self.second.pk)).json(), {'comments': []})
+
+    def test_poll_requires_login(self):
+        response = self.client.get(reverse('post_comment_poll', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('post_comment_stream', args=[self.post.pk])).status_code, 204)
+
+    @override_settings(STORAGES=PLAIN_STATIC)
+    def test_page_polls_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]))
+        self.assertContains(response, 'data-stream-url=""')
+        self.assertContains(response, f'data-last-id="{self.second.pk}"')
+
+
+class LiveStreamTests(TransactionTestCase):
+    @mock.patch('forums.live.MAX_STREAM_SECONDS', 0.3)
+    @mock.patch('forums.live.POLL_INTERVAL', 0.05)
+    async def test_stream_sends_new_comments_then_ends(self):
+        user = await User.objects.acreate_user('streamer', password='x')
+        topic = await Topic.objects.acreate(name='Diet', description='')
+        post = await Post.objects.acreate(topic=topic, title='Breakfast', content='Oats?', author=user)
+        first = await Comment.objects.acreate(post=post, author=user, content='Yes')
+        second = await Comment.objects.acreate(post=post, author=user, content='With berries')
+
+        url = reverse('post_comment_stream', args=[post.pk])
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(url, headers={'Last-Event-ID': str(first.pk)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = [frame async for frame in response.streaming_content]  # ends after MAX_STREAM_SECONDS
+        body = b''.join(frames).decode()
+        self.assertIn(f'id: {second.pk}\nevent: comment', body)
+        self.assertNotIn(f'id: {first.pk}\n', body)
@@ -1,11 +1,15 @@
 # forums/urls.py
 
 from django.urls import path
-from .views import ForumListView, TopicPostListView, PostDetailView, PostCreateView
+from .views import (ForumListView, TopicPostListView, PostDetailView, PostCreateView, SearchView, PostCommentStreamView,
+                    PostCommentPollView)
 
 urlpatterns = [
     path('', ForumListView.as_view(), name='forum_list'),
+    path('search/', SearchView.as_view(), name='forum_search'),
     path('topic/<slug:slug>/', TopicPostListView.as_view(), name='topic_post_list'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
+    path('post/<int:pk>/stream/', PostCommentStreamView.as_view(), name='post_comment_stream'),
+    path('post/<int:pk>/comments/', PostCommentPollView.as_view(), name='post_comment_poll'),
     path('topic/<slug:slug>/new/', PostCreateView.as_view(), name='post_create'),
 ]
\ No newline at end of file
@@ -1,37 +1,58 @@
 # forums/views.py
 
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import HttpResponse, HttpResponseForbidden, Http404, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views import View
+from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import Paginator
+from django.db.models import F
+from core.cache import forum_cache
+from core.routers import use_replica
 from .models import Topic, Post, Comment
 from .forms import PostForm, CommentForm # Import both forms
+from .search import search
+from .live import POLL_INTERVAL, comment_event_stream, new_comments
 
 # View to list all topics
+@method_decorator(use_replica, name='dispatch')
 class ForumListView(View):
     def get(self, request):
-        topics = Topic.objects.all()
+        topics = forum_cache.get_or_set('topics', lambda: list(Topic.objects.all()), group='topics')
         return render(request, 'forums/forum_list.html', {'topics': topics})
 
 # View to list all posts in a specific topic
+@method_decorator(use_replica, name='dispatch')
 class TopicPostListView(View):
     def get(self, request, slug):
         topic = get_object_or_404(Topic, slug=slug)
-        posts = Post.objects.filter(topic=topic)
+        posts = forum_cache.get_or_set('posts', lambda: list(
+            Post.objects.filter(topic=topic)
+            .annotate(author_name=F('author__username'))
+            .values('pk', 'title', 'created_at', 'author_name')
+        ), group=f'topic:{topic.pk}')
         return render(request, 'forums/topic_post_list.html', {'topic': topic, 'posts': posts})
 
 # View for a single post and its comments (UPDATED)
+@method_decorator(use_replica, name='dispatch')
 class PostDetailView(LoginRequiredMixin, View):
     def get(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
-        comments = post.comments.all()
-        comment_form = CommentForm()
-        
-        context = {
+        return render(request, 'forums/post_detail.html', self.get_context(post, CommentForm()))
+
+    def get_context(self, post, comment_form):
+        comments = post.comments.select_related('author')
+        last_comment_id = comments[len(comments) - 1].pk if comments else 0
+        return {
             'post': post,
             'comments': comments,
+            'last_comment_id': last_comment_id,
             'comment_form': comment_form,
+            # Server-sent events only flush under ASGI; WSGI deployments poll instead
+            'live_streaming': isinstance(self.request, ASGIRequest),
+            'live_poll_interval': POLL_INTERVAL,
         }
-        return render(request, 'forums/post_detail.html', context)
 
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
@@ -45,13 +66,40 @@ class PostDetailView(LoginRequiredMixin, View):
             return redirect('post_detail', pk=pk)
         
         # If form is not valid, re-render the page with the form and its errors
-        comments = post.comments.all()
-        context = {
-            'post': post,
-            'comments': comments,
-            'comment_form': comment_form,
-        }
-        return render(request, 'forums/post_detail.html', context)
+        return render(request, 'forums/post_detail.html', self.get_context(post, comment_form))
+
+def _last_id(request):
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id') or 0
+    try:
+        return int(last_id)
+    except ValueError:
+        return 0
+
+# Server-sent event stream of new comments on a post (serve under ASGI)
+class PostCommentStreamView(View):
+    async def get(self, request, pk):
+        if not isinstance(request, ASGIRequest):
+            # WSGI would buffer the endless stream and hold a worker; 204 tells EventSource to stop
+            return HttpResponse(status=204)
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        if not await Post.objects.filter(pk=pk).aexists():
+            raise Http404('No Post matches the given query.')
+
+        last_id = _last_id(request)
+        response = StreamingHttpResponse(comment_event_stream(pk, last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+# New comments on a post as JSON, polled by post_detail when streaming isn't available
+class PostCommentPollView(View):
+    def get(self, request, pk):
+        if not request.user.is_authenticated:
+            return HttpResponseForbidden()
+        get_object_or_404(Post, pk=pk)
+        return JsonResponse({'comments': new_comments(pk, _last_id(request))})
 
 # View to create a new post (UPDATED)
 class PostCreateView(LoginRequiredMixin, View):
@@ -72,4 +120,17 @@ class PostCreateView(LoginRequiredMixin, View):
             return redirect('post_detail', pk=post.pk)
         
         # If form is not valid, re-render the page with the form and its errors
-        return render(request, 'forums/post_create.html', {'topic': topic, 'form': form})
\ No newline at end of file
+        return render(request, 'forums/post_create.html', {'topic': topic, 'form': form})
+
+# Full-text search across posts, comments and support group posts
+@method_decorator(use_replica, name='dispatch')
+class SearchView(LoginRequiredMixin, View):
+    paginate_by = 20
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        page_obj = None
+        if query:
+            paginator = Paginator(search(query, request.user), self.paginate_by)
+            page_obj = paginator.get_page(request.GET.get('page'))
+        return render(request, 'forums/search.html', {'query': query, 'page_obj': page_obj})
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'priority', 'run_at', 'attempts', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from jobs.worker import WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run background job workers against the database job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Number of workers (default: 4)")
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help="Run workers as threads (I/O-bound jobs) or processes (CPU-bound jobs)")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds an idle worker waits before polling again")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        )
+        self.stdout.write(f"Starting {options['concurrency']} {options['mode']} worker(s) as {pool.name}")
+        pool.run()
+        self.stdout.write("Workers stopped.")
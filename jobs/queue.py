@@ -0,0 +1,235 @@
+# jobs/queue.py
+#
+# Database-backed job queue: task registry, enqueueing, claiming and running.
+#
+# Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED where the backend
+# supports it (PostgreSQL, MySQL 8, Oracle). SQLite has no row locks, so
+# there a job is claimed with a conditional UPDATE (status still 'queued')
+# and whichever worker's UPDATE changes the row wins.
+#
+# A claim is a lease: while a job runs, a heartbeat thread refreshes its
+# locked_at every JOB_HEARTBEAT_INTERVAL seconds, and only jobs whose lease
+# hasn't been renewed for JOB_LOCK_TIMEOUT (their worker died) are requeued.
+# A worker records the outcome only if it still holds the lease, so a job
+# that was requeued from under it can't be finished twice.
+
+import datetime
+import logging
+import random
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 10)  # seconds, doubled per attempt
+JOB_RETRY_BACKOFF_MAX = getattr(settings, 'JOB_RETRY_BACKOFF_MAX', 3600)
+JOB_LOCK_TIMEOUT = getattr(settings, 'JOB_LOCK_TIMEOUT', 900)  # running jobs without a heartbeat this long are requeued
+JOB_HEARTBEAT_INTERVAL = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 60)
+JOB_RETENTION_DAYS = getattr(settings, 'JOB_RETENTION_DAYS', 7)
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func):
+    """Register ``func`` so workers may run it. Use as a decorator."""
+    _registry[f"{func.__module__}.{func.__name__}"] = func
+    return func
+
+
+def task_name(func_or_name):
+    if isinstance(func_or_name, str):
+        return func_or_name
+    return f"{func_or_name.__module__}.{func_or_name.__name__}"
+
+
+def resolve_task(name):
+    if name not in _registry:
+        try:
+            import_string(name)  # importing the module runs its @task decorators
+        except ImportError:
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(f"{name} is not a registered task") from None
+
+
+# --------------------------
+# Enqueueing
+# --------------------------
+
+def enqueue(func, args=(), kwargs=None, *, priority=0, run_at=None, delay=None, max_attempts=3, key=''):
+    """Queue ``func(*args, **kwargs)`` to run on a worker and return the Job.
+
+    ``run_at`` (datetime) or ``delay`` (seconds) schedule it for later;
+    higher ``priority`` jobs are claimed first.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+        if delay:
+            run_at += datetime.timedelta(seconds=delay)
+    return Job.objects.create(
+        task=task_name(func),
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=priority,
+        run_at=run_at,
+        max_attempts=max_attempts,
+        key=key,
+    )
+
+
+def get_or_enqueue(func, key, args=(), kwargs=None, reuse_done=True, **options):
+    """Return the latest job with ``key`` if it is pending (or done, with ``reuse_done``).
+
+    Otherwise enqueue a new one. Lets a view ask for work repeatedly without
+    piling up duplicate jobs, and read the result once it is ready.
+    """
+    job = Job.objects.filter(key=key).order_by('-pk').first()
+    if job is not None:
+        if job.status in (Job.QUEUED, Job.RUNNING) or (reuse_done and job.status == Job.DONE):
+            return job
+    return enqueue(func, args, kwargs, key=key, **options)
+
+
+# --------------------------
+# Claiming and running
+# --------------------------
+
+def claim_job(worker_id):
+    """Atomically take the next runnable job for ``worker_id``, or return None."""
+    now = timezone.now()
+    ready = (Job.objects
+             .filter(status=Job.QUEUED, run_at__lte=now)
+             .order_by('-priority', 'run_at', 'pk'))
+    alias = router.db_for_write(Job)
+
+    if connections[alias].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=alias):
+            job = ready.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = Job.RUNNING
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=['status', 'locked_by', 'locked_at', 'attempts'])
+            return job
+
+    for candidate in ready.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        claimed = (Job.objects
+                   .filter(pk=candidate, status=Job.QUEUED)
+                   .update(status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1))
+        if claimed:
+            return Job.objects.get(pk=candidate)
+    return None
+
+
+def retry_delay(attempts):
+    delay = min(JOB_RETRY_BACKOFF * 2 ** max(attempts - 1, 0), JOB_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(1.0, 1.25)
+
+
+class Heartbeat(threading.Thread):
+    """Renews a running job's lease (locked_at) until stopped."""
+
+    def __init__(self, job, interval=JOB_HEARTBEAT_INTERVAL):
+        super().__init__(name=f"job-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self.interval = interval
+        self.halt = threading.Event()
+
+    def run(self):
+        try:
+            while not self.halt.wait(self.interval):
+                try:
+                    renewed = (Job.objects
+                               .filter(pk=self.job.pk, status=Job.RUNNING, locked_by=self.job.locked_by)
+                               .update(locked_at=timezone.now()))
+                except Exception:
+                    logger.exception("Heartbeat for job %s failed", self.job.pk)
+                    continue
+                if not renewed:
+                    logger.warning("Job %s (%s) lost its lease while running", self.job.pk, self.job.task)
+                    return
+        finally:
+            connections.close_all()  # this thread's connections only
+
+    def stop(self):
+        self.halt.set()
+        self.join()
+
+
+def _finish(job, **fields):
+    """Record a job's outcome if ``job.locked_by`` still holds its lease. Returns whether it did."""
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+    fields.update(locked_by='', locked_at=None)
+    try:
+        updated = owned.update(**fields)
+    except TypeError:
+        fields['result'] = None  # not JSON serialisable; the job still succeeded
+        updated = owned.update(**fields)
+    if not updated:
+        logger.warning("Job %s (%s) finished on %s after losing its lease; outcome discarded",
+                       job.pk, job.task, job.locked_by)
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome (done, retry later, or failed)."""
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        func = resolve_task(job.task)
+        result = func(*job.args, **job.kwargs)
+    except Exception:
+        heartbeat.stop()
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            run_at = timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts))
+            if _finish(job, status=Job.QUEUED, run_at=run_at, last_error=error):
+                logger.warning("Job %s (%s) failed, retrying at %s", job.pk, job.task, job.run_at)
+        elif _finish(job, status=Job.FAILED, finished_at=timezone.now(), last_error=error):
+            logger.error("Job %s (%s) failed permanently", job.pk, job.task)
+        return job
+
+    heartbeat.stop()
+    _finish(job, status=Job.DONE, result=result, finished_at=timezone.now())
+    return job
+
+
+def requeue_stale_jobs():
+    """Requeue (or fail) jobs whose worker died while running them (no heartbeat for JOB_LOCK_TIMEOUT)."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=JOB_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), last_error='Worker lost while running job')
+    requeued = stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+    return requeued + failed
+
+
+def purge_finished_jobs():
+    cutoff = timezone.now() - datetime.timedelta(days=JOB_RETENTION_DAYS)
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_depth():
+    """Number of jobs that are runnable right now."""
+    return Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).count()
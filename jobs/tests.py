@@ -0,0 +1,149 @@
+# jobs/tests.py
+
+import datetime
+import threading
+import time
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+from .worker import work_loop
+
+
+@queue.task
+def add(a, b):
+    return a + b
+
+
+@queue.task
+def explode():
+    raise RuntimeError('boom')
+
+
+@queue.task
+def requeued_midway(job_id):
+    """Stands in for a worker that stalled long enough for the reaper to take its job back."""
+    Job.objects.filter(pk=job_id).update(status=Job.QUEUED, locked_by='', locked_at=None)
+    return 'too late'
+
+
+# --------------------------
+# Claiming
+# --------------------------
+
+class ClaimTests(TestCase):
+    def test_claims_by_priority_then_age(self):
+        low = queue.enqueue(add, (1, 2))
+        high = queue.enqueue(add, (3, 4), priority=5)
+        queue.enqueue(add, (5, 6), delay=3600)
+
+        job = queue.claim_job('worker-1')
+        self.assertEqual(job.pk, high.pk)
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'worker-1', 1))
+        self.assertEqual(queue.claim_job('worker-2').pk, low.pk)
+        self.assertIsNone(queue.claim_job('worker-3'))  # the last one isn't due yet
+
+    def test_job_is_claimed_once(self):
+        queue.enqueue(add, (1, 2))
+        self.assertIsNotNone(queue.claim_job('worker-1'))
+        self.assertIsNone(queue.claim_job('worker-2'))
+
+    def test_get_or_enqueue_reuses_pending_jobs(self):
+        job = queue.get_or_enqueue(add, 'sum:1:2', args=(1, 2))
+        self.assertEqual(queue.get_or_enqueue(add, 'sum:1:2', args=(1, 2)).pk, job.pk)
+
+
+# --------------------------
+# Running
+# --------------------------
+
+class RunTests(TestCase):
+    def test_success(self):
+        queue.enqueue(add, (2, 3))
+        job = queue.run_job(queue.claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.locked_by), (Job.DONE, 5, ''))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_retries_then_fails(self):
+        queue.enqueue(explode, max_attempts=2)
+        job = queue.run_job(queue.claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        job = queue.run_job(queue.claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_task_fails(self):
+        queue.enqueue('jobs.tests.missing', max_attempts=1)
+        job = queue.run_job(queue.claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('UnknownTask', job.last_error)
+
+    def test_outcome_discarded_after_losing_the_lease(self):
+        job = queue.enqueue(requeued_midway)
+        Job.objects.filter(pk=job.pk).update(args=[job.pk])
+        queue.run_job(queue.claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.QUEUED, None))
+        self.assertEqual(queue.claim_job('worker-2').attempts, 2)  # runnable again for the next worker
+
+
+    def test_burst_worker_drains_the_queue(self):
+        for n in range(3):
+            queue.enqueue(add, (n, n))
+        work_loop(threading.Event(), 'worker-1', burst=True)
+        self.assertEqual(sorted(Job.objects.values_list('result', flat=True)), [0, 2, 4])
+
+
+# --------------------------
+# Leases
+# --------------------------
+
+class ReapTests(TestCase):
+    def test_requeues_jobs_without_a_heartbeat(self):
+        stale = timezone.now() - datetime.timedelta(seconds=queue.JOB_LOCK_TIMEOUT + 60)
+        requeued = Job.objects.create(task='jobs.tests.add', status=Job.RUNNING, locked_by='dead-worker',
+                                      locked_at=stale, attempts=1)
+        exhausted = Job.objects.create(task='jobs.tests.add', status=Job.RUNNING, locked_by='dead-worker',
+                                       locked_at=stale, attempts=3)
+        alive = Job.objects.create(task='jobs.tests.add', status=Job.RUNNING, locked_by='worker-1',
+                                   locked_at=timezone.now(), attempts=1)
+
+        self.assertEqual(queue.requeue_stale_jobs(), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {requeued.pk: Job.QUEUED, exhausted.pk: Job.FAILED, alive.pk: Job.RUNNING})
+        self.assertEqual(Job.objects.get(pk=requeued.pk).locked_by, '')
+
+
+class HeartbeatTests(TransactionTestCase):
+    def test_renews_the_lease_while_held(self):
+        queue.enqueue(add, (1, 1))
+        job = queue.claim_job('worker-1')
+        old = timezone.now() - datetime.timedelta(seconds=queue.JOB_LOCK_TIMEOUT + 60)
+        Job.objects.filter(pk=job.pk).update(locked_at=old)
+
+        heartbeat = queue.Heartbeat(job, interval=0.05)
+        heartbeat.start()
+        time.sleep(0.3)
+        heartbeat.stop()
+        self.assertGreater(Job.objects.get(pk=job.pk).locked_at, old)
+        self.assertEqual(queue.requeue_stale_jobs(), 0)
+
+    def test_stops_once_the_lease_is_lost(self):
+        queue.enqueue(add, (1, 1))
+        job = queue.claim_job('worker-1')
+        Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+        heartbeat = queue.Heartbeat(job, interval=0.05)
+        heartbeat.start()
+        heartbeat.join(timeout=2)
+        self.assertFalse(heartbeat.is_alive())
+        self.assertIsNone(Job.objects.get(pk=job.pk).locked_at)
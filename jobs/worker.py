@@ -0,0 +1,103 @@
+# jobs/worker.py
+#
+# Local worker pool for the job queue. Runs N workers as threads (good for
+# I/O-bound jobs such as LLM calls) or as processes (CPU-bound jobs), each
+# polling the jobs table, plus a housekeeping loop in the parent.
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = 60  # seconds
+
+
+def work_loop(stop, worker_id, poll_interval=1.0, burst=False):
+    """Claim and run jobs until ``stop`` is set (or the queue is empty in burst mode)."""
+    from .queue import claim_job, run_job
+
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_job(worker_id)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            logger.info("%s running job %s (%s)", worker_id, job.pk, job.task)
+            run_job(job)
+    finally:
+        connections.close_all()
+
+
+def _process_main(worker_id, poll_interval, burst):
+    # Spawned children start from a fresh interpreter, so this module must
+    # stay importable before Django is set up (the queue imports are lazy).
+    import django
+    django.setup()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    work_loop(stop, worker_id, poll_interval, burst)
+
+
+class WorkerPool:
+    def __init__(self, concurrency=1, mode='thread', poll_interval=1.0, burst=False):
+        if mode not in ('thread', 'process'):
+            raise ValueError("mode must be 'thread' or 'process'")
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stop = threading.Event()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    def run(self):
+        from .queue import purge_finished_jobs, requeue_stale_jobs
+
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stop.set())
+
+        requeue_stale_jobs()
+        workers = [self._start(i) for i in range(self.concurrency)]
+        last_housekeeping = time.monotonic()
+        try:
+            while not self.stop.is_set() and any(worker.is_alive() for worker in workers):
+                self.stop.wait(1.0)
+                if time.monotonic() - last_housekeeping >= HOUSEKEEPING_INTERVAL:
+                    close_old_connections()
+                    requeue_stale_jobs()
+                    purge_finished_jobs()
+                    last_housekeeping = time.monotonic()
+        finally:
+            self.stop.set()
+            for worker in workers:
+                if self.mode == 'process' and worker.is_alive():
+                    worker.terminate()  # delivers SIGTERM; the child finishes its current job
+                worker.join()
+            connections.close_all()
+
+    def _start(self, index):
+        worker_id = f"{self.name}/{index}"
+        if self.mode == 'thread':
+            worker = threading.Thread(
+                target=work_loop, args=(self.stop, worker_id, self.poll_interval, self.burst),
+                name=f"job-worker-{index}", daemon=True,
+            )
+        else:
+            connections.close_all()  # never share a DB connection with a child
+            worker = multiprocessing.get_context('spawn').Process(
+                target=_process_main, args=(worker_id, self.poll_interval, self.burst),
+                name=f"job-worker-{index}",
+            )
+        worker.start()
+        return worker
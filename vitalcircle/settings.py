@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,14 +41,21 @@ INSTALLED_APPS = [
     'core',
     'users',
     'forums',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.staticfiles.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.routers.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.identity.IdentityMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +64,7 @@ ROOT_URLCONF = 'vitalcircle.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',  # DjangoTemplates that reports render time
         'DIRS': [BASE_DIR / "vitalcircle" / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,13 +83,118 @@ WSGI_APPLICATION = 'vitalcircle.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# DB_ENGINE=sqlite (default) | postgres. Connections are kept for
+# DB_CONN_MAX_AGE seconds and health-checked before reuse; with PostgreSQL
+# a psycopg 3 connection pool is used instead (POSTGRES_POOL=0 disables it).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+# Applied to every new SQLite connection by core.db (in this order)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # ms a writer waits for the lock before "database is locked"
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 134217728,  # 128 MiB
+    'cache_size': -20000,  # KiB
+    'temp_store': 'MEMORY',
 }
 
+if DB_ENGINE == 'postgres':
+    POSTGRES_POOL = os.environ.get('POSTGRES_POOL', '1') != '0'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'vitalcircle'),
+            'USER': os.environ.get('POSTGRES_USER', 'vitalcircle'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # The pool owns connection lifetime; persistent connections are for the unpooled setup
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            } if POSTGRES_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock at BEGIN so transactions queue on busy_timeout
+                # instead of failing when a read lock can't be upgraded
+                'transaction_mode': 'IMMEDIATE',
+            },
+            'PRAGMAS': SQLITE_PRAGMAS,
+        }
+    }
+
+# Optional read replica for dashboards and listings (see core.routers):
+# POSTGRES_REPLICA_HOST with PostgreSQL, or SQLITE_REPLICA_PATH locally
+# (refresh it from the primary with `manage.py sync_sqlite_replica`).
+if DB_ENGINE == 'postgres' and os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_ENGINE != 'postgres' and os.environ.get('SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['SQLITE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 5  # reads stay on the primary this long after a client writes
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared L2 tier for core.cache (each process also keeps its own L1 LRU).
+# CACHE_BACKEND=file (default) | db (run `manage.py createcachetable`) | redis (uses REDIS_URL)
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'file')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+            'KEY_PREFIX': 'vitalcircle',
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'vitalcircle_cache',
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / '.cache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+CACHE_L1_MAX_ENTRIES = 1000  # per-process LRU size
+CACHE_L1_TIMEOUT = 60  # seconds an entry may live in the per-process LRU
+CACHE_VERSION_TTL = 5  # seconds before a process re-reads namespace versions
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,6 +232,20 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "vitalcircle" / "static"]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic fingerprints and precompresses assets (core.staticfiles);
+# with DEBUG off, core.staticfiles.StaticAssetMiddleware serves them with
+# far-future immutable cache headers. Third-party assets are vendored with
+# `manage.py vendor_assets` (core.assets).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 
 
 # Default primary key field type
@@ -129,7 +256,91 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+# IdentityBackend loads the session user with their UserProfile and Clinician
+# in one query (see core.identity); ModelBackend keeps older sessions valid.
+AUTHENTICATION_BACKENDS = [
+    'core.identity.IdentityBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+IDENTITY_CACHE_TIMEOUT = 30  # seconds the loaded identity is cached (0 disables)
+
+# Sessions are read from the cache and written through to the database,
+# so a request normally costs no session query at all
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'default'
+
 # Login/Logout URLs
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'core:user-dashboard'
 LOGOUT_REDIRECT_URL = 'users:login'
+
+# Groq LLM (OpenAI-compatible chat completions API); the key only comes
+# from the environment, and LLM features fail with ImproperlyConfigured
+# until it is set
+GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
+GROQ_API_URL = os.environ.get('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
+
+# Request timing (see core.timing): Server-Timing header, one JSON log line
+# per request on the core.timing logger, and slow requests sampled with
+# their queries. The header (timings and query counts) goes to 'staff'
+# users only by default; 'all' sends it to everyone, 'off' never
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'staff')
+REQUEST_TIMING_SLOW_MS = int(os.environ.get('REQUEST_TIMING_SLOW_MS', '500'))
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '1.0'))
+
+# /metrics (see core.metrics): each process flushes its counters to its own
+# file in METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds and a
+# scrape sums them. Scrapers send METRICS_TOKEN as a bearer token; without
+# one /metrics is only served when DEBUG is on
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / '.metrics'))
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Staff can profile a single request with ?_profile=1 or an X-Profile: 1
+# header (see core.profiling); profiles are listed in the admin
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_KEEP = 100  # newest profiles kept
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Codec for CompressedJSONField (see core.fields): 'zlib' (the default) or
+# 'zstd', which needs the zstandard package on every host reading the rows
+COMPRESSED_JSON_CODEC = os.environ.get('COMPRESSED_JSON_CODEC') or None
+
+# Daily logs older than this many days are moved, a month at a time, into
+# compressed DailyLogArchive rows by `manage.py archive_logs` (see core.archive)
+LOG_ARCHIVE_AFTER_DAYS = 180
+
+# Batch ingestion API (core.ingest): records per request (the body also has
+# to fit DATA_UPLOAD_MAX_MEMORY_SIZE) and how long Idempotency-Key responses
+# are kept for retries
+INGEST_MAX_RECORDS = 10000
+INGEST_IDEMPOTENCY_HOURS = 24
+
+# Delta sync API (core.sync): cursors stay this many seconds behind now, so a
+# row is never skipped if its transaction commits within that long of being
+# written (keep it above the longest write transaction, e.g. a full ingest
+# batch); tombstones for deleted rows are kept this many days
+# (`manage.py purge_sync_tombstones`, nightly)
+SYNC_SETTLE_SECONDS = 60
+SYNC_TOMBSTONE_DAYS = 90
+SYNC_PAGE_SIZE = 500
+
+# Patient report generation
+REPORT_SNAPSHOT_DAYS = 90  # days of DailyLog history stored with each report
+REPORT_CONCURRENCY = 4  # reports generated in parallel for a clinician's panel